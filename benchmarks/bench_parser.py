@@ -0,0 +1,59 @@
+"""
+Сравнение скорости parse_log_line с эталонным разбором регулярным выражением.
+
+Запуск:
+    python -m benchmarks.bench_parser [путь_к_логу] [--repeat N]
+"""
+
+import argparse
+import os
+import time
+from functools import partial
+
+from src.log_parser import parse_log_line, parse_log_line_regex
+from src.log_stats import LogStatistics
+
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs.txt")
+
+
+def measure(parse, lines, repeat):
+    """Лучшая из repeat попыток скорость разбора в строках в секунду."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_log_line benchmark")
+    parser.add_argument("path", nargs="?", default=DEFAULT_LOG_FILE)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        lines = f.readlines()
+
+    if [parse_log_line(line) for line in lines] != [
+        parse_log_line_regex(line) for line in lines
+    ]:
+        raise SystemExit("parse_log_line results differ from parse_log_line_regex")
+
+    baseline = measure(parse_log_line_regex, lines, args.repeat)
+    fast = measure(parse_log_line, lines, args.repeat)
+    # Набор полей обычного запуска без фильтров: время не разбирается
+    projected = measure(
+        partial(parse_log_line, fields=LogStatistics.RECORD_FIELDS), lines, args.repeat
+    )
+    print(f"lines:                {len(lines)}")
+    print(f"parse_log_line_regex: {baseline:,.0f} lines/s")
+    print(f"parse_log_line:       {fast:,.0f} lines/s")
+    print(f"speedup:              {fast / baseline:.2f}x")
+    print(f"report fields only:   {projected:,.0f} lines/s")
+    print(f"speedup:              {projected / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
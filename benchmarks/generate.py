@@ -0,0 +1,166 @@
+"""
+Генератор синтетических логов NGINX для бенчмарков.
+
+Запуск:
+    python -m benchmarks.generate out.log [--lines N] [--resources N]
+        [--skew S] [--statuses 200:70,304:20,404:8,500:2] [--size-median N]
+"""
+
+import argparse
+import itertools
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+# Доли кодов ответа по умолчанию
+DEFAULT_STATUSES = {200: 70, 304: 20, 404: 8, 500: 2}
+
+# Начало логов по умолчанию, как в logs.txt
+DEFAULT_START = datetime(2015, 5, 17, 8, 5, 32, tzinfo=timezone.utc)
+
+# Названия месяцев в логах не зависят от локали, в отличие от strftime("%b")
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+METHODS = ("GET", "GET", "GET", "HEAD", "POST")
+AGENTS = (
+    "Debian APT-HTTP/1.3 (0.8.16~exp12ubuntu10.21)",
+    "Debian APT-HTTP/1.3 (0.9.7.9)",
+    "Wget/1.13.4 (linux-gnu)",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:38.0) Gecko/20100101 Firefox/38.0",
+    "urlgrabber/3.9.1 yum/3.4.3",
+)
+
+
+def parse_statuses(text):
+    """
+    Доли кодов ответа из строки вида "200:70,304:20,404:10".
+
+    Raises:
+        ValueError: Если строка записана неверно.
+    """
+    statuses = {}
+    for item in text.split(","):
+        status, weight = item.split(":")
+        statuses[int(status)] = float(weight)
+    return statuses
+
+
+def generate_lines(
+    count,
+    resources=100,
+    skew=1.1,
+    statuses=None,
+    size_median=2000,
+    size_sigma=1.5,
+    lines_per_second=10,
+    start=DEFAULT_START,
+    seed=0,
+):
+    """
+    Строки лога NGINX в формате combined со случайными полями.
+
+    Ресурсы выбираются по закону Ципфа: ресурс с рангом k встречается
+    пропорционально 1 / k ** skew. Размеры ответов распределены логнормально,
+    у ответов 304 размер 0. Время записей растёт равномерно. При одинаковых
+    параметрах строки совпадают.
+
+    Args:
+        count (int): Количество строк.
+        resources (int): Количество различных ресурсов.
+        skew (float): Показатель закона Ципфа; 0 — ресурсы равновероятны.
+        statuses (dict[int, float], optional): Доли кодов ответа.
+        size_median (int): Медиана размера ответа в байтах.
+        size_sigma (float): Разброс логарифма размера ответа.
+        lines_per_second (float): Сколько записей приходится на секунду.
+        start (datetime): Время первой записи.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Yields:
+        str: Строки лога без перевода строки.
+    """
+    rng = random.Random(seed)
+    statuses = statuses or DEFAULT_STATUSES
+    status_codes = list(statuses)
+    status_weights = list(itertools.accumulate(statuses.values()))
+    resource_names = [f"/downloads/product_{rank}" for rank in range(1, resources + 1)]
+    resource_weights = list(
+        itertools.accumulate(1 / rank**skew for rank in range(1, resources + 1))
+    )
+    mu = math.log(size_median)
+    ips = [
+        f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}."
+        f"{rng.randint(1, 254)}"
+        for _ in range(1000)
+    ]
+
+    batch = 10000
+    for first in range(0, count, batch):
+        size = min(batch, count - first)
+        chosen_resources = rng.choices(
+            resource_names, cum_weights=resource_weights, k=size
+        )
+        chosen_statuses = rng.choices(status_codes, cum_weights=status_weights, k=size)
+        for i in range(size):
+            log_time = start + timedelta(seconds=(first + i) / lines_per_second)
+            status = chosen_statuses[i]
+            body_size = 0 if status == 304 else int(rng.lognormvariate(mu, size_sigma))
+            yield (
+                f"{rng.choice(ips)} - - "
+                f"[{log_time.day:02d}/{MONTHS[log_time.month - 1]}/{log_time.year}:"
+                f"{log_time:%H:%M:%S} +0000] "
+                f'"{rng.choice(METHODS)} {chosen_resources[i]} HTTP/1.1" '
+                f'{status} {body_size} "-" "{rng.choice(AGENTS)}"'
+            )
+
+
+def write_log(path, count, **params):
+    """
+    Записывает синтетический лог в файл, см. generate_lines.
+
+    Returns:
+        int: Размер файла в байтах.
+    """
+    written = 0
+    with open(path, "w") as f:
+        for line in generate_lines(count, **params):
+            written += f.write(line + "\n")
+    return written
+
+
+def add_generator_arguments(parser):
+    """Параметры генератора в командной строке, общие с benchmarks.suite."""
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--resources", type=int, default=100)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument(
+        "--statuses",
+        type=parse_statuses,
+        default=DEFAULT_STATUSES,
+        help='Shares of status codes, e.g. "200:70,304:20,404:8,500:2"',
+    )
+    parser.add_argument("--size-median", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generator_params(args):
+    """Параметры generate_lines из разобранных аргументов командной строки."""
+    return {
+        "resources": args.resources,
+        "skew": args.skew,
+        "statuses": args.statuses,
+        "size_median": args.size_median,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic NGINX log generator")
+    parser.add_argument("path")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    size = write_log(args.path, args.lines, **generator_params(args))
+    print(f"{args.lines} lines, {size} bytes written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Набор бенчмарков анализатора: скорость и задержка этапов обработки и пиковая
+память процесса.
+
+Каждый этап запускается в отдельном процессе, чтобы пиковая память (RSS)
+относилась только к нему. Результаты сохраняются в JSON; с параметром
+--compare они сравниваются с сохранёнными ранее, и если скорость какого-либо
+этапа упала больше чем на --threshold, программа завершается с кодом 1.
+
+Запуск:
+    python -m benchmarks.suite [--output results.json] [--compare base.json]
+        [--threshold 0.1] [--repeat N] [--stage STAGE ...] [--log FILE ...]
+        [параметры генератора, см. benchmarks.generate]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from unittest.mock import patch
+
+from benchmarks.generate import add_generator_arguments, generator_params, write_log
+from src import main as analyzer
+from src.file_handler import load_logs_from_file, load_logs_from_files
+from src.instrumentation import max_rss_mb
+from src.log_parser import StringTable, parse_log_line
+from src.log_stats import LogStatistics
+from src.pipeline import AnalysisOptions, analyze_lines
+
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs.txt")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Версия формата файла результатов
+RESULTS_VERSION = 1
+
+# Сколько раз вычисляется процентиль за одно измерение
+PERCENTILE_CALLS = 1000
+
+# Допустимое падение скорости этапа относительно сохранённых результатов
+DEFAULT_THRESHOLD = 0.1
+
+# Модуль, время импорта которого измеряет этап startup
+STARTUP_MODULE = "src.main"
+
+# Ширина корзин времени этапов timeseries
+TIMESERIES_SECONDS = 3600
+
+
+def parsed_records(lines, fields=LogStatistics.RECORD_FIELDS):
+    """Разобранные записи строк лога без нераспознанных строк."""
+    records = []
+    for line in lines:
+        try:
+            log_record = parse_log_line(line, fields)
+        except ValueError:
+            continue
+        if log_record is not None:
+            records.append(log_record)
+    return records
+
+
+def bench_parse(path, lines):
+    for line in lines:
+        parse_log_line(line)
+    return len(lines)
+
+
+def bench_update(path, lines, records):
+    stats = LogStatistics()
+    for log_record in records:
+        stats.update(log_record)
+    return len(records)
+
+
+def bench_percentile(path, lines, stats):
+    for _ in range(PERCENTILE_CALLS):
+        stats.percentile_95()
+    return PERCENTILE_CALLS
+
+
+def bench_load(path, lines):
+    count = 0
+    for _ in load_logs_from_files(path):
+        count += 1
+    return count
+
+
+def bench_main(path, lines):
+    argv = ["analyzer", "--path", path, "--no-cache"]
+    with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+        analyzer.main()
+    return len(lines)
+
+
+def bench_timeseries(path, lines, interned=False):
+    # Разбор и подсчёт с часовыми корзинами, где одни и те же ресурсы
+    # хранятся в счётчиках многих корзин
+    options = AnalysisOptions(bucket_seconds=TIMESERIES_SECONDS)
+    strings = StringTable() if interned else None
+    analyze_lines(lines, options.statistics(), options, strings)
+    return len(lines)
+
+
+def import_time(module=STARTUP_MODULE):
+    """
+    Время импорта модуля в новом интерпретаторе по данным python -X importtime.
+
+    Returns:
+        float: Время импорта модуля вместе с его зависимостями в секундах.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Строки вида "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e6
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def bench_startup(path, lines):
+    return 1, import_time()
+
+
+def _filled_stats(lines, exact_quantiles):
+    stats = LogStatistics(exact_quantiles)
+    for log_record in parsed_records(lines):
+        stats.update(log_record)
+    return stats
+
+
+# Этапы: функция измерения и подготовка её дополнительных аргументов, которая
+# в замер не входит. Функция возвращает количество обработанных элементов
+# или, если время измеряет она сама, пару из количества и времени в секундах.
+STAGES = {
+    "parse_log_line": (bench_parse, lambda lines: ()),
+    "update": (bench_update, lambda lines: (parsed_records(lines),)),
+    "percentile_95": (
+        bench_percentile,
+        lambda lines: (_filled_stats(lines, exact_quantiles=False),),
+    ),
+    "percentile_95_exact": (
+        bench_percentile,
+        lambda lines: (_filled_stats(lines, exact_quantiles=True),),
+    ),
+    "load_logs_from_files": (bench_load, lambda lines: ()),
+    "main": (bench_main, lambda lines: ()),
+    "startup": (bench_startup, lambda lines: ()),
+    "timeseries": (bench_timeseries, lambda lines: ()),
+    "timeseries_interned": (bench_timeseries, lambda lines: (True,)),
+}
+
+
+def run_stage(stage, path, repeat):
+    """
+    Измерение одного этапа на файле логов; выполняется в отдельном процессе.
+
+    Args:
+        stage (str): Название этапа, см. STAGES.
+        path (str): Путь к файлу логов.
+        repeat (int): Количество измерений; в результат идёт лучшее.
+
+    Returns:
+        dict: Количество элементов, лучшее время в секундах, скорость
+        в элементах в секунду, задержка на элемент в микросекундах и пиковая
+        память процесса в МиБ.
+    """
+    bench, prepare = STAGES[stage]
+    lines = list(load_logs_from_file(path))
+    extra = prepare(lines)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = bench(path, lines, *extra)
+        seconds = time.perf_counter() - started
+        if isinstance(items, tuple):
+            items, seconds = items
+        best = min(best, seconds)
+    return {
+        "items": items,
+        "seconds": best,
+        "items_per_second": items / best if best else None,
+        "latency_us": best / items * 1e6 if items else None,
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+def run_suite(datasets, stages, repeat):
+    """
+    Измерение этапов на всех наборах данных.
+
+    Args:
+        datasets (dict[str, str]): Пути к файлам логов по названиям наборов.
+        stages (list[str]): Названия этапов.
+        repeat (int): Количество измерений каждого этапа.
+
+    Returns:
+        dict[str, dict[str, dict]]: Результаты run_stage по наборам и этапам.
+    """
+    results = {}
+    context = get_context("spawn")
+    for name, path in datasets.items():
+        results[name] = {}
+        for stage in stages:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                results[name][stage] = executor.submit(
+                    run_stage, stage, path, repeat
+                ).result()
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Этапы, скорость которых упала относительно сохранённых результатов.
+
+    Сравниваются только наборы данных и этапы, которые есть в обоих
+    результатах.
+
+    Args:
+        results (dict): Новые результаты, см. run_suite.
+        baseline (dict): Сохранённые результаты того же вида.
+        threshold (float): Допустимое относительное падение скорости.
+
+    Returns:
+        list[str]: Описания падений скорости больше threshold.
+    """
+    regressions = []
+    for name, stages in results.items():
+        for stage, result in stages.items():
+            previous = baseline.get(name, {}).get(stage)
+            if not previous or not previous.get("items_per_second"):
+                continue
+            ratio = result["items_per_second"] / previous["items_per_second"]
+            if ratio < 1 - threshold:
+                regressions.append(
+                    f"{name}/{stage}: {result['items_per_second']:,.0f}/s vs "
+                    f"{previous['items_per_second']:,.0f}/s ({ratio - 1:+.1%})"
+                )
+    return regressions
+
+
+def format_results(results):
+    """Таблица результатов для вывода в консоль."""
+    rows = [
+        f"{'dataset':<12} {'stage':<22} {'items/s':>14} {'latency, us':>12} "
+        f"{'max RSS, MiB':>13}"
+    ]
+    for name, stages in results.items():
+        for stage, result in stages.items():
+            rss = result["max_rss_mb"]
+            rows.append(
+                f"{name:<12} {stage:<22} {result['items_per_second']:>14,.0f} "
+                f"{result['latency_us']:>12.3f} "
+                f"{'-' if rss is None else f'{rss:.1f}':>13}"
+            )
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log analyzer benchmark suite")
+    parser.add_argument("--output", help="Save results to this JSON file")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stage", action="append", choices=list(STAGES))
+    parser.add_argument(
+        "--log",
+        action="append",
+        default=[],
+        help="Additional log file to benchmark on",
+    )
+    parser.add_argument(
+        "--no-synthetic", action="store_true", help="Skip the generated log"
+    )
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    params = generator_params(args)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        datasets = {"logs.txt": DEFAULT_LOG_FILE}
+        if not args.no_synthetic:
+            datasets["synthetic"] = os.path.join(tmp_dir, "synthetic.log")
+            write_log(datasets["synthetic"], args.lines, **params)
+        for path in args.log:
+            datasets[os.path.basename(path)] = path
+        results = run_suite(datasets, args.stage or list(STAGES), args.repeat)
+
+    print(format_results(results))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "version": RESULTS_VERSION,
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "generator": {
+                        "lines": args.lines,
+                        **params,
+                        "statuses": {str(k): v for k, v in params["statuses"].items()},
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print("\nThroughput regressions:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print(f"\nNo throughput regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,10 @@ setup(
     install_requires=[
         "requests",
     ],
+    extras_require={
+        "columnar": ["numpy"],
+        "zstd": ["zstandard"],
+    },
     entry_points={
         "console_scripts": [
             "analyzer=src.main:main",
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict
+
+# Версия формата записей кэша; при её изменении старые записи не используются
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "log-analyzer",
+)
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Размер блока для подсчёта хэша содержимого файла
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_identity(path, use_hash=False):
+    """
+    Признаки, по которым определяется, что файл не изменился.
+
+    Args:
+        path (str): Путь к файлу.
+        use_hash (bool): Добавить ли SHA-256 содержимого файла. Это надёжнее
+            размера и времени изменения, но требует прочитать файл целиком.
+
+    Returns:
+        dict: Абсолютный путь, размер, время изменения и, возможно, хэш.
+    """
+    stat = os.stat(path)
+    identity = {
+        "path": os.path.realpath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if use_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        identity["sha256"] = digest.hexdigest()
+    return identity
+
+
+class AggregateCache:
+    """
+    Дисковый кэш агрегатов файлов логов с вытеснением давно неиспользуемых записей.
+
+    Каждая запись хранится в отдельном JSON-файле, имя которого — хэш от
+    признаков файла логов и параметров обработки. Время изменения файла записи
+    обновляется при каждом попадании в кэш, поэтому при превышении лимитов
+    удаляются записи, которые дольше всего не использовались.
+
+    Attributes:
+        directory (str): Каталог кэша.
+        max_entries (int): Максимальное количество записей.
+        max_bytes (int): Максимальный суммарный размер записей в байтах.
+        use_hash (bool): Учитывать ли хэш содержимого файлов логов.
+    """
+
+    def __init__(
+        self,
+        directory=DEFAULT_CACHE_DIR,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        use_hash=False,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.use_hash = use_hash
+
+    def key(self, path, options):
+        """
+        Ключ записи для файла логов и параметров его обработки.
+
+        Args:
+            path (str): Путь к файлу логов.
+            options (AnalysisOptions): Параметры, от которых зависит агрегат.
+
+        Returns:
+            str: Шестнадцатеричный ключ записи.
+        """
+        material = [CACHE_VERSION, file_identity(path, self.use_hash), asdict(options)]
+        return hashlib.sha256(
+            json.dumps(material, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Читает запись кэша.
+
+        Повреждённая запись удаляется и считается отсутствующей.
+
+        Returns:
+            dict | None: Сохранённые данные или None, если записи нет.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._remove(path)
+            return None
+        # Отмечаем запись как недавно использованную
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        """
+        Сохраняет запись кэша и вытесняет старые записи при превышении лимитов.
+
+        Ошибки записи не прерывают анализ: кэш лишь ускоряет повторные запуски.
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые давно использованные записи сверх лимитов."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            count -= 1
+            total_bytes -= size
+
+    def clear(self):
+        """Удаляет все записи кэша."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, replace
+
+from src.cache import DEFAULT_CACHE_DIR
+from src.file_handler import AppendedLinesReader
+from src.log_stats import LogStatistics
+from src.pipeline import analyze_lines
+
+# Версия формата контрольных точек; при её изменении подсчёт начинается заново
+CHECKPOINT_VERSION = 1
+
+DEFAULT_STATE_DIR = os.path.join(DEFAULT_CACHE_DIR, "checkpoints")
+
+# Сколько первых байт файла запоминается, чтобы заметить его замену
+# с сохранением inode (copytruncate с последующей дозаписью)
+FINGERPRINT_SIZE = 1024
+
+
+def checkpoint_key(path, options):
+    # Движок подсчёта не влияет на статистику, поэтому не входит в ключ
+    options = replace(options, engine="row")
+    material = [CHECKPOINT_VERSION, os.path.realpath(path), asdict(options)]
+    return hashlib.sha256(
+        json.dumps(material, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def file_fingerprint(path, length):
+    """SHA-256 первых length байт файла."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def find_rotated_file(path, device, inode):
+    """
+    Поиск файла, в который logrotate переименовал отслеживаемый файл.
+
+    Ищется файл из того же каталога с прежними устройством и inode, например
+    access.log.1 для access.log.
+
+    Returns:
+        str | None: Путь к переименованному файлу или None.
+    """
+    directory = os.path.dirname(path) or "."
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if (stat.st_dev, stat.st_ino) == (device, inode):
+                    return entry.path
+    except OSError:
+        pass
+    return None
+
+
+class CheckpointStore:
+    """
+    Хранилище контрольных точек инкрементальной обработки растущих файлов.
+
+    Контрольная точка файла содержит его устройство и inode, смещение после
+    последней обработанной строки, отпечаток начала файла и накопленную
+    статистику. Следующий запуск читает только дописанные байты.
+
+    В отличие от записей кэша контрольные точки не вытесняются: накопленную
+    статистику нельзя восстановить из файла, который уже повернули или усекли.
+    Каждая точка хранится в отдельном JSON-файле и заменяется атомарно.
+
+    Attributes:
+        directory (str): Каталог с контрольными точками.
+    """
+
+    def __init__(self, directory=DEFAULT_STATE_DIR):
+        self.directory = directory
+
+    def _checkpoint_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        """
+        Читает контрольную точку.
+
+        Returns:
+            dict | None: Сохранённые данные или None, если точки нет, она
+            повреждена или записана в другой версии формата.
+        """
+        try:
+            with open(self._checkpoint_path(key), encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            return None
+        return checkpoint
+
+    def save(self, key, checkpoint):
+        """
+        Сохраняет контрольную точку: данные записываются во временный файл,
+        сбрасываются на диск и заменяют прежнюю точку, поэтому прерванный
+        запуск оставляет прежнюю точку целой.
+
+        Raises:
+            OSError: Если точку не удалось записать.
+        """
+        path = self._checkpoint_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(checkpoint, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def analyze(self, path, options):
+        """
+        Дополняет накопленную статистику файла строками, дописанными с прошлого запуска.
+
+        Ротация файла учитывается так:
+
+        - inode изменился (logrotate переименовал файл) — сначала дочитывается
+          хвост старого файла, если он найден рядом, затем новый файл читается
+          с начала;
+        - файл стал короче сохранённого смещения или его начало изменилось
+          (copytruncate) — файл читается с начала.
+
+        В обоих случаях уже накопленная статистика сохраняется: она описывает
+        весь поток записей, прошедший через файл.
+
+        Args:
+            path (str): Путь к локальному файлу логов.
+            options (AnalysisOptions): Параметры фильтрации.
+
+        Returns:
+            tuple[LogStatistics, bool]: Накопленная статистика файла и признак
+            того, что в нём нашлись подходящие записи.
+        """
+        key = checkpoint_key(path, options)
+        checkpoint = self.load(key)
+
+        stat = os.stat(path)
+        if checkpoint is None:
+            stats = options.statistics()
+            has_valid_logs = False
+            offset = 0
+        else:
+            stats = LogStatistics.from_dict(checkpoint["stats"])
+            has_valid_logs = checkpoint["has_valid_logs"]
+            offset = checkpoint["offset"]
+
+            if (stat.st_dev, stat.st_ino) != (
+                checkpoint["device"],
+                checkpoint["inode"],
+            ):
+                rotated = find_rotated_file(
+                    path, checkpoint["device"], checkpoint["inode"]
+                )
+                if rotated is not None:
+                    # В переименованный файл больше не пишут, поэтому
+                    # его последняя строка уже окончательная
+                    reader = AppendedLinesReader(rotated, offset, complete_only=False)
+                    has_valid_logs |= analyze_lines(reader, stats, options)
+                offset = 0
+            elif stat.st_size < offset or (
+                file_fingerprint(path, min(offset, FINGERPRINT_SIZE))
+                != checkpoint["fingerprint"]
+            ):
+                offset = 0
+
+        offset, file_has_valid_logs = self._consume(path, offset, stats, options)
+        has_valid_logs |= file_has_valid_logs
+
+        self.save(
+            key,
+            {
+                "version": CHECKPOINT_VERSION,
+                "path": os.path.realpath(path),
+                "device": stat.st_dev,
+                "inode": stat.st_ino,
+                "offset": offset,
+                "fingerprint": file_fingerprint(path, min(offset, FINGERPRINT_SIZE)),
+                "has_valid_logs": has_valid_logs,
+                "stats": stats.to_dict(),
+            },
+        )
+        return stats, has_valid_logs
+
+    @staticmethod
+    def _consume(path, offset, stats, options):
+        reader = AppendedLinesReader(path, offset)
+        has_valid_logs = analyze_lines(reader, stats, options)
+        return reader.offset, has_valid_logs
@@ -0,0 +1,391 @@
+from datetime import timedelta
+
+from src.log_parser import (
+    TIMESTAMP_FIELD,
+    parse_log_line_regex,
+    parse_log_timestamp,
+    split_log_line,
+)
+from src.log_stats import LogStatistics
+from src.sketches import stable_hash
+from src.pipeline import EPOCH, FileSummary
+
+# NumPy — необязательная зависимость: без неё колоночный движок недоступен
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+
+# Сколько строк копится перед векторной агрегацией
+BATCH_SIZE = 65536
+
+# Поля, хэши значений которых пакет собирает для количества различных
+# значений; ресурсы и так кодируются номерами
+HASHED_FIELDS = ("ip", "agent")
+
+# Индексы значений в кортеже split_log_line
+VALUE_INDEX = {
+    "ip": 0,
+    "method": 2,
+    "resource": 3,
+    "status": 4,
+    "size": 5,
+    "agent": 6,
+}
+
+
+def is_available():
+    """Доступен ли колоночный движок (установлен ли NumPy)."""
+    return np is not None
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("The columnar engine requires numpy: pip install numpy")
+
+
+def _reject(log_record):
+    return False
+
+
+def _filter_record(values, fields):
+    # Запись только с полями, которые читают условия фильтров
+    log_record = {}
+    for field in fields:
+        index = VALUE_INDEX.get(field)
+        if index is not None:
+            value = values[index]
+            if field == "status":
+                value = int(value)
+            elif field == "size":
+                value = int(value) if value != "-" else 0
+            log_record[field] = value
+    return log_record
+
+
+class ColumnBatch:
+    """
+    Столбцы значений разобранных строк до векторной агрегации.
+
+    Строки разбиваются функцией split_log_line без создания словаря на каждую
+    запись, а значения копятся в списках, которые метод columns превращает
+    в массивы NumPy. Ресурсы заменяются целыми номерами в порядке первого
+    появления, поэтому агрегаты сохраняют порядок построчного движка.
+
+    Attributes:
+        record_filter (RecordFilter): Фильтры запуска.
+        keep_all (bool): Добавлять ли строки, не прошедшие предварительную
+            проверку, с отметкой о непрохождении условий. Нужно для сводки
+            файла, в которой учитывается время всех записей.
+        with_time (bool): Собирать ли столбец времени; он собирается всегда,
+            если его читают фильтры, нужен сводке файла или корзинам времени
+            статистики.
+        resource_ids (dict[str, int]): Номера ресурсов в порядке первого появления.
+        resource_names (list[str]): Ресурсы по номерам.
+        strings (StringTable | None): Таблица интернирования, через которую
+            проходят новые ресурсы пакета.
+        distinct (bool): Собирать ли для количества различных значений
+            столбцы хэшей ip и user-agent (см. stable_hash). Хэши вместо
+            номеров не требуют хранить все различные значения файла.
+    """
+
+    def __init__(
+        self,
+        record_filter,
+        keep_all=False,
+        strings=None,
+        distinct=False,
+        with_time=False,
+    ):
+        require_numpy()
+        self.record_filter = record_filter
+        self.keep_all = keep_all
+        self.strings = strings
+        self.distinct = distinct
+        self.with_time = (
+            with_time or keep_all or TIMESTAMP_FIELD in record_filter.fields
+        )
+        self.resource_ids = {}
+        self.resource_names = []
+        fields = LogStatistics.record_fields(distinct) | record_filter.fields
+        self._fallback_fields = fields | {TIMESTAMP_FIELD} if self.with_time else fields
+        self._reset()
+
+    def _reset(self):
+        self.timestamps = []
+        self.statuses = []
+        self.sizes = []
+        self.resources = []
+        self.passed = []
+        self.hashes = {field: [] for field in HASHED_FIELDS}
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def append(self, line):
+        """
+        Добавляет строку в столбцы.
+
+        Returns:
+            bool: True, если строка разобрана; False, если она не
+            соответствует формату или отброшена до разбора.
+        """
+        prefilter = self.record_filter.prefilter
+        matches_fields = self.record_filter.matches_fields
+        if prefilter is not None and not prefilter(line):
+            if not self.keep_all:
+                return False
+            # Условия на поля заведомо не выполнены, проверять их не нужно
+            matches_fields = _reject
+
+        values = split_log_line(line)
+        if values is not None:
+            resource = values[3]
+            status = int(values[4])
+            size = int(values[5]) if values[5] != "-" else 0
+            if self.with_time:
+                self.timestamps.append(parse_log_timestamp(values[1]))
+            if matches_fields is not None:
+                self.passed.append(
+                    matches_fields(_filter_record(values, self.record_filter.fields))
+                )
+            if self.distinct:
+                self.hashes["ip"].append(stable_hash(values[0]))
+                self.hashes["agent"].append(stable_hash(values[6]))
+        else:
+            log_record = parse_log_line_regex(line, self._fallback_fields)
+            if log_record is None:
+                return False
+            resource = log_record["resource"]
+            status = log_record["status"]
+            size = log_record["size"]
+            if self.with_time:
+                self.timestamps.append(log_record[TIMESTAMP_FIELD])
+            if matches_fields is not None:
+                self.passed.append(matches_fields(log_record))
+            if self.distinct:
+                self.hashes["ip"].append(stable_hash(log_record["ip"]))
+                self.hashes["agent"].append(stable_hash(log_record["agent"]))
+
+        resource_id = self.resource_ids.get(resource)
+        if resource_id is None:
+            if self.strings is not None:
+                resource = self.strings.setdefault(resource, resource)
+            resource_id = self.resource_ids[resource] = len(self.resource_names)
+            self.resource_names.append(resource)
+        self.resources.append(resource_id)
+        self.statuses.append(status)
+        self.sizes.append(size)
+        return True
+
+    def columns(self):
+        """
+        Забирает накопленные столбцы в виде массивов NumPy.
+
+        Returns:
+            dict[str, numpy.ndarray]: Столбцы "ts" (int64, если собирается
+            время), "status" (int16), "size" (int64), "resource" (int32),
+            "ip" и "agent" (uint64, хэши, если собираются) и "passed" (bool,
+            прошла ли запись условия на поля).
+        """
+        columns = {
+            "status": _array(self.statuses, np.int16),
+            "size": _array(self.sizes, np.int64),
+            "resource": np.array(self.resources, dtype=np.int32),
+        }
+        if self.with_time:
+            columns[TIMESTAMP_FIELD] = np.array(self.timestamps, dtype=np.int64)
+        if self.distinct:
+            for field in HASHED_FIELDS:
+                columns[field] = np.array(self.hashes[field], dtype=np.uint64)
+        if self.record_filter.matches_fields is not None:
+            columns["passed"] = np.array(self.passed, dtype=bool)
+        else:
+            columns["passed"] = np.ones(len(self.statuses), dtype=bool)
+        self._reset()
+        return columns
+
+    def date_mask(self, columns):
+        """Маска записей, попадающих в диапазон дат фильтров."""
+        mask = np.ones(len(columns["status"]), dtype=bool)
+        if self.record_filter.start is not None:
+            mask &= columns[TIMESTAMP_FIELD] >= self.record_filter.start
+        if self.record_filter.end is not None:
+            mask &= columns[TIMESTAMP_FIELD] < self.record_filter.end
+        return mask
+
+    def aggregate(self, columns, mask, stats):
+        """
+        Статистика записей, отмеченных маской, см. aggregate_columns.
+
+        Args:
+            columns (dict[str, numpy.ndarray]): Столбцы, см. columns.
+            mask (numpy.ndarray): Маска записей.
+            stats (LogStatistics): Пустая статистика с параметрами подсчёта,
+                которую нужно заполнить.
+
+        Returns:
+            LogStatistics: Заполненная статистика.
+        """
+        return aggregate_columns(columns, mask, stats, self.resource_names)
+
+
+def aggregate_columns(columns, mask, stats, resource_names):
+    """
+    Статистика записей столбцов, отмеченных маской.
+
+    Args:
+        columns (dict[str, numpy.ndarray]): Столбцы "resource" (номера
+            ресурсов), "status", "size", а также "ts", если статистика делится
+            на корзины времени, и хэши "ip" и "agent", если она считает
+            различные значения.
+        mask (numpy.ndarray): Маска записей.
+        stats (LogStatistics): Пустая статистика с параметрами подсчёта,
+            которую нужно заполнить.
+        resource_names (list[str]): Ресурсы по номерам.
+
+    Returns:
+        LogStatistics: Статистика, в которой ресурсы и коды статусов идут
+        в порядке первого появления среди отмеченных записей.
+    """
+    resources = columns["resource"][mask]
+    if not len(resources):
+        return stats
+
+    stats.total_requests = len(resources)
+    for value, count in _counts_by_first_appearance(resources):
+        stats.resources[resource_names[value]] = count
+    for value, count in _counts_by_first_appearance(columns["status"][mask]):
+        stats.status_codes[value] = count
+
+    sizes = columns["size"][mask]
+    stats.total_size = int(sizes.sum())
+    # Корзины гистограммы вычисляются её же методом для каждого различного
+    # размера, поэтому совпадают с построчным движком до последнего бита
+    values, counts = np.unique(sizes, return_counts=True)
+    for value, count in zip(values.tolist(), counts.tolist()):
+        stats.response_sizes.add(value, count)
+
+    # Каждое различное значение пакета добавляется в сводку один раз
+    for field, sketch in stats.distinct.items():
+        if field == "resource":
+            for value in np.unique(resources).tolist():
+                sketch.add(resource_names[value])
+        else:
+            for hashed in np.unique(columns[field][mask]).tolist():
+                sketch.add_hash(hashed)
+
+    if stats.buckets is not None:
+        timestamps = columns[TIMESTAMP_FIELD]
+        starts = timestamps - timestamps % stats.bucket_seconds
+        for start in np.unique(starts[mask]).tolist():
+            stats.buckets[start] = aggregate_columns(
+                columns, mask & (starts == start), stats.new_bucket(), resource_names
+            )
+    return stats
+
+
+def _array(values, dtype):
+    try:
+        return np.array(values, dtype=dtype)
+    except OverflowError:
+        # Значение не помещается в тип столбца: храним целые числа Python
+        return np.array(values, dtype=object)
+
+
+def _counts_by_first_appearance(column):
+    """Пары «значение — количество» в порядке первого появления значения."""
+    values, first, counts = np.unique(column, return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return zip(values[order].tolist(), counts[order].tolist())
+
+
+def analyze_lines_columnar(lines, stats, options, batch_size=BATCH_SIZE, strings=None):
+    """
+    Колоночный аналог pipeline.analyze_lines.
+
+    Args:
+        lines (Iterable[str]): Строки логов.
+        stats (LogStatistics): Статистика, которую нужно дополнить; подойдёт
+            любой объект с методом merge(LogStatistics).
+        options (AnalysisOptions): Параметры фильтрации.
+        batch_size (int): Сколько строк агрегируется за раз.
+        strings (StringTable, optional): Таблица интернирования ресурсов.
+
+    Returns:
+        bool: True, если хотя бы одна запись попала в статистику.
+    """
+    if strings is not None:
+        strings.trim()
+    batch = ColumnBatch(
+        options.record_filter(),
+        strings=strings,
+        distinct=bool(options.distinct_precision),
+        with_time=bool(options.bucket_seconds),
+    )
+    has_valid_logs = False
+
+    def flush():
+        columns = batch.columns()
+        mask = columns["passed"] & batch.date_mask(columns)
+        if not mask.any():
+            return False
+        stats.merge(batch.aggregate(columns, mask, options.statistics()))
+        return True
+
+    for log_line in lines:
+        batch.append(log_line)
+        if len(batch) >= batch_size:
+            has_valid_logs |= flush()
+    if len(batch):
+        has_valid_logs |= flush()
+    return has_valid_logs
+
+
+def summarize_lines_columnar(lines, options, batch_size=BATCH_SIZE):
+    """
+    Колоночный аналог pipeline.summarize_lines.
+
+    Returns:
+        tuple[FileSummary, LogStatistics, bool]: Сводка файла без учёта
+        диапазона дат, статистика с его учётом и признак подходящих записей.
+    """
+    # Время нужно всегда: по нему вычисляются границы времени файла
+    batch = ColumnBatch(
+        options.record_filter(),
+        keep_all=True,
+        distinct=bool(options.distinct_precision),
+    )
+    summary = FileSummary(options.statistics())
+    stats = options.statistics()
+    has_valid_logs = False
+    min_time = max_time = None
+
+    def flush():
+        nonlocal has_valid_logs, min_time, max_time
+        columns = batch.columns()
+        timestamps = columns[TIMESTAMP_FIELD]
+        low, high = int(timestamps.min()), int(timestamps.max())
+        min_time = low if min_time is None else min(min_time, low)
+        max_time = high if max_time is None else max(max_time, high)
+
+        passed = columns["passed"]
+        if passed.any():
+            summary.stats.merge(batch.aggregate(columns, passed, options.statistics()))
+            summary.has_valid_logs = True
+            mask = passed & batch.date_mask(columns)
+            if mask.any():
+                stats.merge(batch.aggregate(columns, mask, options.statistics()))
+                has_valid_logs = True
+
+    for log_line in lines:
+        batch.append(log_line)
+        if len(batch) >= batch_size:
+            flush()
+    if len(batch):
+        flush()
+
+    if min_time is not None:
+        summary.min_time = EPOCH + timedelta(seconds=min_time)
+        summary.max_time = EPOCH + timedelta(seconds=max_time)
+    return summary, stats, has_valid_logs
@@ -0,0 +1,331 @@
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import struct
+import threading
+import zlib
+
+# zstandard — необязательная зависимость: без неё файлы zstd не читаются
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - зависит от окружения
+    zstandard = None
+
+# Сигнатуры в начале сжатых файлов
+MAGIC_NUMBERS = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+# Размер блока распакованных данных при последовательной распаковке
+DECOMPRESS_BLOCK_SIZE = 1 << 20
+
+# Сколько распакованных блоков может ждать разбора
+PREFETCH_DEPTH = 4
+
+# Сколько сжатых байт независимых кадров распаковывается одной задачей
+FRAME_GROUP_SIZE = 1 << 18
+
+# Количество потоков распаковки независимых кадров. Библиотеки сжатия
+# отпускают GIL на время распаковки, поэтому потоки распаковывают параллельно.
+DECOMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+
+ZSTD_FRAME_MAGIC = 0xFD2FB528
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+
+
+def detect_compression(file_name):
+    """
+    Определение формата сжатия файла по сигнатуре в его начале.
+
+    Args:
+        file_name (str): Путь к файлу.
+
+    Returns:
+        str | None: "gzip", "bz2", "xz", "zstd" или None для несжатого файла.
+    """
+    with open(file_name, "rb") as f:
+        head = f.read(6)
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_decompressed(file_name, compression):
+    """
+    Открывает сжатый файл для потокового чтения распакованных байт.
+
+    Raises:
+        ImportError: Если для формата zstd не установлен пакет zstandard.
+    """
+    if compression == "gzip":
+        return gzip.open(file_name, "rb")
+    if compression == "bz2":
+        return bz2.open(file_name, "rb")
+    if compression == "xz":
+        return lzma.open(file_name, "rb")
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(file_name, "rb"), read_across_frames=True, closefd=True
+        )
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError(
+            "Reading zstd files requires zstandard: pip install zstandard"
+        )
+
+
+def zstd_frames(f):
+    """
+    Границы кадров файла zstd без распаковки.
+
+    Размеры блоков записаны в их заголовках, поэтому кадры находятся чтением
+    одних заголовков. Пропускаемые кадры (например, таблица поиска формата
+    seekable zstd) в результат не входят.
+
+    Args:
+        f: Файл, открытый в двоичном режиме.
+
+    Returns:
+        list[tuple[int, int]] | None: Диапазоны байт кадров или None, если
+        файл повреждён.
+    """
+    frames = []
+    size = os.fstat(f.fileno()).st_size
+    position = 0
+    while position < size:
+        f.seek(position)
+        header = f.read(14)
+        if len(header) < 8:
+            return None
+        magic = struct.unpack_from("<I", header)[0]
+        if magic & 0xFFFFFFF0 == ZSTD_SKIPPABLE_MAGIC:
+            position += 8 + struct.unpack_from("<I", header, 4)[0]
+            continue
+        if magic != ZSTD_FRAME_MAGIC:
+            return None
+
+        descriptor = header[4]
+        single_segment = descriptor >> 5 & 1
+        content_size_bytes = (1 if single_segment else 0, 2, 4, 8)[descriptor >> 6]
+        dictionary_bytes = (0, 1, 2, 4)[descriptor & 3]
+        checksum_bytes = 4 if descriptor >> 2 & 1 else 0
+        start = position
+        position += 5 + (not single_segment) + dictionary_bytes + content_size_bytes
+
+        while True:
+            f.seek(position)
+            block_header = f.read(3)
+            if len(block_header) < 3:
+                return None
+            block = int.from_bytes(block_header, "little")
+            block_type, block_size = block >> 1 & 3, block >> 3
+            # Блок RLE хранит один байт, повторяемый block_size раз
+            position += 3 + (1 if block_type == 1 else block_size)
+            if block & 1:
+                break
+        position += checksum_bytes
+        frames.append((start, position))
+    return frames if position == size else None
+
+
+def bgzf_blocks(f):
+    """
+    Границы блоков файла BGZF (gzip, созданного bgzip) без распаковки.
+
+    Каждый блок BGZF — отдельный член gzip, размер которого записан
+    в дополнительном поле заголовка.
+
+    Args:
+        f: Файл, открытый в двоичном режиме.
+
+    Returns:
+        list[tuple[int, int]] | None: Диапазоны байт блоков или None, если
+        файл не в формате BGZF.
+    """
+    blocks = []
+    size = os.fstat(f.fileno()).st_size
+    position = 0
+    while position < size:
+        f.seek(position)
+        header = f.read(18)
+        # ID1 ID2 CM FLG с FEXTRA, XLEN = 6 и подполе BC длиной 2
+        if (
+            len(header) < 18
+            or header[:4] != b"\x1f\x8b\x08\x04"
+            or header[10:16] != b"\x06\x00BC\x02\x00"
+        ):
+            return None
+        end = position + struct.unpack_from("<H", header, 16)[0] + 1
+        blocks.append((position, end))
+        position = end
+    return blocks if position == size else None
+
+
+def independent_frames(file_name, compression):
+    """
+    Группы независимо распаковываемых кадров сжатого файла.
+
+    Поддерживаются кадры zstd (в том числе формата seekable zstd) и блоки
+    BGZF. Соседние кадры объединяются в группы примерно по FRAME_GROUP_SIZE
+    сжатых байт.
+
+    Returns:
+        list[tuple[int, int]] | None: Диапазоны байт групп или None, если
+        файл можно распаковать только последовательно.
+    """
+    with open(file_name, "rb") as f:
+        if compression == "zstd":
+            frames = zstd_frames(f)
+        elif compression == "gzip":
+            frames = bgzf_blocks(f)
+        else:
+            frames = None
+    if not frames or len(frames) < 2:
+        return None
+
+    groups = []
+    group_start, group_end = frames[0]
+    for start, end in frames[1:]:
+        if end - group_start > FRAME_GROUP_SIZE:
+            groups.append((group_start, group_end))
+            group_start = start
+        group_end = end
+    groups.append((group_start, group_end))
+    return groups
+
+
+def decompress_range(file_name, compression, start, end):
+    """Распаковывает кадры файла из диапазона байт [start, end)."""
+    with open(file_name, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if compression == "zstd":
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            data, read_across_frames=True
+        )
+        return reader.read()
+
+    parts = []
+    while data:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        parts.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b"".join(parts)
+
+
+def decompressed_blocks(file_name, compression, workers=DECOMPRESS_WORKERS):
+    """
+    Распакованное содержимое сжатого файла блоками.
+
+    Независимые кадры (zstd, BGZF) распаковываются пулом потоков, остальные
+    файлы — последовательно в фоновом потоке. В обоих случаях распаковка
+    идёт одновременно с разбором уже полученных блоков, а число готовых,
+    но не разобранных блоков ограничено.
+
+    Args:
+        file_name (str): Путь к файлу.
+        compression (str): Формат сжатия, см. detect_compression.
+        workers (int): Количество потоков распаковки кадров.
+
+    Yields:
+        bytes: Распакованные данные; границы блоков не совпадают с границами строк.
+    """
+    if compression == "zstd":
+        _require_zstandard()
+    frames = independent_frames(file_name, compression) if workers > 1 else None
+    if frames is None:
+        yield from prefetch(_read_decompressed(file_name, compression))
+        return
+
+    # Пул потоков нужен только для многокадровых файлов
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending = []
+        for start, end in frames:
+            pending.append(
+                executor.submit(decompress_range, file_name, compression, start, end)
+            )
+            if len(pending) >= workers + PREFETCH_DEPTH:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _read_decompressed(file_name, compression):
+    with open_decompressed(file_name, compression) as f:
+        while True:
+            block = f.read(DECOMPRESS_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+_DONE = object()
+
+
+class _Failure:
+    # Исключение фонового потока, переданное через очередь
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(items, depth=PREFETCH_DEPTH):
+    """
+    Получение элементов итератора в фоновом потоке с опережением.
+
+    Фоновый поток готовит не больше depth элементов вперёд. Исключение
+    фонового потока передаётся потребителю. Если потребитель прекращает обход,
+    фоновый поток останавливается.
+
+    Args:
+        items (Iterable): Исходный итератор.
+        depth (int): Сколько элементов может ждать потребителя.
+
+    Yields:
+        Элементы items в исходном порядке.
+    """
+    ready = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(_Failure(e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
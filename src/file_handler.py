@@ -1,47 +1,414 @@
 import glob
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import threading
+from collections import deque
 
-# Задаю размер буфера для накопления строк перед передачей в основной поток
-BUFFER_SIZE = 100
+from src import instrumentation
+from src.compressed import decompressed_blocks, detect_compression
+from src.http_loader import HttpFetcher
+
+# Размер блока, которым читаются локальные файлы
+READ_SIZE = 1 << 16
+
+# Параметры упреждающего чтения файлов: количество потоков чтения, сколько
+# пакетов строк одного файла может ждать разбора и сколько байт всех файлов
+PREFETCH_READERS = 2
+PREFETCH_DEPTH = 16
+PREFETCH_MAX_BYTES = 64 * 1024 * 1024
+
+# Размер пакета упреждающего чтения. Поток чтения после каждого блока ждёт
+# GIL, пока его не отпустит разбор, поэтому пакет крупнее, чем READ_SIZE.
+PREFETCH_READ_SIZE = 1 << 18
 
 
 def load_logs(path):
     if path.startswith("http"):
         return load_logs_from_url(path)
-    else:
-        return load_logs_from_files(path)
+    if os.path.isfile(path):
+        # Путь к конкретному файлу не нужно разворачивать шаблоном ещё раз
+        return report_errors(path, load_logs_from_file(path))
+    return load_logs_from_files(path)
+
+
+def load_logs_from_url(url, fetcher=None):
+    """Чтение логов по HTTP, см. HttpFetcher."""
+    return iter_lines(read_source(url, fetcher))
+
+
+def read_chunks(file_name, start=0, end=None, chunk_size=READ_SIZE):
+    """
+    Чтение локального файла блоками байт, выровненными по границам строк.
+
+    Файл читается методом readinto в заранее выделенный буфер. Каждый блок
+    состоит из целых строк и заканчивается переводом строки; без него может
+    закончиться только последний блок файла. Читаются строки, начинающиеся
+    в диапазоне байт [start, end). Строка, начавшаяся до start, целиком
+    принадлежит предыдущему диапазону, поэтому соседние диапазоны не теряют
+    и не дублируют строк.
+
+    Файлы gzip, bz2, xz и zstd распознаются по сигнатуре и читаются
+    распакованными. Диапазон байт сжатого файла должен начинаться с нуля
+    и читается до конца файла: split_file не делит сжатые файлы.
+
+    Args:
+        file_name (str): Путь к файлу.
+        start (int): Начало диапазона байт.
+        end (int, optional): Конец диапазона байт; None — до конца файла.
+        chunk_size (int): Размер буфера чтения.
+
+    Yields:
+        bytes: Блок целых строк.
+
+    Raises:
+        ValueError: Если диапазон сжатого файла начинается не с нуля.
+    """
+    compression = detect_compression(file_name)
+    if compression is not None:
+        if start > 0:
+            raise ValueError(f"Cannot read a byte range of compressed {file_name}")
+        yield from align_chunks(decompressed_blocks(file_name, compression))
+        return
+
+    with open(file_name, "rb") as f:
+        if start > 0:
+            # Пропускаем хвост строки, которую начал предыдущий диапазон
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        buffer = memoryview(bytearray(chunk_size))
+        remainder = b""
+
+        while end is None or position < end:
+            size = f.readinto(buffer)
+            if not size:
+                if remainder:
+                    yield remainder
+                return
+            data = remainder + buffer[:size]
+
+            if end is not None and position + len(data) >= end:
+                # Последний блок диапазона заканчивается вместе со строкой,
+                # в которую попадает байт end - 1
+                cut = data.find(b"\n", end - 1 - position) + 1
+                if cut:
+                    yield data[:cut]
+                    return
+                remainder = data
+                continue
+
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                yield data[:cut]
+                position += cut
+            remainder = data[cut:]
 
 
-def load_logs_from_url(url):
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            yield line
+def align_chunks(blocks):
+    """Перекраивает блоки байт в блоки, выровненные по границам строк."""
+    remainder = b""
+    for block in blocks:
+        data = remainder + block
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            yield data[:cut]
+        remainder = data[cut:]
+    if remainder:
+        yield remainder
+
+
+def iter_lines(chunks):
+    """
+    Строки из блоков read_chunks.
+
+    Каждый блок декодируется целиком и делится по переводам строк, поэтому
+    декодирование и выделение памяти происходят один раз на блок, а не на
+    строку. Строки возвращаются без перевода строки.
+    """
+    for chunk in instrumentation.track_reads(chunks):
+        yield from split_lines(chunk)
+
+
+def split_lines(chunk):
+    """Строки блока read_chunks без перевода строки."""
+    lines = chunk.decode("utf-8").split("\n")
+    if not lines[-1]:
+        lines.pop()
+    return lines
 
 
 def load_logs_from_file(file_name):
-    """Чтение логов из локального файла с использованием буфера."""
-    buffer = []
-    with open(file_name, "r") as f:
-        for line in f:
-            buffer.append(line)
-            if len(buffer) >= BUFFER_SIZE:
-                yield from buffer
-                buffer.clear()
-        if buffer:
-            yield from buffer
-
-
-def load_logs_from_files(path):
-    files = glob.glob(path)
-    with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(load_logs_from_file, file): file for file in files}
-        for future in as_completed(futures):
-            file = futures[future]
+    """Чтение логов из локального файла блоками, см. read_chunks."""
+    return iter_lines(read_chunks(file_name))
+
+
+def load_logs_from_range(file_name, start, end):
+    """Чтение строк локального файла, начинающихся в диапазоне байт [start, end)."""
+    return iter_lines(read_chunks(file_name, start, end))
+
+
+def read_ranges(file_name, ranges, chunk_size=READ_SIZE):
+    """Блоки строк локального файла из нескольких диапазонов байт, см. read_chunks."""
+    for start, end in ranges:
+        yield from read_chunks(file_name, start, end, chunk_size)
+
+
+def load_logs_from_ranges(file_name, ranges):
+    """Чтение строк локального файла, начинающихся в диапазонах байт ranges."""
+    return iter_lines(read_ranges(file_name, ranges))
+
+
+def decode_line(line):
+    """
+    Текст строки в UTF-8.
+
+    Строка с байтами не в UTF-8 заменяется пустой строкой, которую разбор
+    считает нераспознанной: чтение растущего файла продолжается за ней,
+    а не останавливается на ней при каждом запуске.
+    """
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        return ""
+
+
+class AppendedLinesReader:
+    """
+    Чтение законченных строк локального файла начиная с заданного смещения.
+
+    Недописанная последняя строка (без перевода строки) по умолчанию не
+    читается: она будет прочитана целиком в следующий раз. После обхода
+    атрибут offset указывает на байт, следующий за последней прочитанной строкой.
+    Строки не в UTF-8 возвращаются пустыми, см. decode_line.
+
+    Сжатый файл (например, уже ротированный access.log.1.gz) не дописывается,
+    поэтому при чтении с начала он читается распакованным целиком, а offset
+    становится равным его размеру.
+
+    Attributes:
+        file_name (str): Путь к файлу.
+        offset (int): Смещение в байтах, с которого продолжится чтение.
+        complete_only (bool): Пропускать ли недописанную последнюю строку.
+    """
+
+    def __init__(self, file_name, offset=0, complete_only=True):
+        self.file_name = file_name
+        self.offset = offset
+        self.complete_only = complete_only
+
+    def __iter__(self):
+        if self.offset == 0 and detect_compression(self.file_name) is not None:
+            size = os.path.getsize(self.file_name)
+            yield from load_logs_from_file(self.file_name)
+            self.offset = size
+            return
+
+        with open(self.file_name, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if self.complete_only and not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                yield decode_line(line)
+
+
+def split_file(file_name, chunk_size):
+    """
+    Разбиение файла на диапазоны байт размером не больше chunk_size.
+
+    Сжатый файл не делится: он читается одним диапазоном.
+    """
+    size = os.path.getsize(file_name)
+    if size <= chunk_size or detect_compression(file_name) is not None:
+        return [(0, size)]
+    return [
+        (start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)
+    ]
+
+
+def read_source(source, fetcher=None, ranges=None):
+    """
+    Блоки целых строк локального файла или URL.
+
+    Args:
+        source (str): Путь к файлу или URL.
+        fetcher (HttpFetcher, optional): Загрузчик URL; по умолчанию создаётся
+            новый.
+        ranges (list[tuple[int, int]], optional): Диапазоны байт локального
+            файла, которые нужно прочитать; None — весь файл.
+
+    Returns:
+        Iterator[bytes]: Блоки строк, см. read_chunks.
+    """
+    if source.startswith("http"):
+        return align_chunks((fetcher or HttpFetcher()).blocks(source))
+    if ranges is not None:
+        return read_ranges(source, ranges, PREFETCH_READ_SIZE)
+    return read_chunks(source, chunk_size=PREFETCH_READ_SIZE)
+
+
+def report_errors(file_name, lines, errors=None):
+    """
+    Строки файла, при ошибке чтения которого выводится сообщение.
+
+    Строки, прочитанные до ошибки, сохраняются, а обход продолжается
+    со следующего файла.
+
+    Args:
+        file_name (str): Путь к файлу или URL для сообщения.
+        lines (Iterable[str]): Строки файла.
+        errors (list, optional): Список, в который добавляется ошибка
+            чтения: по нему вызывающий узнаёт, что файл прочитан не целиком.
+    """
+    try:
+        yield from lines
+    except Exception as e:
+        print(f"Error processing file {file_name}: {e}")
+        if errors is not None:
+            errors.append(e)
+
+
+class PrefetchingLoader:
+    """
+    Упреждающее чтение нескольких файлов или URL в фоновых потоках.
+
+    Потоки чтения берут файлы по порядку и складывают пакеты строк
+    (блоки read_chunks, разбитые на строки) в очереди файлов, пока
+    потребитель разбирает уже прочитанное. Очередь каждого файла ограничена
+    depth пакетами, а все очереди вместе — max_bytes байтами, поэтому
+    память не растёт, если разбор медленнее чтения. Ограничение по байтам
+    не действует на файл, который сейчас разбирается, иначе чтение следующих
+    файлов могло бы заблокировать его.
+
+    Файлы выдаются в исходном порядке, строки каждого файла — в порядке
+    следования. Ошибка чтения файла передаётся при обходе его строк
+    и не мешает чтению остальных файлов.
+
+    Attributes:
+        files (list[str]): Пути к файлам или URL.
+        readers (int): Количество потоков чтения.
+        depth (int): Сколько пакетов строк одного файла может ждать разбора.
+        max_bytes (int): Сколько байт прочитанных данных может ждать разбора.
+        fetcher (HttpFetcher | None): Загрузчик URL.
+        ranges (dict[str, list[tuple[int, int]]]): Диапазоны байт, которые
+            нужно прочитать из файлов; остальные файлы читаются целиком.
+        threads (list[threading.Thread]): Потоки чтения текущего обхода.
+    """
+
+    def __init__(
+        self,
+        files,
+        readers=PREFETCH_READERS,
+        depth=PREFETCH_DEPTH,
+        max_bytes=PREFETCH_MAX_BYTES,
+        fetcher=None,
+        ranges=None,
+    ):
+        self.files = list(files)
+        self.readers = readers
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.ranges = ranges or {}
+        self._condition = threading.Condition()
+        self._batches = [deque() for _ in self.files]
+        self._done = [False] * len(self.files)
+        self._errors = [None] * len(self.files)
+        self._queued_bytes = 0
+        self._head = 0
+        self._next_file = 0
+        self._stopped = False
+        self.threads = []
+
+    def __iter__(self):
+        """
+        Обход файлов по порядку.
+
+        Yields:
+            tuple[str, Iterator[str]]: Путь к файлу и его строки. Строки
+            нужно прочитать до перехода к следующему файлу; непрочитанный
+            остаток пропускается.
+        """
+        self.threads = [
+            threading.Thread(target=self._read_files, daemon=True)
+            for _ in range(min(self.readers, len(self.files)))
+        ]
+        for thread in self.threads:
+            thread.start()
+        try:
+            for index, file_name in enumerate(self.files):
+                with self._condition:
+                    self._head = index
+                    self._condition.notify_all()
+                lines = self._lines(index)
+                yield file_name, lines
+                # Освобождаем очередь файла, даже если строки не дочитаны
+                for _ in lines:
+                    pass
+        finally:
+            with self._condition:
+                self._stopped = True
+                self._condition.notify_all()
+
+    def _lines(self, index):
+        batches = self._batches[index]
+        while True:
+            with self._condition:
+                # Время, которое разбор ждёт прочитанных строк
+                with instrumentation.stage("read_wait"):
+                    self._condition.wait_for(lambda: batches or self._done[index])
+                if not batches:
+                    if self._errors[index] is not None:
+                        raise self._errors[index]
+                    return
+                lines, size = batches.popleft()
+                self._queued_bytes -= size
+                self._condition.notify_all()
+            yield from lines
+
+    def _can_enqueue(self, index, size):
+        return self._stopped or (
+            len(self._batches[index]) < self.depth
+            and (index == self._head or self._queued_bytes + size <= self.max_bytes)
+        )
+
+    def _read_files(self):
+        while True:
+            with self._condition:
+                if self._stopped or self._next_file >= len(self.files):
+                    return
+                index = self._next_file
+                self._next_file += 1
+
             try:
-                for line in future.result():
-                    yield line
+                chunks = read_source(
+                    self.files[index], self.fetcher, self.ranges.get(self.files[index])
+                )
+                for chunk in instrumentation.track_reads(chunks):
+                    lines = split_lines(chunk)
+                    with self._condition:
+                        self._condition.wait_for(
+                            lambda: self._can_enqueue(index, len(chunk))
+                        )
+                        if self._stopped:
+                            return
+                        self._batches[index].append((lines, len(chunk)))
+                        self._queued_bytes += len(chunk)
+                        self._condition.notify_all()
             except Exception as e:
-                print(f"Error processing file {file}: {e}")
+                self._errors[index] = e
+            finally:
+                with self._condition:
+                    self._done[index] = True
+                    self._condition.notify_all()
+
+
+def load_logs_from_files(path, **prefetch):
+    """
+    Строки всех файлов, подходящих под шаблон пути, с упреждающим чтением.
+
+    Файлы читаются по порядку имён загрузчиком PrefetchingLoader, которому
+    передаются параметры prefetch. Об ошибке чтения файла выводится
+    сообщение, и обход продолжается со следующего файла.
+    """
+    for file_name, lines in PrefetchingLoader(sorted(glob.glob(path)), **prefetch):
+        yield from report_errors(file_name, lines)
@@ -0,0 +1,263 @@
+import re
+from calendar import timegm
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fnmatch import translate
+
+from src.log_parser import TIMESTAMP_FIELD
+
+# Поля, значения которых входят в строку лога без изменений. Для них строку,
+# в которой нет обязательной подстроки шаблона, можно отбросить до разбора.
+VERBATIM_FIELDS = frozenset(("ip", "method", "resource", "agent"))
+
+# Символы, имеющие особый смысл в шаблонах glob
+GLOB_SPECIAL = re.compile(r"[*?\[\]]")
+GLOB_BRACKET = re.compile(r"\[!?\]?[^\]]*\]")
+
+# Операторы выражений --filter; двухсимвольные проверяются первыми
+OPERATORS = (
+    ("!=", "glob", True),
+    ("!~", "regex", True),
+    ("=", "glob", False),
+    ("~", "regex", False),
+)
+
+
+@dataclass(frozen=True)
+class FieldFilter:
+    """
+    Условие на одно поле записи лога.
+
+    Attributes:
+        field (str): Поле записи, например "agent" или "status".
+        pattern (str): Шаблон glob или регулярное выражение.
+        kind (str): "glob" — значение поля целиком соответствует шаблону glob
+            (fnmatch с учётом регистра), "regex" — в значении поля найдено
+            регулярное выражение (re.search).
+        negate (bool): Инвертировать ли условие.
+    """
+
+    field: str
+    pattern: str
+    kind: str = "glob"
+    negate: bool = False
+
+    @classmethod
+    def parse(cls, expression):
+        """
+        Разбор выражения фильтра.
+
+        Поддерживаются выражения "поле=glob", "поле!=glob", "поле~regex"
+        и "поле!~regex".
+
+        Args:
+            expression (str): Выражение фильтра.
+
+        Returns:
+            FieldFilter: Условие.
+
+        Raises:
+            ValueError: Если выражение некорректно.
+        """
+        positions = [
+            (expression.find(operator), -len(operator), operator, kind, negate)
+            for operator, kind, negate in OPERATORS
+            if operator in expression
+        ]
+        if not positions:
+            raise ValueError(f"invalid filter expression: {expression!r}")
+        index, _, operator, kind, negate = min(positions)
+        field, pattern = expression[:index].strip(), expression[index + len(operator) :]
+        if not field:
+            raise ValueError(f"invalid filter expression: {expression!r}")
+        if kind == "regex":
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"invalid regular expression {pattern!r}: {e}")
+        return cls(field, pattern, kind, negate)
+
+    def literal(self):
+        """
+        Подстрока, которая обязательно есть в значении поля, прошедшем условие.
+
+        Returns:
+            str: Самый длинный фрагмент шаблона glob без специальных символов;
+            пустая строка, если такой подстроки нет.
+        """
+        if self.kind != "glob" or self.negate or self.field not in VERBATIM_FIELDS:
+            return ""
+        pattern = GLOB_BRACKET.sub("*", self.pattern)
+        return max(GLOB_SPECIAL.split(pattern), key=len)
+
+    def cost(self):
+        # Порядок проверки: сравнение строк, затем префикс, затем регулярные выражения
+        if self.kind == "regex":
+            return 3
+        if not GLOB_SPECIAL.search(self.pattern):
+            return 0
+        if not GLOB_SPECIAL.search(self.pattern[:-1]) and self.pattern[-1] == "*":
+            return 1
+        return 2
+
+    def compile(self):
+        """
+        Предикат записи для условия.
+
+        Отсутствующее или пустое поле не соответствует условию, а при
+        negate=True — соответствует.
+
+        Returns:
+            Callable[[dict], bool]: Предикат.
+        """
+        field, pattern, negate = self.field, self.pattern, self.negate
+        if self.cost() == 0:
+            match = pattern.__eq__
+        elif self.cost() == 1:
+            prefix = pattern[:-1]
+
+            def match(value):
+                return value.startswith(prefix)
+
+        elif self.kind == "glob":
+            match = re.compile(translate(pattern)).match
+        else:
+            match = re.compile(pattern).search
+
+        def predicate(log_record):
+            value = log_record.get(field)
+            if value is None or value == "":
+                return negate
+            if not isinstance(value, str):
+                value = str(value)
+            return bool(match(value)) is not negate
+
+        return predicate
+
+
+def date_bounds(from_date, to_date):
+    """
+    Границы диапазона дат в секундах, сравнимые с полем "ts" записи.
+
+    Returns:
+        tuple[int | None, int | None]: Первая подходящая секунда и первая
+        секунда после диапазона (следующий день после to_date включительно
+        не входит).
+    """
+    start = end = None
+    if from_date:
+        start = _ceil_timestamp(datetime.fromisoformat(from_date))
+    if to_date:
+        end = _ceil_timestamp(datetime.fromisoformat(to_date) + timedelta(days=1))
+    return start, end
+
+
+def _ceil_timestamp(moment):
+    seconds = timegm(moment.timetuple())
+    return seconds + 1 if moment.microsecond else seconds
+
+
+class RecordFilter:
+    """
+    Все фильтры запуска, собранные в один предикат.
+
+    Собирается один раз на запуск из AnalysisOptions: границы дат переводятся
+    в целые секунды, шаблоны компилируются, условия упорядочиваются от дешёвых
+    к дорогим. Для цикла разбора доступны три части:
+
+    - fields — поля записи, которые нужно извлечь при разборе;
+    - prefilter — проверка строки до разбора по обязательным подстрокам
+      шаблонов или None, если такой проверки нет;
+    - matches — проверка разобранной записи или None, если фильтров нет.
+
+    Attributes:
+        start (int | None): Начало диапазона дат в секундах.
+        end (int | None): Конец диапазона дат в секундах (не включается).
+        field_filters (tuple[FieldFilter]): Условия на поля в порядке проверки.
+        match_any (bool): Достаточно ли одного выполненного условия на поля.
+        fields (frozenset[str]): Поля, которые читают условия.
+        prefilter (Callable[[str], bool] | None): Проверка строки.
+        matches (Callable[[dict], bool] | None): Проверка записи.
+        matches_fields (Callable[[dict], bool] | None): Проверка записи без
+            учёта диапазона дат.
+    """
+
+    def __init__(self, field_filters=(), from_date=None, to_date=None, match_any=False):
+        self.start, self.end = date_bounds(from_date, to_date)
+        self.field_filters = tuple(sorted(field_filters, key=FieldFilter.cost))
+        self.match_any = match_any
+
+        fields = {field_filter.field for field_filter in self.field_filters}
+        if self.start is not None or self.end is not None:
+            fields.add(TIMESTAMP_FIELD)
+        self.fields = frozenset(fields)
+
+        self.prefilter = self._compile_prefilter()
+        self.matches_fields = self._compile_fields()
+        date_check = self._compile_dates()
+        checks = [check for check in (date_check, self.matches_fields) if check]
+        self.matches = _all_of(checks) if checks else None
+
+    def __call__(self, log_record):
+        return self.matches is None or self.matches(log_record)
+
+    def _compile_dates(self):
+        start, end = self.start, self.end
+        if start is not None and end is not None:
+            return lambda log_record: start <= log_record[TIMESTAMP_FIELD] < end
+        if start is not None:
+            return lambda log_record: log_record[TIMESTAMP_FIELD] >= start
+        if end is not None:
+            return lambda log_record: log_record[TIMESTAMP_FIELD] < end
+        return None
+
+    def _compile_fields(self):
+        if not self.field_filters:
+            return None
+        checks = [field_filter.compile() for field_filter in self.field_filters]
+        return _any_of(checks) if self.match_any else _all_of(checks)
+
+    def _compile_prefilter(self):
+        literals = [field_filter.literal() for field_filter in self.field_filters]
+        if self.match_any:
+            # Строка может пройти любое условие, поэтому отбросить её можно,
+            # только если у каждого условия есть обязательная подстрока
+            if not literals or not all(literals):
+                return None
+            return lambda line: any(literal in line for literal in literals)
+
+        literals = sorted({literal for literal in literals if literal}, key=len)
+        if not literals:
+            return None
+        if len(literals) == 1:
+            literal = literals[0]
+            return lambda line: literal in line
+        # Самая длинная подстрока отсеивает больше строк, её проверяем первой
+        literals.reverse()
+        return lambda line: all(literal in line for literal in literals)
+
+
+def _all_of(checks):
+    if len(checks) == 1:
+        return checks[0]
+
+    def matches(log_record):
+        for check in checks:
+            if not check(log_record):
+                return False
+        return True
+
+    return matches
+
+
+def _any_of(checks):
+    if len(checks) == 1:
+        return checks[0]
+
+    def matches(log_record):
+        for check in checks:
+            if check(log_record):
+                return True
+        return False
+
+    return matches
@@ -0,0 +1,304 @@
+import glob
+import os
+import sys
+import time
+
+from src.file_handler import decode_line
+from src.log_parser import StringTable
+from src.log_stats import LogStatistics
+from src.output_formatter import format_output, format_rates
+from src.pipeline import analyze_lines
+
+# Окна скользящей статистики по умолчанию, в секундах: 1 минута, 5 минут, 1 час
+DEFAULT_WINDOWS = (60, 300, 3600)
+
+# Ширина корзины скользящей статистики в секундах
+DEFAULT_BUCKET_SECONDS = 5
+
+# Сколько байт файла читается за один опрос
+READ_SIZE = 1 << 20
+
+
+class RollingStatistics:
+    """
+    Статистика логов за скользящие окна времени.
+
+    Записи раскладываются по корзинам фиксированной ширины по времени их
+    поступления. Корзины старше самого длинного окна удаляются, поэтому память
+    ограничена количеством корзин, а не количеством записей. Статистика окна
+    получается объединением его корзин.
+
+    Attributes:
+        windows (tuple[int]): Длины окон в секундах.
+        bucket_seconds (int): Ширина корзины в секундах.
+        exact_quantiles (bool): Считать ли квантили размеров ответов точно.
+        top_k (int | None): Размер приближённой сводки ресурсов.
+        distinct_precision (int | None): Точность сводок количества
+            различных значений.
+        buckets (dict[int, LogStatistics]): Корзины по номеру, от старых к новым.
+        now (float): Текущее время, к которому относятся новые записи.
+        strings (StringTable): Таблица интернирования строк записей: без неё
+            каждая корзина хранит собственные копии одних и тех же ресурсов.
+    """
+
+    def __init__(
+        self,
+        windows=DEFAULT_WINDOWS,
+        bucket_seconds=DEFAULT_BUCKET_SECONDS,
+        exact_quantiles=False,
+        top_k=None,
+        distinct_precision=None,
+    ):
+        self.windows = tuple(sorted(windows))
+        self.bucket_seconds = bucket_seconds
+        self.exact_quantiles = exact_quantiles
+        self.top_k = top_k
+        self.distinct_precision = distinct_precision
+        self.buckets = {}
+        self.now = 0
+        self.strings = StringTable()
+        self._current = None
+
+    def advance(self, now):
+        """
+        Переводит часы статистики и удаляет корзины, вышедшие из всех окон.
+
+        Args:
+            now (float): Текущее время в секундах.
+        """
+        self.now = now
+        index = int(now // self.bucket_seconds)
+        if self._current is not None and index == self._current[0]:
+            return
+
+        oldest = int((now - self.windows[-1]) // self.bucket_seconds)
+        for stale in [key for key in self.buckets if key < oldest]:
+            del self.buckets[stale]
+        bucket = self.buckets.setdefault(
+            index,
+            LogStatistics(self.exact_quantiles, self.top_k, self.distinct_precision),
+        )
+        self._current = index, bucket
+
+    def update(self, log_record):
+        """
+        Добавляет запись в корзину текущего времени.
+
+        Args:
+            log_record (dict): Запись лога.
+        """
+        if self._current is None:
+            self.advance(self.now)
+        self._current[1].update(log_record)
+
+    def merge(self, stats):
+        """
+        Добавляет статистику пакета записей в корзину текущего времени.
+
+        Args:
+            stats (LogStatistics): Статистика пакета.
+        """
+        if self._current is None:
+            self.advance(self.now)
+        self._current[1].merge(stats)
+
+    def window(self, seconds):
+        """
+        Статистика за последние seconds секунд.
+
+        Корзины учитываются целиком, поэтому окно может захватывать до одной
+        корзины больше заданной длины.
+
+        Returns:
+            LogStatistics: Объединённая статистика корзин окна.
+        """
+        oldest = int((self.now - seconds) // self.bucket_seconds)
+        stats = LogStatistics(self.exact_quantiles, self.top_k, self.distinct_precision)
+        for index in sorted(self.buckets):
+            if index > oldest:
+                stats.merge(self.buckets[index])
+        return stats
+
+    def rates(self):
+        """
+        Количество запросов и средняя скорость для каждого окна.
+
+        Returns:
+            list[tuple[int, int, float]]: Длина окна, количество запросов и
+            запросов в секунду.
+        """
+        rates = []
+        for seconds in self.windows:
+            total = self.window(seconds).total_requests
+            rates.append((seconds, total, total / seconds))
+        return rates
+
+
+class FileFollower:
+    """
+    Чтение строк, дописываемых в файл, как в `tail -F`.
+
+    Файл держится открытым. Если его переименовали (ротация) или удалили,
+    старый файл дочитывается до конца, после чего открывается новый файл
+    с тем же именем. Если файл усекли, чтение продолжается с его начала.
+
+    Attributes:
+        path (str): Путь к файлу.
+    """
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self._file = None
+        self._identity = None
+        self._remainder = b""
+        self._open(seek_end=not from_start)
+
+    def _open(self, seek_end):
+        try:
+            self._file = open(self.path, "rb")
+        except OSError:
+            self._file = None
+            return
+        stat = os.fstat(self._file.fileno())
+        self._identity = stat.st_dev, stat.st_ino
+        if seek_end:
+            self._file.seek(0, os.SEEK_END)
+
+    def _rotated(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino) != self._identity
+
+    def poll(self, max_bytes=READ_SIZE):
+        """
+        Читает законченные строки, дописанные с прошлого опроса.
+
+        Args:
+            max_bytes (int): Сколько байт прочитать не больше чем за один вызов.
+
+        Returns:
+            list[str]: Новые строки; пустой список, если новых данных нет.
+        """
+        if self._file is None:
+            self._open(seek_end=False)
+            if self._file is None:
+                return []
+
+        if os.fstat(self._file.fileno()).st_size < self._file.tell():
+            # Файл усекли на месте: продолжаем с начала
+            self._file.seek(0)
+            self._remainder = b""
+
+        data = self._file.read(max_bytes)
+        if not data:
+            if self._rotated():
+                # Старый файл дочитан: переключаемся на новый с начала
+                if self._remainder:
+                    data, self._remainder = self._remainder + b"\n", b""
+                self.close()
+                self._open(seek_end=False)
+                return [decode_line(line) for line in data.splitlines()]
+            return []
+
+        data = self._remainder + data
+        end = data.rfind(b"\n") + 1
+        self._remainder = data[end:]
+        return [decode_line(line) for line in data[:end].splitlines()]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def follow(
+    path,
+    options,
+    output_format="markdown",
+    interval=5.0,
+    windows=DEFAULT_WINDOWS,
+    bucket_seconds=DEFAULT_BUCKET_SECONDS,
+    from_start=False,
+    out=sys.stdout,
+    clock=time.time,
+    sleep=time.sleep,
+    refreshes=None,
+):
+    """
+    Отслеживание дописываемых логов с периодическим выводом отчёта.
+
+    Каждые interval секунд выводится скорость запросов за все окна и отчёт
+    format_output по самому длинному окну. Шаблон пути перепроверяется при
+    каждом обновлении отчёта, чтобы подхватывать новые файлы.
+
+    Args:
+        path (str): Путь к файлам логов (может содержать символы подстановки).
+        options (AnalysisOptions): Параметры фильтрации.
+        output_format (str): Формат отчёта.
+        interval (float): Период обновления отчёта в секундах.
+        windows (tuple[int]): Длины окон в секундах.
+        bucket_seconds (int): Ширина корзины скользящей статистики.
+        from_start (bool): Читать ли уже существующие строки файлов.
+        out: Поток для вывода отчётов.
+        clock: Функция текущего времени.
+        sleep: Функция ожидания.
+        refreshes (int, optional): Сколько раз вывести отчёт до выхода;
+            None — работать, пока процесс не прервут.
+    """
+    rolling = RollingStatistics(
+        windows,
+        bucket_seconds,
+        options.exact_quantiles,
+        options.top_k,
+        options.distinct_precision,
+    )
+    followers = {
+        log_file: FileFollower(log_file, from_start)
+        for log_file in glob.glob(path) or [path]
+    }
+    next_refresh = clock() + interval
+
+    try:
+        while refreshes is None or refreshes > 0:
+            has_new_lines = False
+            for follower in followers.values():
+                lines = follower.poll()
+                if lines:
+                    has_new_lines = True
+                    rolling.advance(clock())
+                    analyze_lines(lines, rolling, options, rolling.strings)
+
+            now = clock()
+            if now >= next_refresh:
+                rolling.advance(now)
+                render_follow_report(rolling, followers, options, output_format, out)
+                next_refresh = now + interval
+                if refreshes is not None:
+                    refreshes -= 1
+
+                # Файлы, появившиеся после запуска, читаются с начала
+                for log_file in glob.glob(path):
+                    if log_file not in followers:
+                        followers[log_file] = FileFollower(log_file, from_start=True)
+            elif not has_new_lines:
+                sleep(min(0.1, max(next_refresh - now, 0)))
+    finally:
+        for follower in followers.values():
+            follower.close()
+
+
+def render_follow_report(rolling, followers, options, output_format, out):
+    if out.isatty():
+        # Перерисовываем отчёт на месте предыдущего
+        out.write("\033[2J\033[H")
+    stats = rolling.window(rolling.windows[-1])
+    out.write(format_rates(rolling.rates(), output_format))
+    out.write(
+        format_output(
+            stats, list(followers), options.from_date, options.to_date, output_format
+        )
+    )
+    out.write("\n")
+    out.flush()
@@ -0,0 +1,238 @@
+import time
+
+# requests и пул потоков загружаются при первом обращении к сети: импорт
+# requests заметно замедляет запуск, а по локальным файлам он не нужен
+
+# Сколько URL загружается одновременно
+HTTP_CONCURRENCY = 8
+
+# Тайм-ауты установки соединения и чтения ответа в секундах
+HTTP_TIMEOUT = (10, 30)
+
+# Сколько раз повторяется запрос после ошибки сети или ответа 5xx
+HTTP_RETRIES = 3
+
+# Пауза перед продолжением оборванной загрузки, умножается на номер попытки
+RETRY_BACKOFF = 0.2
+
+# Для скольких серверов сессия держит открытые соединения
+HTTP_HOSTS = 64
+
+# Размер блока, которым читается тело ответа
+HTTP_BLOCK_SIZE = 1 << 16
+
+# Большие файлы загружаются параллельно диапазонами байт такого размера
+SLICE_SIZE = 4 << 20
+
+# Сколько диапазонов одного файла загружается одновременно
+SLICE_WORKERS = 4
+
+
+def resumable_errors():
+    """Ошибки, после которых загрузка продолжается с последнего полученного байта."""
+    import requests
+
+    return (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+
+
+def make_session(pool_size, retries=HTTP_RETRIES):
+    """
+    Сессия requests с пулом соединений и повтором неудачных запросов.
+
+    Args:
+        pool_size (int): Сколько соединений с одним сервером держит пул.
+        retries (int): Сколько раз повторять запрос, если соединение не
+            установилось или сервер ответил 429 или 5xx.
+
+    Returns:
+        requests.Session: Сессия для HTTP и HTTPS.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(("GET", "HEAD")),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_HOSTS, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HttpFetcher:
+    """
+    Загрузка логов по HTTP через общий пул соединений.
+
+    Соединения с сервером переиспользуются между запросами (keep-alive),
+    а ответы принимаются сжатыми (Content-Encoding: gzip). Оборванная
+    загрузка продолжается запросом диапазона байт с места обрыва. Большие
+    файлы, сервер которых поддерживает диапазоны, загружаются несколькими
+    диапазонами параллельно.
+
+    Одновременно открыто не больше concurrency * slice_workers соединений
+    с одним сервером, если URL загружаются не больше чем в concurrency
+    потоков, как в PrefetchingLoader.
+
+    Attributes:
+        concurrency (int): Сколько URL загружается одновременно.
+        timeout (tuple[float, float]): Тайм-ауты соединения и чтения.
+        retries (int): Сколько раз продолжать загрузку после ошибки сети.
+        slice_size (int): Размер диапазона параллельной загрузки.
+        slice_workers (int): Сколько диапазонов одного файла загружается
+            одновременно; 1 отключает загрузку диапазонами.
+        session (requests.Session): Сессия с пулом соединений.
+    """
+
+    def __init__(
+        self,
+        concurrency=HTTP_CONCURRENCY,
+        timeout=HTTP_TIMEOUT,
+        retries=HTTP_RETRIES,
+        slice_size=SLICE_SIZE,
+        slice_workers=SLICE_WORKERS,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.slice_size = slice_size
+        self.slice_workers = slice_workers
+        self.session = make_session(concurrency * slice_workers, retries)
+
+    def blocks(self, url):
+        """
+        Тело ответа по URL блоками байт.
+
+        Файл размером от двух диапазонов slice_size загружается диапазонами
+        в slice_workers потоков, если сервер объявляет поддержку диапазонов
+        (Accept-Ranges: bytes). Остальные файлы загружаются одним запросом.
+
+        Args:
+            url (str): URL файла логов.
+
+        Yields:
+            bytes: Данные в исходном порядке; границы блоков не совпадают
+            с границами строк.
+
+        Raises:
+            requests.RequestException: Если сервер вернул ошибку или загрузку
+            не удалось продолжить.
+        """
+        size = self.range_size(url) if self.slice_workers > 1 else None
+        if size is None or size < 2 * self.slice_size:
+            yield from self.download(url)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(self.slice_workers) as executor:
+            pending = []
+            for start in range(0, size, self.slice_size):
+                end = min(start + self.slice_size, size)
+                pending.append(executor.submit(self.download_slice, url, start, end))
+                if len(pending) >= self.slice_workers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def range_size(self, url):
+        """
+        Размер файла, если сервер отдаёт его диапазонами байт.
+
+        Returns:
+            int | None: Размер несжатого тела или None, если сервер
+            не поддерживает диапазоны или не сообщил размер.
+        """
+        import requests
+
+        try:
+            response = self.session.head(
+                url,
+                headers={"Accept-Encoding": "identity"},
+                timeout=self.timeout,
+                allow_redirects=True,
+            )
+        except requests.RequestException:
+            return None
+        headers = response.headers
+        length = headers.get("Content-Length", "")
+        if (
+            not response.ok
+            or headers.get("Accept-Ranges") != "bytes"
+            or "Content-Encoding" in headers
+            or not length.isdigit()
+        ):
+            return None
+        return int(length)
+
+    def download(self, url, start=0, end=None):
+        """
+        Загрузка тела ответа или его диапазона байт [start, end).
+
+        Запрос всего тела принимает сжатие gzip. После обрыва соединения
+        загрузка продолжается запросом диапазона несжатого тела с первого
+        не полученного байта. Если сервер не поддерживает диапазоны и отвечает
+        всем телом, уже полученные байты пропускаются.
+
+        Args:
+            url (str): URL файла логов.
+            start (int): Начало диапазона байт.
+            end (int, optional): Конец диапазона байт; None — до конца тела.
+
+        Yields:
+            bytes: Данные диапазона.
+
+        Raises:
+            requests.RequestException: Если сервер вернул ошибку, соединение
+            не удалось установить или оно обрывалось больше retries раз подряд
+            без новых данных.
+        """
+        position = start
+        failures = 0
+        resumable = resumable_errors()
+        while True:
+            headers = {}
+            if position or end is not None:
+                last = "" if end is None else end - 1
+                headers["Range"] = f"bytes={position}-{last}"
+                headers["Accept-Encoding"] = "identity"
+            # Ошибки установки соединения повторяет сама сессия, здесь
+            # обрабатывается только обрыв уже начатой передачи тела
+            with self.session.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                skip = position if response.status_code != 206 else 0
+                try:
+                    for block in response.iter_content(HTTP_BLOCK_SIZE):
+                        if skip:
+                            if len(block) <= skip:
+                                skip -= len(block)
+                                continue
+                            block, skip = block[skip:], 0
+                        if end is not None and position + len(block) >= end:
+                            yield block[: end - position]
+                            return
+                        position += len(block)
+                        failures = 0
+                        yield block
+                    return
+                except resumable:
+                    failures += 1
+                    if failures > self.retries:
+                        raise
+            time.sleep(RETRY_BACKOFF * failures)
+
+    def download_slice(self, url, start, end):
+        """Диапазон байт [start, end) тела ответа целиком, см. download."""
+        return b"".join(self.download(url, start, end))
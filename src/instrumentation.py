@@ -0,0 +1,336 @@
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# resource есть только в Unix; без него пиковая память не измеряется
+try:
+    import resource
+except ImportError:  # pragma: no cover - зависит от платформы
+    resource = None
+
+# Сколько нераспознанных строк сохраняется в примерах
+SAMPLE_LINES = 5
+
+# До скольких символов обрезаются примеры нераспознанных строк
+SAMPLE_LENGTH = 200
+
+# Сколько функций выводит --profile без файла
+PROFILE_LINES = 30
+
+# Сбор статистики выполнения текущего процесса; None — сбор отключён.
+# Код обработки проверяет его один раз на файл или блок, а не на строку,
+# поэтому без --stats замеры почти ничего не стоят.
+collector = None
+
+
+def max_rss_mb(children=False):
+    """
+    Пиковый размер резидентной памяти (RSS) в МиБ.
+
+    Args:
+        children (bool): Память завершённых дочерних процессов вместо
+            текущего; учитывается самый большой из них.
+
+    Returns:
+        float | None: Размер в МиБ или None, если платформа его не сообщает.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    max_rss = resource.getrusage(who).ru_maxrss
+    # В Linux ru_maxrss измеряется в КиБ, в macOS — в байтах
+    return max_rss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def cpu_time():
+    """Процессорное время текущего процесса и завершённых дочерних процессов."""
+    if resource is None:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class RunStats:
+    """
+    Статистика выполнения: время этапов, счётчики строк и байт, примеры
+    нераспознанных строк.
+
+    Время крупных этапов (stage) измеряется по часам и по процессорному
+    времени. Время построчных этапов (разбор, фильтры, подсчёт) складывается
+    из замеров каждого вызова обёрток parser, predicate и timed; обёртки
+    вызываются из одного потока. Время чтения складывается из ожидания
+    каждого блока данных во всех потоках чтения, поэтому при упреждающем
+    чтении оно может перекрываться с разбором.
+
+    Attributes:
+        stages (dict[str, dict]): Время этапов: wall_seconds, cpu_seconds
+            (только для крупных этапов) и количество вызовов calls.
+        counters (Counter): Счётчики bytes_read (несжатые байты), lines_read,
+            lines_parsed, lines_rejected, lines_filtered, records_accepted.
+        samples (list[str]): Первые нераспознанные строки.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = Counter()
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {
+                "wall_seconds": 0.0,
+                "cpu_seconds": None,
+                "calls": 0,
+            }
+        return stage
+
+    def add_time(self, name, wall, cpu=None, calls=1):
+        """Добавляет время к этапу name."""
+        with self._lock:
+            stage = self._stage(name)
+            stage["wall_seconds"] += wall
+            stage["calls"] += calls
+            if cpu is not None:
+                stage["cpu_seconds"] = (stage["cpu_seconds"] or 0.0) + cpu
+
+    def count(self, name, value=1):
+        """Увеличивает счётчик name."""
+        with self._lock:
+            self.counters[name] += value
+
+    @contextmanager
+    def stage(self, name):
+        """Замер времени блока кода как этапа name."""
+        wall, cpu = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall, cpu_time() - cpu)
+
+    def timed(self, name, func, counter=None):
+        """
+        Обёртка функции, добавляющая время каждого вызова к этапу name.
+
+        Args:
+            name (str): Название этапа.
+            func (Callable): Функция одного аргумента.
+            counter (str, optional): Счётчик, который увеличивается на каждый
+                вызов.
+        """
+        with self._lock:
+            stage = self._stage(name)
+        counters = self.counters
+        perf_counter = time.perf_counter
+
+        def wrapper(arg):
+            started = perf_counter()
+            result = func(arg)
+            stage["wall_seconds"] += perf_counter() - started
+            stage["calls"] += 1
+            if counter is not None:
+                counters[counter] += 1
+            return result
+
+        return wrapper
+
+    def parser(self, parse):
+        """
+        Обёртка функции разбора строки parse(line, fields, strings=None)
+        для этапа "parse".
+
+        Считает разобранные и нераспознанные строки и сохраняет первые
+        SAMPLE_LINES нераспознанных строк.
+        """
+        with self._lock:
+            stage = self._stage("parse")
+        counters = self.counters
+        samples = self.samples
+        perf_counter = time.perf_counter
+
+        def wrapper(line, fields, strings=None):
+            started = perf_counter()
+            log_record = parse(line, fields, strings)
+            stage["wall_seconds"] += perf_counter() - started
+            stage["calls"] += 1
+            if log_record:
+                counters["lines_parsed"] += 1
+            else:
+                counters["lines_rejected"] += 1
+                if len(samples) < SAMPLE_LINES:
+                    samples.append(line[:SAMPLE_LENGTH])
+            return log_record
+
+        return wrapper
+
+    def predicate(self, predicate):
+        """
+        Обёртка фильтра записей для этапа "filter"; записи, не прошедшие
+        фильтр, считаются в lines_filtered. None возвращается без изменений.
+        """
+        if predicate is None:
+            return None
+        with self._lock:
+            stage = self._stage("filter")
+        counters = self.counters
+        perf_counter = time.perf_counter
+
+        def wrapper(arg):
+            started = perf_counter()
+            result = predicate(arg)
+            stage["wall_seconds"] += perf_counter() - started
+            stage["calls"] += 1
+            if not result:
+                counters["lines_filtered"] += 1
+            return result
+
+        return wrapper
+
+    def reads(self, chunks):
+        """
+        Блоки данных с замером времени их получения для этапа "read".
+
+        Считает прочитанные байты и строки; может вызываться из нескольких
+        потоков.
+        """
+        chunks = iter(chunks)
+        perf_counter = time.perf_counter
+        last = b""
+        while True:
+            started = perf_counter()
+            chunk = next(chunks, None)
+            elapsed = perf_counter() - started
+            if chunk is None:
+                # Последняя строка может быть без перевода строки
+                if last and not last.endswith(b"\n"):
+                    self.count("lines_read")
+                return
+            last = chunk
+            with self._lock:
+                stage = self._stage("read")
+                stage["wall_seconds"] += elapsed
+                stage["calls"] += 1
+                self.counters["bytes_read"] += len(chunk)
+                self.counters["lines_read"] += chunk.count(b"\n")
+            yield chunk
+
+    def merge(self, data):
+        """
+        Добавляет статистику другого процесса в виде to_dict.
+
+        Returns:
+            RunStats: Текущий экземпляр.
+        """
+        with self._lock:
+            for name, other in data["stages"].items():
+                stage = self._stage(name)
+                stage["wall_seconds"] += other["wall_seconds"]
+                stage["calls"] += other["calls"]
+                if other["cpu_seconds"] is not None:
+                    stage["cpu_seconds"] = (stage["cpu_seconds"] or 0.0) + other[
+                        "cpu_seconds"
+                    ]
+            self.counters.update(data["counters"])
+            free = SAMPLE_LINES - len(self.samples)
+            self.samples.extend(data["unparsable_samples"][:free])
+        return self
+
+    def to_dict(self):
+        return {
+            "stages": {
+                name: {
+                    "wall_seconds": round(stage["wall_seconds"], 6),
+                    "cpu_seconds": stage["cpu_seconds"]
+                    and round(stage["cpu_seconds"], 6),
+                    "calls": stage["calls"],
+                }
+                for name, stage in self.stages.items()
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "unparsable_samples": list(self.samples),
+            "peak_memory_mb": {
+                "process": max_rss_mb(),
+                "children": max_rss_mb(children=True),
+            },
+        }
+
+
+def enable():
+    """
+    Включает сбор статистики выполнения в текущем процессе.
+
+    Returns:
+        RunStats: Новый сборщик; предыдущая статистика отбрасывается.
+    """
+    global collector
+    collector = RunStats()
+    return collector
+
+
+def disable():
+    """Отключает сбор статистики выполнения."""
+    global collector
+    collector = None
+
+
+def stage(name):
+    """Замер блока кода как этапа name, если сбор статистики включён."""
+    if collector is None:
+        return nullcontext()
+    return collector.stage(name)
+
+
+def track_reads(chunks):
+    """Блоки данных с учётом в статистике чтения, если её сбор включён."""
+    if collector is None:
+        return chunks
+    return collector.reads(chunks)
+
+
+def write_stats(run_stats, target):
+    """
+    Записывает статистику выполнения в JSON.
+
+    Args:
+        run_stats (RunStats): Статистика.
+        target (str): Путь к файлу или "-" для вывода в stderr.
+    """
+    data = json.dumps(run_stats.to_dict(), indent=2)
+    if target == "-":
+        print(data, file=sys.stderr)
+        return
+    with open(target, "w") as f:
+        f.write(data + "\n")
+
+
+def start_profiler():
+    """Запускает cProfile для текущего потока."""
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def save_profile(profiler, target):
+    """
+    Останавливает профилировщик и сохраняет результат.
+
+    Args:
+        profiler (cProfile.Profile): Запущенный профилировщик.
+        target (str): Путь к файлу для pstats (snakeviz, gprof2dot) или "-"
+            для вывода PROFILE_LINES самых затратных функций в stderr.
+    """
+    import pstats
+
+    profiler.disable()
+    if target == "-":
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(
+            PROFILE_LINES
+        )
+        return
+    profiler.dump_stats(target)
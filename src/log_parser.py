@@ -1,26 +1,346 @@
 import re
-from datetime import datetime
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
 
 LOG_PATTERN = re.compile(
     r'(?P<ip>\S+) \S+ \S+ \[(?P<time>[^]]+)] "(?P<method>\S+) (?P<resource>\S+) \S+" (?P<status>\d+) (?P<size>\d+|-) '
     r'"(?P<referrer>[^"]*)" "(?P<agent>[^"]*)"'
 )
 
+TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
 
-def parse_log_line(line):
+# Поля записи, которые разбор извлекает по умолчанию
+ALL_FIELDS = frozenset(("ip", "time", "method", "resource", "status", "size", "agent"))
+
+# Дополнительное поле по запросу: время записи по местным часам записи
+# (без учёта часового пояса) в секундах от 1970-01-01, как целое число
+TIMESTAMP_FIELD = "ts"
+
+MONTHS = {
+    "Jan": 1,
+    "Feb": 2,
+    "Mar": 3,
+    "Apr": 4,
+    "May": 5,
+    "Jun": 6,
+    "Jul": 7,
+    "Aug": 8,
+    "Sep": 9,
+    "Oct": 10,
+    "Nov": 11,
+    "Dec": 12,
+}
+
+# Кэши разобранных частей времени. Ключ кэша полуночи — дата вместе с часовым
+# поясом, ключ кэша смещений — время суток "08:05:32". Оба кэша ограничены:
+# различных времён суток не больше 86400, а дат в логах обычно немного.
+_midnight_cache = {}
+_clock_cache = {}
+_midnight_ts_cache = {}
+_clock_ts_cache = {}
+MAX_MIDNIGHT_CACHE_SIZE = 4096
+
+# Строковые поля, которые разбор интернирует через StringTable
+INTERNED_FIELDS = ("method", "resource", "agent")
+
+# Сколько строк хранит таблица интернирования, прежде чем очиститься
+MAX_STRING_TABLE_SIZE = 1 << 20
+
+
+class StringTable(dict):
+    """
+    Таблица интернирования строк на время запуска.
+
+    Разбор с таблицей заменяет значение поля первым встреченным равным ему
+    объектом (strings.setdefault(value, value)), поэтому повторяющиеся
+    значения в записях и ключах счётчиков разделяют один объект строки
+    вместо отдельной копии на каждую запись. Это экономит память там, где
+    значения хранятся долго и во многих агрегатах сразу, например в корзинах
+    скользящей статистики. При обычном разборе записи сразу отбрасываются,
+    а счётчики и так хранят по одному ключу на значение, поэтому таблица
+    там лишь замедляет разбор (см. этапы timeseries в benchmarks.suite).
+
+    Размер таблицы ограничивает её владелец, периодически вызывая trim.
+    Строки, уже попавшие в агрегаты, от очистки не меняются, просто новые
+    значения перестают разделять с ними объект.
+
+    Attributes:
+        max_size (int): Сколько строк может хранить таблица.
+    """
+
+    def __init__(self, max_size=MAX_STRING_TABLE_SIZE):
+        super().__init__()
+        self.max_size = max_size
+
+    def trim(self):
+        """Очищает таблицу, если в ней больше max_size строк."""
+        if len(self) > self.max_size:
+            self.clear()
+
+
+def parse_log_time(time_str):
+    """
+    Разбор времени записи в формате "17/May/2015:08:05:32 +0000".
+
+    Время стандартного вида собирается из закэшированной полуночи даты
+    с часовым поясом и закэшированного смещения от полуночи. Всё остальное
+    передаётся в datetime.strptime, поэтому результат и ошибки совпадают с ним.
+
+    Args:
+        time_str (str): Время из записи лога.
+
+    Returns:
+        datetime: Время с часовым поясом.
+
+    Raises:
+        ValueError: Если строка не соответствует формату времени.
+    """
+    if len(time_str) == 26 and time_str[11] == ":":
+        day_key = time_str[:11] + time_str[20:]
+        midnight = _midnight_cache.get(day_key)
+        if midnight is None:
+            midnight = _parse_midnight(day_key)
+        offset = _clock_cache.get(time_str[12:20])
+        if offset is None:
+            offset = _parse_clock(time_str[12:20])
+        if midnight is not None and offset is not None:
+            return midnight + offset
+    return datetime.strptime(time_str, TIME_FORMAT)
+
+
+def parse_log_timestamp(time_str):
+    """
+    Время записи по её местным часам в секундах от 1970-01-01.
+
+    Часовой пояс проверяется, но не учитывается, поэтому результат совпадает
+    с временем, которое LogStatistics.is_within_date_range сравнивает с
+    границами диапазона дат. Целые числа сравниваются быстрее datetime.
+
+    Args:
+        time_str (str): Время из записи лога.
+
+    Returns:
+        int: Количество секунд.
+
+    Raises:
+        ValueError: Если строка не соответствует формату времени.
+    """
+    if len(time_str) == 26 and time_str[11] == ":":
+        day_key = time_str[:11] + time_str[20:]
+        midnight = _midnight_ts_cache.get(day_key)
+        if midnight is None:
+            midnight_time = _midnight_cache.get(day_key) or _parse_midnight(day_key)
+            if midnight_time is not None:
+                if len(_midnight_ts_cache) >= MAX_MIDNIGHT_CACHE_SIZE:
+                    _midnight_ts_cache.clear()
+                midnight = timegm(midnight_time.timetuple())
+                _midnight_ts_cache[day_key] = midnight
+        clock = time_str[12:20]
+        offset = _clock_ts_cache.get(clock)
+        if offset is None:
+            clock_offset = _clock_cache.get(clock) or _parse_clock(clock)
+            if clock_offset is not None:
+                offset = _clock_ts_cache[clock] = clock_offset.seconds
+        if midnight is not None and offset is not None:
+            return midnight + offset
+    return timegm(datetime.strptime(time_str, TIME_FORMAT).timetuple())
+
+
+def _is_ascii_digits(text):
+    return text.isdigit() and text.isascii()
+
+
+def _parse_midnight(day_key):
+    # day_key: "17/May/2015 +0000"
+    month = MONTHS.get(day_key[3:6])
+    sign, tz_digits = day_key[12], day_key[13:]
+    if (
+        month is None
+        or day_key[2] != "/"
+        or day_key[6] != "/"
+        or day_key[11] != " "
+        or sign not in "+-"
+        or not _is_ascii_digits(day_key[:2] + day_key[7:11] + tz_digits)
+        or int(tz_digits[2:]) >= 60
+    ):
+        return None
+    offset = timedelta(hours=int(tz_digits[:2]), minutes=int(tz_digits[2:]))
+    midnight = datetime(
+        int(day_key[7:11]),
+        month,
+        int(day_key[:2]),
+        tzinfo=timezone(-offset if sign == "-" else offset),
+    )
+    if len(_midnight_cache) >= MAX_MIDNIGHT_CACHE_SIZE:
+        _midnight_cache.clear()
+    _midnight_cache[day_key] = midnight
+    return midnight
+
+
+def _parse_clock(clock):
+    # clock: "08:05:32"
+    digits = clock[:2] + clock[3:5] + clock[6:]
+    if clock[2] != ":" or clock[5] != ":" or not _is_ascii_digits(digits):
+        return None
+    hours, minutes, seconds = int(digits[:2]), int(digits[2:4]), int(digits[4:])
+    if hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    offset = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    _clock_cache[clock] = offset
+    return offset
+
+
+def parse_log_line_regex(line, fields=ALL_FIELDS, strings=None):
+    """
+    Разбор строки лога регулярным выражением LOG_PATTERN.
+
+    Эталонная реализация: parse_log_line использует её для строк
+    нестандартного вида, а её результаты должны совпадать с быстрым разбором.
+    """
     match = LOG_PATTERN.match(line)
     if not match:
         return None
 
-    time_str = match.group("time")
-    log_time = datetime.strptime(time_str, "%d/%b/%Y:%H:%M:%S %z")
-
-    return {
-        "ip": match.group("ip"),
-        "time": log_time,
-        "method": match.group("method"),
-        "resource": match.group("resource"),
-        "status": int(match.group("status")),
-        "size": int(match.group("size")) if match.group("size") != "-" else 0,
-        "agent": match.group("agent"),  # Добавляем поле agent
-    }
+    log_record = {}
+    if "ip" in fields:
+        log_record["ip"] = match.group("ip")
+    if "time" in fields:
+        log_record["time"] = datetime.strptime(match.group("time"), TIME_FORMAT)
+    if TIMESTAMP_FIELD in fields:
+        log_record[TIMESTAMP_FIELD] = timegm(
+            datetime.strptime(match.group("time"), TIME_FORMAT).timetuple()
+        )
+    if "method" in fields:
+        log_record["method"] = match.group("method")
+    if "resource" in fields:
+        log_record["resource"] = match.group("resource")
+    if "status" in fields:
+        log_record["status"] = int(match.group("status"))
+    if "size" in fields:
+        size = match.group("size")
+        log_record["size"] = int(size) if size != "-" else 0
+    if "agent" in fields:
+        log_record["agent"] = match.group("agent")  # Добавляем поле agent
+    if strings is not None:
+        for field in INTERNED_FIELDS:
+            if field in log_record:
+                value = log_record[field]
+                log_record[field] = strings.setdefault(value, value)
+    return log_record
+
+
+def split_log_line(line):
+    """
+    Разбиение строки лога стандартного вида на текстовые значения полей.
+
+    Строка делится на части по кавычкам, а части — по пробелам. Значения
+    не преобразуются, поэтому разбиение дешевле полного разбора.
+
+    Args:
+        line (str): Строка лога.
+
+    Returns:
+        tuple[str] | None: Значения ip, времени, метода, ресурса, кода статуса,
+        размера и user-agent, или None, если строка отличается от стандартного
+        вида и её нужно разбирать функцией parse_log_line_regex.
+    """
+    # ip - user [time] "method resource protocol" status size "referrer" "agent"
+    parts = line.split('"')
+    if len(parts) < 7 or parts[4] != " ":
+        return None
+
+    head = parts[0]
+    time_start = head.find(" [")
+    names = head[:time_start].split(" ")
+    time_str = head[time_start + 2 : -2]
+    request = parts[1].split(" ")
+    result = parts[2].split(" ")
+    # isprintable() ложно для всех пробельных символов, кроме самого пробела,
+    # поэтому вместе с split(" ") гарантирует токены без пробельных символов
+    if (
+        time_start < 0
+        or len(names) != 3
+        or "" in names
+        or not head.endswith("] ")
+        or not time_str
+        or "]" in time_str
+        or len(request) != 3
+        or "" in request
+        or len(result) != 4
+        or result[0]
+        or result[3]
+        or not result[1].isdecimal()
+        or not (result[2] == "-" or result[2].isdecimal())
+        or not head[:time_start].isprintable()
+        or not parts[1].isprintable()
+    ):
+        return None
+    return names[0], time_str, request[0], request[1], result[1], result[2], parts[5]
+
+
+def parse_log_line(line, fields=ALL_FIELDS, strings=None):
+    """
+    Разбор строки лога в формате combined.
+
+    Строка стандартного вида разбивается функцией split_log_line, время
+    разбирается функцией parse_log_time. Если строка хоть в чём-то отличается
+    от стандартного вида, она разбирается эталонной parse_log_line_regex,
+    поэтому результат всегда совпадает с ней.
+
+    Формат строки проверяется целиком при любом наборе полей, но преобразуются
+    только поля из fields. Если время не запрошено, оно не разбирается вовсе,
+    и строка с некорректным временем не вызывает ValueError.
+
+    Args:
+        line (str): Строка лога.
+        fields (frozenset[str]): Поля, которые нужно извлечь, см. ALL_FIELDS.
+        strings (StringTable, optional): Таблица, через которую интернируются
+            метод, ресурс и user-agent.
+
+    Returns:
+        dict | None: Запрошенные поля записи или None, если строка
+        не соответствует формату.
+    """
+    values = split_log_line(line)
+    if values is None:
+        return parse_log_line_regex(line, fields, strings)
+    ip, time_str, method, resource, status, size, agent = values
+    if strings is not None:
+        # Интернируются только запрошенные поля: остальные сразу освобождаются
+        intern = strings.setdefault
+        if fields is ALL_FIELDS or "method" in fields:
+            method = intern(method, method)
+        if fields is ALL_FIELDS or "resource" in fields:
+            resource = intern(resource, resource)
+        if fields is ALL_FIELDS or "agent" in fields:
+            agent = intern(agent, agent)
+
+    if fields is ALL_FIELDS:
+        return {
+            "ip": ip,
+            "time": parse_log_time(time_str),
+            "method": method,
+            "resource": resource,
+            "status": int(status),
+            "size": int(size) if size != "-" else 0,
+            "agent": agent,
+        }
+
+    log_record = {}
+    if "ip" in fields:
+        log_record["ip"] = ip
+    if "time" in fields:
+        log_record["time"] = parse_log_time(time_str)
+    if TIMESTAMP_FIELD in fields:
+        log_record[TIMESTAMP_FIELD] = parse_log_timestamp(time_str)
+    if "method" in fields:
+        log_record["method"] = method
+    if "resource" in fields:
+        log_record["resource"] = resource
+    if "status" in fields:
+        log_record["status"] = int(status)
+    if "size" in fields:
+        log_record["size"] = int(size) if size != "-" else 0
+    if "agent" in fields:
+        log_record["agent"] = agent
+    return log_record
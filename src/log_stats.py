@@ -1,6 +1,20 @@
+import json
+import os
 from collections import Counter
 from datetime import datetime, timedelta
 
+from src.log_parser import TIMESTAMP_FIELD
+from src.sketches import (
+    ExactQuantiles,
+    HyperLogLog,
+    LogHistogram,
+    SpaceSaving,
+    quantiles_from_dict,
+)
+
+# Версия формата снимка статистики; увеличивается при несовместимых изменениях
+SNAPSHOT_VERSION = 2
+
 
 class LogStatistics:
     """
@@ -11,32 +25,130 @@ class LogStatistics:
 
     Attributes:
         total_requests (int): Общее количество запросов.
-        resources (Counter): Счётчик ресурсов, запрашиваемых в логах.
+        resources (Counter | SpaceSaving): Счётчик ресурсов, запрашиваемых
+            в логах. При заданном top_k это приближённая сводка SpaceSaving
+            не больше чем из top_k ресурсов.
         status_codes (Counter): Счётчик кодов статусов ответов.
-        response_sizes (list): Список размеров ответов.
+        exact_quantiles (bool): Считать ли квантили размеров ответов точно.
+        top_k (int | None): Сколько ресурсов хранит приближённая сводка;
+            None — ресурсы считаются точно.
+        response_sizes (ExactQuantiles | LogHistogram): Распределение размеров
+            ответов. По умолчанию это LogHistogram с ограниченной памятью и
+            относительной погрешностью квантилей 1%, а при exact_quantiles=True —
+            точное распределение ExactQuantiles.
+        total_size (int): Суммарный размер ответов.
+        distinct_precision (int | None): Точность сводок HyperLogLog;
+            None — различные значения не считаются.
+        distinct (dict[str, HyperLogLog]): Сводки количества различных
+            значений полей DISTINCT_FIELDS, если задана distinct_precision.
+        bucket_seconds (int | None): Ширина корзин времени в секундах;
+            None — статистика не делится по времени.
+        buckets (dict[int, LogStatistics] | None): Статистика записей каждой
+            корзины времени по её началу (в секундах, см. поле "ts"), если
+            задана bucket_seconds. У корзин те же параметры подсчёта, но своих
+            корзин нет.
 
     Methods:
         update(log_record):
             Обновляет статистику на основе предоставленной записи лога.
 
+        merge(other):
+            Добавляет к статистике данные другого экземпляра LogStatistics.
+
+        rollup(seconds=None):
+            Объединяет корзины времени в более крупные.
+
+        window(start=None, end=None):
+            Статистика корзин времени из интервала без повторного разбора.
+
+        to_dict() / from_dict(data):
+            Преобразует статистику в снимок из JSON-совместимых типов и обратно.
+
+        save(path) / load(path):
+            Сохраняет снимок статистики в файл и загружает его.
+
         is_within_date_range(log_record, from_date=None, to_date=None):
             Проверяет, находится ли время записи лога в заданном диапазоне дат.
 
         average_size():
             Вычисляет средний размер ответов.
 
+        quantile(q):
+            Вычисляет q-квантиль размеров ответов.
+
+        quantiles(levels):
+            Вычисляет несколько квантилей размеров ответов за один проход.
+
         percentile_95():
             Вычисляет 95-й процентиль размеров ответов.
     """
 
-    def __init__(self):
+    # Поля записи лога, которые читает метод update
+    RECORD_FIELDS = frozenset(("resource", "status", "size"))
+
+    # Поля, для которых считается количество различных значений
+    DISTINCT_FIELDS = ("ip", "agent", "resource")
+
+    def __init__(
+        self,
+        exact_quantiles=False,
+        top_k=None,
+        distinct_precision=None,
+        bucket_seconds=None,
+    ):
         """
         Инициализирует экземпляр класса LogStatistics.
+
+        Args:
+            exact_quantiles (bool): Считать ли квантили размеров ответов точно.
+            top_k (int, optional): Размер приближённой сводки ресурсов;
+                None — считать ресурсы точно.
+            distinct_precision (int, optional): Точность сводок HyperLogLog
+                для количества различных значений DISTINCT_FIELDS; None —
+                не считать их.
+            bucket_seconds (int, optional): Ширина корзин времени, по которым
+                дополнительно собирается статистика; None — не делить её
+                по времени.
         """
         self.total_requests = 0
-        self.resources = Counter()
+        self.resources = SpaceSaving(top_k) if top_k else Counter()
         self.status_codes = Counter()
-        self.response_sizes = []
+        self.exact_quantiles = exact_quantiles
+        self.top_k = top_k
+        self.response_sizes = ExactQuantiles() if exact_quantiles else LogHistogram()
+        self.total_size = 0
+        self.distinct_precision = distinct_precision
+        self.distinct = (
+            {field: HyperLogLog(distinct_precision) for field in self.DISTINCT_FIELDS}
+            if distinct_precision
+            else {}
+        )
+        self.bucket_seconds = bucket_seconds
+        self.buckets = {} if bucket_seconds else None
+
+    @classmethod
+    def record_fields(cls, distinct_precision=None, bucket_seconds=None):
+        """Поля записи, которые читает метод update при заданных параметрах."""
+        fields = cls.RECORD_FIELDS
+        if distinct_precision:
+            fields = fields | frozenset(cls.DISTINCT_FIELDS)
+        if bucket_seconds:
+            fields = fields | {TIMESTAMP_FIELD}
+        return fields
+
+    def new_bucket(self):
+        """Пустая статистика корзины времени с теми же параметрами подсчёта."""
+        return LogStatistics(self.exact_quantiles, self.top_k, self.distinct_precision)
+
+    def bucket(self, start):
+        """
+        Статистика корзины времени, начинающейся в start; создаётся, если
+        её ещё нет.
+        """
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = self.new_bucket()
+        return bucket
 
     def update(self, log_record):
         """
@@ -49,7 +161,276 @@ class LogStatistics:
         self.total_requests += 1
         self.resources[log_record["resource"]] += 1
         self.status_codes[log_record["status"]] += 1
-        self.response_sizes.append(log_record["size"])
+        self.response_sizes.add(log_record["size"])
+        self.total_size += log_record["size"]
+        if self.distinct:
+            for field, sketch in self.distinct.items():
+                sketch.add(log_record[field])
+        if self.buckets is not None:
+            log_time = log_record[TIMESTAMP_FIELD]
+            self.bucket(log_time - log_time % self.bucket_seconds).update(log_record)
+
+    def merge(self, other):
+        """
+        Добавляет к статистике данные другого экземпляра LogStatistics.
+
+        Порядок объединения важен только для порядка ресурсов с одинаковым
+        количеством запросов: чтобы отчёт совпадал с последовательной обработкой,
+        частичные статистики нужно объединять в порядке следования строк.
+
+        Args:
+            other (LogStatistics): Статистика, которую нужно добавить.
+
+        Returns:
+            LogStatistics: Текущий экземпляр.
+
+        Raises:
+            ValueError: Если статистики используют разные способы подсчёта
+                квантилей, ресурсов или различных значений либо разные
+                корзины времени.
+        """
+        if self.bucket_seconds != other.bucket_seconds:
+            raise ValueError("Cannot merge statistics with different time buckets")
+        self._merge_totals(other)
+        if self.buckets is not None:
+            for start, bucket in other.buckets.items():
+                self.bucket(start).merge(bucket)
+        return self
+
+    def _merge_totals(self, other):
+        # Объединение всего, кроме корзин времени
+        if isinstance(self.resources, SpaceSaving) != isinstance(
+            other.resources, SpaceSaving
+        ):
+            raise ValueError("Cannot merge exact resource counts with a top-K summary")
+        if self.distinct.keys() != other.distinct.keys():
+            raise ValueError("Cannot merge statistics with and without distinct counts")
+        for field, sketch in self.distinct.items():
+            sketch.merge(other.distinct[field])
+        self.response_sizes.merge(other.response_sizes)
+        self.total_requests += other.total_requests
+        self.resources.update(other.resources)
+        self.status_codes.update(other.status_codes)
+        self.total_size += other.total_size
+
+    def totals(self):
+        """
+        Статистика тех же записей без корзин времени.
+
+        Returns:
+            LogStatistics: Новый экземпляр с общими итогами self.
+        """
+        totals = self.new_bucket()
+        totals._merge_totals(self)
+        return totals
+
+    def rollup(self, seconds=None):
+        """
+        Объединяет корзины времени в корзины шириной seconds без повторного
+        разбора, например часовые — в суточные.
+
+        Args:
+            seconds (int, optional): Ширина новых корзин, кратная
+                bucket_seconds; по умолчанию bucket_seconds.
+
+        Returns:
+            dict[int, LogStatistics]: Новые корзины по их началу в порядке
+            времени.
+
+        Raises:
+            ValueError: Если статистика не делится по времени или seconds
+                не кратна bucket_seconds.
+        """
+        if self.buckets is None:
+            raise ValueError("Statistics are not bucketed by time")
+        seconds = seconds or self.bucket_seconds
+        if seconds % self.bucket_seconds:
+            raise ValueError(
+                f"Rollup of {seconds}s is not a multiple of {self.bucket_seconds}s buckets"
+            )
+        rolled = {}
+        for start in sorted(self.buckets):
+            rolled_start = start - start % seconds
+            if rolled_start not in rolled:
+                rolled[rolled_start] = self.new_bucket()
+            rolled[rolled_start].merge(self.buckets[start])
+        return rolled
+
+    def window(self, start=None, end=None):
+        """
+        Статистика записей из интервала [start, end), собранная из корзин
+        времени без повторного разбора.
+
+        В интервал попадают корзины, начало которых лежит в нём, поэтому
+        ответ точен, если границы интервала кратны bucket_seconds.
+        Корзины объединяются в порядке времени: ресурсы с одинаковым
+        количеством запросов могут идти в другом порядке, чем при разборе
+        строк, если строки записаны не по порядку времени.
+
+        Args:
+            start (int, optional): Начало интервала в секундах, см. поле "ts".
+            end (int, optional): Исключённый конец интервала.
+
+        Returns:
+            LogStatistics: Статистика интервала с его корзинами.
+
+        Raises:
+            ValueError: Если статистика не делится по времени.
+        """
+        if self.buckets is None:
+            raise ValueError("Statistics are not bucketed by time")
+        selected = LogStatistics(
+            self.exact_quantiles,
+            self.top_k,
+            self.distinct_precision,
+            self.bucket_seconds,
+        )
+        for bucket_start in sorted(self.buckets):
+            if (start is None or bucket_start >= start) and (
+                end is None or bucket_start < end
+            ):
+                bucket = self.buckets[bucket_start]
+                selected._merge_totals(bucket)
+                selected.bucket(bucket_start).merge(bucket)
+        return selected
+
+    def __add__(self, other):
+        if not isinstance(other, LogStatistics):
+            return NotImplemented
+        return (
+            LogStatistics(
+                self.exact_quantiles,
+                self.top_k,
+                self.distinct_precision,
+                self.bucket_seconds,
+            )
+            .merge(self)
+            .merge(other)
+        )
+
+    def to_dict(self):
+        """
+        Преобразует статистику в снимок из JSON-совместимых типов.
+
+        Распределение размеров ответов сохраняется в виде своего снимка:
+        корзин гистограммы или пар «размер — количество» для точного режима.
+        Приближённая сводка ресурсов сохраняется вместе с погрешностями,
+        сводки различных значений — регистрами HyperLogLog, корзины
+        времени — снимками своей статистики.
+
+        Returns:
+            dict: Снимок статистики.
+        """
+        return {
+            "version": SNAPSHOT_VERSION,
+            "total_requests": self.total_requests,
+            "resources": (
+                self.resources.to_dict()
+                if isinstance(self.resources, SpaceSaving)
+                else list(self.resources.items())
+            ),
+            "status_codes": list(self.status_codes.items()),
+            "total_size": self.total_size,
+            "sizes": self.response_sizes.to_dict(),
+            "distinct": {
+                field: sketch.to_dict() for field, sketch in self.distinct.items()
+            },
+            "buckets": (
+                None
+                if self.buckets is None
+                else {
+                    "seconds": self.bucket_seconds,
+                    "items": [
+                        [start, self.buckets[start].to_dict()]
+                        for start in sorted(self.buckets)
+                    ],
+                }
+            ),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Восстанавливает статистику из снимка, созданного методом to_dict.
+
+        Args:
+            data (dict): Снимок статистики.
+
+        Returns:
+            LogStatistics: Восстановленная статистика.
+
+        Raises:
+            ValueError: Если версия снимка не поддерживается.
+        """
+        version = data.get("version")
+        if version == 1:
+            # В первой версии размеры хранились только точным распределением
+            sizes = ExactQuantiles.from_dict({"values": data["sizes"]})
+            total_size = sum(size * count for size, count in data["sizes"])
+        elif version == SNAPSHOT_VERSION:
+            sizes = quantiles_from_dict(data["sizes"])
+            total_size = data["total_size"]
+        else:
+            raise ValueError(f"Unsupported statistics snapshot version: {version}")
+
+        if isinstance(data["resources"], dict):
+            resources = SpaceSaving.from_dict(data["resources"])
+        else:
+            resources = Counter(dict(data["resources"]))
+        # Снимки без различных значений сохранены до их появления
+        distinct = {
+            field: HyperLogLog.from_dict(sketch)
+            for field, sketch in data.get("distinct", {}).items()
+        }
+        stats = cls(
+            exact_quantiles=isinstance(sizes, ExactQuantiles),
+            top_k=getattr(resources, "capacity", None),
+        )
+        if distinct:
+            stats.distinct_precision = next(iter(distinct.values())).precision
+            stats.distinct = distinct
+        stats.total_requests = data["total_requests"]
+        stats.resources = resources
+        stats.status_codes = Counter(dict(data["status_codes"]))
+        stats.response_sizes = sizes
+        stats.total_size = total_size
+        # Снимки без корзин времени сохранены до их появления
+        buckets = data.get("buckets")
+        if buckets is not None:
+            stats.bucket_seconds = buckets["seconds"]
+            stats.buckets = {
+                start: cls.from_dict(bucket) for start, bucket in buckets["items"]
+            }
+        return stats
+
+    def save(self, path):
+        """
+        Сохраняет снимок статистики в JSON-файл.
+
+        Файл записывается атомарно, поэтому параллельный читатель никогда
+        не увидит наполовину записанный снимок.
+
+        Args:
+            path (str): Путь к файлу снимка.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Загружает статистику из JSON-файла снимка.
+
+        Args:
+            path (str): Путь к файлу снимка.
+
+        Returns:
+            LogStatistics: Загруженная статистика.
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
 
     @staticmethod
     def is_within_date_range(log_record, from_date=None, to_date=None):
@@ -88,15 +469,42 @@ class LogStatistics:
         """
         Вычисляет средний размер ответов.
 
+        Среднее считается точно в любом режиме подсчёта квантилей.
+
         Returns:
             float: Средний размер ответа, или 0, если ответов нет.
         """
         return (
-            sum(self.response_sizes) / len(self.response_sizes)
-            if self.response_sizes
+            self.total_size / self.response_sizes.count
+            if self.response_sizes.count
             else 0
         )
 
+    def quantile(self, q):
+        """
+        Вычисляет q-квантиль размеров ответов.
+
+        Args:
+            q (float): Уровень квантиля от 0 до 1, например 0.999 для 99.9p.
+
+        Returns:
+            float: q-квантиль размеров ответов, или 0, если ответов нет.
+        """
+        return self.response_sizes.quantile(q)
+
+    def quantiles(self, levels):
+        """
+        Вычисляет несколько квантилей размеров ответов за один проход
+        по распределению.
+
+        Args:
+            levels (Iterable[float]): Уровни квантилей от 0 до 1.
+
+        Returns:
+            list[float]: Квантили в порядке levels; нули, если ответов нет.
+        """
+        return self.response_sizes.quantiles(levels)
+
     def percentile_95(self):
         """
         Вычисляет 95-й процентиль размеров ответов.
@@ -104,8 +512,4 @@ class LogStatistics:
         Returns:
             float: 95-й процентиль размеров ответов, или 0, если ответов нет.
         """
-        if not self.response_sizes:
-            return 0
-        sorted_sizes = sorted(self.response_sizes)
-        index = int(len(sorted_sizes) * 0.95) - 1
-        return sorted_sizes[index]
+        return self.quantile(0.95)
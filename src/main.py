@@ -1,87 +1,610 @@
 import logging
+import os
 import platform
 import argparse
 import glob
-from src.file_handler import load_logs
-from src.log_parser import parse_log_line
-from src.log_stats import LogStatistics
-from src.output_formatter import format_output
+import re
+import sys
+from contextlib import nullcontext
+from datetime import datetime
+from src.cache import DEFAULT_CACHE_DIR, AggregateCache
+from src.checkpoint import DEFAULT_STATE_DIR, CheckpointStore
+from src.file_handler import PREFETCH_DEPTH, PREFETCH_MAX_BYTES
+from src.filters import FieldFilter
+from src.http_loader import HTTP_CONCURRENCY
+from src import instrumentation
+from src.output_formatter import (
+    OUTPUT_FORMATS,
+    TEXT_FORMATS,
+    ReportSummary,
+    write_report,
+)
+from src.pipeline import AnalysisOptions, analyze_file, analyze_files
+from src.sketches import DEFAULT_HLL_PRECISION, MAX_HLL_PRECISION, MIN_HLL_PRECISION
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+# Модули загрузки по HTTP, параллельной обработки, колоночного движка (numpy),
+# хранилища и режима --follow импортируются только там, где они нужны:
+# запуск по локальным файлам не должен платить за их загрузку.
+
+
+def columnar_available():
+    from src.columnar import is_available
+
+    return is_available()
+
 
 def get_log_file_list(path_pattern):
     return glob.glob(path_pattern)
 
 
-def main() -> None:
-    logger.info(platform.python_version())
+def parse_percentiles(value):
+    try:
+        percentiles = tuple(float(item) for item in value.split(",") if item.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid percentile list: {value!r}")
+    if not all(0 < p <= 100 for p in percentiles):
+        raise argparse.ArgumentTypeError("percentiles must be in the range (0, 100]")
+    return percentiles
 
-    parser = argparse.ArgumentParser(description="NGINX Log Analyzer")
-    parser.add_argument(
-        "--path", required=True, help="Path or URL to log files (can include wildcards)"
-    )
+
+# Единицы интервалов --timeseries в секундах
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(value):
+    match = re.fullmatch(r"(\d+)([smhd]?)", value.strip())
+    if not match or not int(match[1]):
+        raise argparse.ArgumentTypeError(f"invalid interval: {value!r}")
+    return int(match[1]) * INTERVAL_UNITS[match[2] or "s"]
+
+
+def parse_filter(value):
+    try:
+        return FieldFilter.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_date(value):
+    # Даты сравниваются со временем записей по их местным часам, поэтому
+    # часовой пояс в дате не поддерживается
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    if date.tzinfo is not None:
+        raise argparse.ArgumentTypeError(f"time zone is not supported: {value!r}")
+    return value
+
+
+def add_filter_arguments(parser):
+    """Параметры фильтрации и формата отчёта, общие для запуска и query."""
     parser.add_argument(
         "--from",
         dest="from_date",
+        type=parse_date,
         help="Start date for filtering logs (ISO8601 format)",
     )
     parser.add_argument(
-        "--to", dest="to_date", help="End date for filtering logs (ISO8601 format)"
+        "--to",
+        dest="to_date",
+        type=parse_date,
+        help="End date for filtering logs (ISO8601 format)",
     )
     parser.add_argument(
         "--filter-field", help='Field to filter logs by (e.g., "agent", "method")'
     )
     parser.add_argument(
         "--filter-value",
-        help='Value to filter logs by (supports wildcards, e.g., "Mozilla*")',
+        help='Glob pattern the --filter-field value must match (e.g., "Mozilla*")',
+    )
+    parser.add_argument(
+        "--filter",
+        dest="filters",
+        action="append",
+        type=parse_filter,
+        help='Additional field filter, can be repeated: "field=glob", "field!=glob", '
+        '"field~regex" or "field!~regex" (e.g., "status!=2*")',
+    )
+    parser.add_argument(
+        "--filter-any",
+        action="store_true",
+        help="Keep records matching any field filter instead of all of them",
     )
     parser.add_argument(
         "--format",
-        choices=["markdown", "adoc"],
+        choices=OUTPUT_FORMATS,
         default="markdown",
-        help="Output format",
+        help="Output format; json, ndjson and csv are meant for other tools",
     )
 
-    args = parser.parse_args()
 
+def add_output_argument(parser):
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write the report to FILE instead of stdout",
+    )
+
+
+def add_statistics_arguments(parser):
+    """Параметры подсчёта статистики, общие для запуска и query."""
+    parser.add_argument(
+        "--exact-quantiles",
+        action="store_true",
+        help="Compute response size quantiles exactly instead of with a 1%% error sketch",
+    )
+    parser.add_argument(
+        "--percentiles",
+        type=parse_percentiles,
+        default=(),
+        help='Additional response size percentiles to report (e.g., "50,90,99,99.9")',
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        metavar="CAPACITY",
+        help="Count resources approximately with a Space-Saving summary of "
+        "CAPACITY entries to bound memory; counts that may be overestimated "
+        "are reported with their error bound",
+    )
+    parser.add_argument(
+        "--distinct",
+        nargs="?",
+        type=int,
+        const=DEFAULT_HLL_PRECISION,
+        metavar="PRECISION",
+        help="Report approximate numbers of unique IPs, user agents and "
+        "resources using HyperLogLog sketches of 2^PRECISION registers "
+        f"(default precision: {DEFAULT_HLL_PRECISION}, about 1.6%% error)",
+    )
+    parser.add_argument(
+        "--timeseries",
+        type=parse_interval,
+        metavar="INTERVAL",
+        help='Add a time series section with one row per INTERVAL (e.g., "15m", '
+        '"1h", "1d"); intervals of whole hours are rolled up from hourly buckets, '
+        "which also answer any --from/--to window from the cache",
+    )
+
+
+def check_statistics_arguments(parser, args):
+    if args.top_k is not None and args.top_k < 1:
+        parser.error("--top-k must be positive")
+    if args.distinct is not None and not (
+        MIN_HLL_PRECISION <= args.distinct <= MAX_HLL_PRECISION
+    ):
+        parser.error(
+            f"--distinct precision must be between {MIN_HLL_PRECISION} "
+            f"and {MAX_HLL_PRECISION}"
+        )
+
+
+def analyze_logs(args, options):
+    """
+    Сбор статистики по источникам логов из аргументов командной строки.
+
+    Returns:
+        tuple[LogStatistics, list[str]]: Общая статистика и список файлов,
+        в которых нашлись подходящие записи.
+    """
     # Загрузка логов
-    log_files = get_log_file_list(args.path) or [args.path]
-    stats = LogStatistics()
-    processed_files = []
-
-    for log_file in log_files:
-        logs = load_logs(log_file)
-        file_has_valid_logs = False
-
-        for log_line in logs:
-            log_record = parse_log_line(log_line)
-            if log_record:
-
-                # Проверяем диапазон дат
-                if stats.is_within_date_range(log_record, args.from_date, args.to_date):
-                    # Проверка фильтрации
-                    if args.filter_field and args.filter_value:
-                        field_value = log_record.get(args.filter_field)
-
-                        if field_value:
-                            # Если использовать '*' для поиска
-                            if args.filter_value.replace("*", "") in field_value:
-                                stats.update(log_record)
-                                file_has_valid_logs = True
-                    else:
-                        stats.update(log_record)
-                        file_has_valid_logs = True
-
-        if file_has_valid_logs:
-            processed_files.append(log_file)
-
-    # Формирование отчета
-    report = format_output(
-        stats, processed_files, args.from_date, args.to_date, args.format
-    )
-    print(report)
+    with instrumentation.stage("discover"):
+        log_files = [
+            log_file
+            for path in args.path
+            for log_file in get_log_file_list(path) or [path]
+        ]
+    workers = args.workers or os.cpu_count()
+    cache = (
+        None
+        if args.no_cache
+        else AggregateCache(args.cache_dir, use_hash=args.cache_hash)
+    )
+
+    if args.incremental:
+        checkpoints = CheckpointStore(args.state_dir)
+        stats = options.statistics()
+        processed_files = []
+
+        for log_file in log_files:
+            if os.path.isfile(log_file):
+                file_stats, has_valid_logs = checkpoints.analyze(log_file, options)
+            else:
+                file_stats, has_valid_logs = analyze_file(log_file, options, cache)
+            stats.merge(file_stats)
+            if has_valid_logs:
+                processed_files.append(log_file)
+        return stats, processed_files
+
+    if workers > 1:
+        from src.parallel import analyze_parallel
+
+        return analyze_parallel(log_files, options, workers, cache)
+
+    fetcher = None
+    if any(log_file.startswith("http") for log_file in log_files):
+        from src.http_loader import HttpFetcher
+
+        fetcher = HttpFetcher(args.http_concurrency)
+    return analyze_files(
+        log_files,
+        options,
+        cache,
+        depth=args.prefetch_depth,
+        max_bytes=args.prefetch_memory << 20,
+        fetcher=fetcher,
+    )
+
+
+def print_report(args, stats, files):
+    """
+    Выводит отчёт в stdout или в файл --output.
+
+    Показатели отчёта вычисляются один раз (этап "format"), а сам отчёт
+    выводится по частям (этап "output").
+    """
+    with instrumentation.stage("format"):
+        summary = ReportSummary(
+            stats,
+            files,
+            args.from_date,
+            args.to_date,
+            args.percentiles,
+            args.timeseries,
+        )
+    with instrumentation.stage("output"):
+        target = (
+            open(args.output, "w", encoding="utf-8")
+            if args.output
+            else nullcontext(sys.stdout)
+        )
+        with target as out:
+            write_report(summary, args.format, out)
+
+
+def add_store_argument(parser):
+    from src.store import DEFAULT_STORE_DIR
+
+    parser.add_argument(
+        "--store",
+        default=DEFAULT_STORE_DIR,
+        help=f"Directory of the columnar log store (default: {DEFAULT_STORE_DIR})",
+    )
+
+
+def ingest_main(argv):
+    """Команда analyzer ingest: загрузка логов в колоночное хранилище."""
+    parser = argparse.ArgumentParser(
+        prog="analyzer ingest",
+        description="Load parsed log records into a columnar store "
+        "partitioned by day",
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument(
+        "--path",
+        required=True,
+        nargs="+",
+        help="Paths or URLs of log files (can include wildcards)",
+    )
+    add_store_argument(parser)
+    args = parser.parse_args(argv)
+    if not columnar_available():
+        parser.error("the store requires numpy (pip install numpy)")
+
+    from src.store import ColumnStore
+
+    store = ColumnStore(args.store)
+    for source in [
+        log_file for path in args.path for log_file in get_log_file_list(path) or [path]
+    ]:
+        try:
+            result = store.ingest(source)
+        except Exception as e:
+            print(f"Error processing file {source}: {e}")
+            continue
+        if result is None:
+            print(f"{source}: up to date")
+        else:
+            print(f"{source}: {result[0]} records, {result[1]} unparsable lines")
+
+
+def query_main(argv):
+    """Команда analyzer query: отчёт по записям колоночного хранилища."""
+    parser = argparse.ArgumentParser(
+        prog="analyzer query",
+        description="Report statistics of records in a columnar store",
+    )
+    add_store_argument(parser)
+    add_filter_arguments(parser)
+    add_output_argument(parser)
+    add_statistics_arguments(parser)
+    # Хранилище всегда обрабатывается по столбцам
+    parser.set_defaults(engine="columnar")
+    args = parser.parse_args(argv)
+    if not columnar_available():
+        parser.error("the store requires numpy (pip install numpy)")
+    check_statistics_arguments(parser, args)
+
+    from src.store import ColumnStore
+
+    try:
+        stats, sources = ColumnStore(args.store).query(AnalysisOptions.from_args(args))
+    except ValueError as e:
+        parser.error(str(e))
+    print_report(args, stats, sources)
+
+
+class QueryArgumentParser(argparse.ArgumentParser):
+    """Разбор параметров запроса к серверу: ошибка не завершает процесс."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def parse_report_query(argv):
+    """
+    Разбор параметров запроса к analyzer serve в виде аргументов командной
+    строки: фильтры, параметры подсчёта и формат, как у запуска без команды.
+
+    Returns:
+        argparse.Namespace: Параметры отчёта и options (AnalysisOptions).
+
+    Raises:
+        ValueError: Если параметры неверны.
+    """
+    parser = QueryArgumentParser(
+        prog="analyzer serve", add_help=False, allow_abbrev=False
+    )
+    add_filter_arguments(parser)
+    add_statistics_arguments(parser)
+    parser.set_defaults(engine="row")
+    args = parser.parse_args(argv)
+    check_statistics_arguments(parser, args)
+    args.options = AnalysisOptions.from_args(args)
+    return args
+
+
+def serve_main(argv):
+    """Команда analyzer serve: сервер запросов к статистике отслеживаемых логов."""
+    import signal
+
+    from src import server
+
+    parser = argparse.ArgumentParser(
+        prog="analyzer serve",
+        description="Keep log statistics in memory, follow appended lines and "
+        "answer report queries over HTTP",
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument(
+        "--path",
+        required=True,
+        nargs="+",
+        help="Paths of local log files to watch (can include wildcards)",
+    )
+    parser.add_argument(
+        "--host",
+        default=server.DEFAULT_HOST,
+        help=f"Address to listen on (default: {server.DEFAULT_HOST})",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=server.DEFAULT_PORT,
+        help=f"Port to listen on (default: {server.DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Listen on a Unix socket at PATH instead of TCP",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=server.REFRESH_INTERVAL,
+        help="How often to read appended lines and new files, in seconds "
+        f"(default: {server.REFRESH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--max-views",
+        type=int,
+        default=server.MAX_VIEWS,
+        help="How many distinct filter sets to keep in memory "
+        f"(default: {server.MAX_VIEWS})",
+    )
+    args = parser.parse_args(argv)
+    if any(path.startswith("http") for path in args.path):
+        parser.error("serve watches local files only")
+    if args.refresh_interval <= 0 or args.max_views < 1:
+        parser.error("--refresh-interval and --max-views must be positive")
+
+    log_server = server.LogServer(args.path, args.max_views)
+    # Сводки без фильтров готовы к первому запросу
+    log_server.refresh()
+    log_server.add_view(server.view_options(AnalysisOptions()))
+    try:
+        http_server = server.make_server(
+            log_server, parse_report_query, args.host, args.port, args.socket
+        )
+    except OSError as e:
+        parser.error(f"cannot listen: {e}")
+    if args.socket:
+        address = args.socket
+    else:
+        host, port = http_server.server_address[:2]
+        address = f"http://{host}:{port}"
+    print(f"Serving {len(log_server.snapshot.files)} files on {address}", flush=True)
+    # Остановка по SIGTERM, как по Ctrl+C, закрывает сервер и удаляет сокет
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve(log_server, http_server, args.refresh_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+# Команды, которые задаются первым аргументом; без команды выполняется анализ
+COMMANDS = {"ingest": ingest_main, "query": query_main, "serve": serve_main}
+
+
+def main() -> None:
+    logger.info(platform.python_version())
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command in COMMANDS:
+        COMMANDS[command](sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="NGINX Log Analyzer", fromfile_prefix_chars="@"
+    )
+    parser.add_argument(
+        "--path",
+        required=True,
+        nargs="+",
+        help="Paths or URLs of log files (can include wildcards); "
+        "@FILE reads them from FILE, one per line",
+    )
+    add_filter_arguments(parser)
+    add_output_argument(parser)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (0 means one per CPU core)",
+    )
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=PREFETCH_DEPTH,
+        help="Batches of lines read ahead per file by background readers "
+        f"(default: {PREFETCH_DEPTH})",
+    )
+    parser.add_argument(
+        "--prefetch-memory",
+        type=int,
+        default=PREFETCH_MAX_BYTES >> 20,
+        help="Memory in MiB for lines read ahead of the parser "
+        f"(default: {PREFETCH_MAX_BYTES >> 20})",
+    )
+    parser.add_argument(
+        "--http-concurrency",
+        type=int,
+        default=HTTP_CONCURRENCY,
+        help="Number of URLs downloaded at once over pooled keep-alive connections "
+        f"(default: {HTTP_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["row", "columnar"],
+        default="row",
+        help="Aggregation engine: per-record (row) or NumPy batches (columnar); "
+        "both produce the same report",
+    )
+    add_statistics_arguments(parser)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the per-file aggregate cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directory of the per-file aggregate cache (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-hash",
+        action="store_true",
+        help="Also compare file contents by SHA-256 when reusing cached aggregates",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Read only lines appended since the previous --incremental run "
+        "and report the accumulated statistics",
+    )
+    parser.add_argument(
+        "--state-dir",
+        default=DEFAULT_STATE_DIR,
+        help=f"Directory of --incremental checkpoints (default: {DEFAULT_STATE_DIR})",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep following appended lines like tail -F and periodically print "
+        "rolling 1m/5m/1h statistics",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between --follow reports (default: 5)",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Write run statistics (per-stage time, line and byte counters, "
+        "unparsable line samples, peak memory) as JSON to FILE or stderr",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Profile the run with cProfile: save pstats data to FILE "
+        "or print the most expensive functions to stderr",
+    )
+
+    args = parser.parse_args()
+    if args.engine == "columnar" and not columnar_available():
+        parser.error("--engine columnar requires numpy (pip install numpy)")
+    if args.prefetch_depth < 1 or args.prefetch_memory < 1:
+        parser.error("--prefetch-depth and --prefetch-memory must be positive")
+    if args.workers < 0:
+        parser.error("--workers must not be negative")
+    if args.http_concurrency < 1:
+        parser.error("--http-concurrency must be positive")
+    check_statistics_arguments(parser, args)
+    if args.follow and len(args.path) > 1:
+        parser.error("--follow accepts a single --path")
+    if args.follow and (args.stats or args.profile):
+        parser.error("--stats and --profile do not apply to --follow")
+    if args.follow and args.timeseries:
+        parser.error("--timeseries does not apply to --follow")
+    if args.follow and (args.output or args.format not in TEXT_FORMATS):
+        parser.error("--follow prints markdown or adoc reports to stdout")
+    if args.refresh_interval <= 0:
+        parser.error("--refresh-interval must be positive")
+
+    options = AnalysisOptions.from_args(args)
+    if args.follow:
+        from src.follow import follow
+
+        try:
+            follow(args.path[0], options, args.format, args.refresh_interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    run_stats = instrumentation.enable() if args.stats else None
+    profiler = instrumentation.start_profiler() if args.profile else None
+    with instrumentation.stage("total"):
+        with instrumentation.stage("analyze"):
+            stats, processed_files = analyze_logs(args, options)
+
+        # Формирование отчета
+        print_report(args, stats, processed_files)
+
+    if profiler is not None:
+        instrumentation.save_profile(profiler, args.profile)
+    if run_stats is not None:
+        instrumentation.disable()
+        instrumentation.write_stats(run_stats, args.stats)
 
 
 if __name__ == "__main__":
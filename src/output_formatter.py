@@ -1,67 +1,490 @@
-def format_output(stats, files, from_date, to_date, output_format):
+import csv
+import heapq
+import io
+import json
+from datetime import datetime, timezone
+from operator import itemgetter
+
+from src.sketches import SpaceSaving
+
+# Сколько самых популярных ресурсов выводится в отчёте
+TOP_RESOURCES = 10
+
+# Текстовые форматы отчёта; после них, как после print, выводится перевод строки
+TEXT_FORMATS = ("markdown", "adoc")
+
+
+def format_output(
+    stats,
+    files,
+    from_date,
+    to_date,
+    output_format,
+    percentiles=(),
+    timeseries=None,
+):
+    """
+    Отчёт по статистике в виде строки.
+
+    Args:
+        stats (LogStatistics): Статистика.
+        files (list[str]): Обработанные файлы.
+        from_date (str, optional): Начальная дата фильтра.
+        to_date (str, optional): Конечная дата фильтра.
+        output_format (str): Формат отчёта из OUTPUT_FORMATS.
+        percentiles (tuple[float]): Дополнительные процентили размера ответа.
+        timeseries (int, optional): Шаг временного ряда в секундах.
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+    """
+    writer = report_writer(output_format)
+    summary = ReportSummary(stats, files, from_date, to_date, percentiles, timeseries)
+    return "".join(writer(summary))
+
+
+def write_report(summary, output_format, out):
+    """
+    Выводит отчёт в поток по частям, не собирая его в одну строку.
+
+    Args:
+        summary (ReportSummary): Сводка для отчёта.
+        output_format (str): Формат отчёта из OUTPUT_FORMATS.
+        out: Поток для вывода, например sys.stdout или открытый файл.
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+    """
+    for chunk in report_writer(output_format)(summary):
+        out.write(chunk)
+    if output_format in TEXT_FORMATS:
+        out.write("\n")
+
+
+def report_writer(output_format):
+    """Функция, порождающая части отчёта формата output_format по сводке."""
+    try:
+        return REPORT_WRITERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unsupported output format: {output_format}") from None
+
+
+def window_label(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def format_rates(rates, output_format):
+    """
+    Таблица скорости запросов за скользящие окна для режима --follow.
+
+    Args:
+        rates (list[tuple[int, int, float]]): Длина окна в секундах,
+            количество запросов и запросов в секунду.
+        output_format (str): Формат вывода.
+    """
     if output_format == "markdown":
-        return format_markdown(stats, files, from_date, to_date)
+        rows = "".join(
+            f"|  {window_label(seconds)}  |    {total}  |    {rate:.2f}\n"
+            for seconds, total, rate in rates
+        )
+        return f"""
+#### Скорость запросов
+
+|  Окно  |  Количество  |  Запросов/с  |
+|:------:|-------------:|-------------:|
+{rows}"""
     elif output_format == "adoc":
-        return format_adoc(stats, files, from_date, to_date)
+        rows = "".join(
+            f"|{window_label(seconds)} |{total} |{rate:.2f}\n"
+            for seconds, total, rate in rates
+        )
+        return f"""
+== Скорость запросов
+
+|=== 
+|Окно |Количество |Запросов/с
+{rows}|===
+"""
     else:
         raise ValueError(f"Unsupported output format: {output_format}")
 
 
-def format_markdown(stats, files, from_date, to_date):
-    resources = stats.resources.most_common(10)
-    status_codes = stats.status_codes.most_common()
+def top_items(counter, n=None):
+    """
+    Пары (ключ, счётчик) по убыванию счётчика, как Counter.most_common.
+
+    Для n используется heapq.nlargest, поэтому выбор первых n ключей
+    не сортирует весь счётчик.
+
+    Args:
+        counter (Counter | SpaceSaving): Счётчик.
+        n (int, optional): Сколько пар вернуть; None — все.
+    """
+    if n is None:
+        return sorted(counter.items(), key=itemgetter(1), reverse=True)
+    return heapq.nlargest(n, counter.items(), key=itemgetter(1))
+
+
+def count_label(count, error):
+    """
+    Количество запросов ресурса для отчёта.
+
+    Счётчик приближённой сводки SpaceSaving может превышать точное количество;
+    если это возможно, к нему добавляется граница погрешности.
+    """
+    return f"{count} (±{error})" if error else f"{count}"
+
+
+def percentile_label(percentile):
+    return f"{percentile:g}p размера ответа"
+
+
+# Подписи количества различных значений полей в отчёте
+DISTINCT_LABELS = {
+    "ip": "Уникальных IP",
+    "agent": "Уникальных user-agent",
+    "resource": "Уникальных ресурсов",
+}
+
+
+def distinct_counts(stats):
+    """
+    Оценки количества различных значений полей для отчёта.
+
+    Returns:
+        list[tuple[str, int]]: Поля и оценки HyperLogLog; пустой список,
+        если статистика их не считает.
+    """
+    distinct = getattr(stats, "distinct", None) or {}
+    return [(field, sketch.count()) for field, sketch in distinct.items()]
+
 
-    return f"""
+# Классы кодов ответа в строках временного ряда
+STATUS_CLASSES = (2, 3, 4, 5)
+
+
+def timeseries_rows(stats, interval):
+    """
+    Строки временного ряда для отчёта.
+
+    Args:
+        stats (LogStatistics): Статистика, разделённая на корзины времени.
+        interval (int, optional): Шаг ряда в секундах, кратный ширине корзин.
+
+    Returns:
+        list[tuple]: Начало периода в секундах Unix по времени записей лога,
+        количество запросов, 95-й процентиль размера ответа, количество
+        ответов каждого класса STATUS_CLASSES и самый популярный ресурс
+        (None, если запросов нет); пустой список, если ряд не запрошен
+        или статистика не делится по времени.
+    """
+    if not interval or getattr(stats, "buckets", None) is None:
+        return []
+    rows = []
+    for start, bucket in stats.rollup(interval).items():
+        classes = dict.fromkeys(STATUS_CLASSES, 0)
+        for code, count in bucket.status_codes.items():
+            if code // 100 in classes:
+                classes[code // 100] += count
+        top = top_items(bucket.resources, 1)
+        rows.append(
+            (
+                start,
+                bucket.total_requests,
+                bucket.percentile_95(),
+                *classes.values(),
+                top[0][0] if top else None,
+            )
+        )
+    return rows
+
+
+def period_start(start):
+    return datetime.fromtimestamp(start, timezone.utc)
+
+
+class ReportSummary:
+    """
+    Показатели отчёта, вычисленные по статистике один раз.
+
+    Все форматы выводят одну и ту же сводку, поэтому квантили, выбор
+    популярных ресурсов и свёртка временного ряда не повторяются при выводе.
+
+    Attributes:
+        files (list[str]): Обработанные файлы.
+        from_date (str | None): Начальная дата фильтра.
+        to_date (str | None): Конечная дата фильтра.
+        total_requests (int): Количество запросов.
+        average_size (float): Средний размер ответа.
+        percentile_95 (float): 95-й процентиль размера ответа.
+        percentiles (list[tuple[float, float]]): Дополнительные процентили
+            и их значения.
+        distinct (list[tuple[str, int]]): Оценки количества различных
+            значений полей, см. distinct_counts.
+        resources (list[tuple[str, int, int | None]]): TOP_RESOURCES самых
+            популярных ресурсов: ресурс, количество и граница погрешности
+            (None при точном подсчёте).
+        status_codes (list[tuple[int, int]]): Коды ответа по убыванию
+            количества.
+        timeseries (int | None): Шаг временного ряда в секундах.
+        timeseries_rows (list[tuple]): Строки ряда, см. timeseries_rows.
+    """
+
+    def __init__(
+        self, stats, files, from_date, to_date, percentiles=(), timeseries=None
+    ):
+        self.files = list(files)
+        self.from_date = from_date
+        self.to_date = to_date
+        self.total_requests = stats.total_requests
+        self.average_size = stats.average_size()
+        self.percentile_95 = stats.percentile_95()
+        # Дополнительные процентили вычисляются за один проход по распределению
+        self.percentiles = (
+            list(zip(percentiles, stats.quantiles([p / 100 for p in percentiles])))
+            if percentiles
+            else []
+        )
+        self.distinct = distinct_counts(stats)
+
+        resources = stats.resources
+        approximate = isinstance(resources, SpaceSaving)
+        self.resources = [
+            (resource, count, resources.error(resource) if approximate else None)
+            for resource, count in top_items(resources, TOP_RESOURCES)
+        ]
+        self.status_codes = top_items(stats.status_codes)
+        self.timeseries = timeseries
+        self.timeseries_rows = timeseries_rows(stats, timeseries)
+
+    def to_dict(self):
+        """Сводка в виде словаря для форматов json и ndjson, без ресурсов и ряда."""
+        return {
+            "files": self.files,
+            "from_date": self.from_date,
+            "to_date": self.to_date,
+            "total_requests": self.total_requests,
+            "average_size": self.average_size,
+            "percentiles": {
+                f"{p:g}": value
+                for p, value in ((95, self.percentile_95), *self.percentiles)
+            },
+            "distinct": dict(self.distinct),
+        }
+
+    def resource_dicts(self):
+        for resource, count, error in self.resources:
+            item = {"resource": resource, "count": count}
+            if error is not None:
+                item["error"] = error
+            yield item
+
+    def status_dicts(self):
+        for code, count in self.status_codes:
+            yield {"status": code, "count": count}
+
+    def timeseries_dicts(self):
+        for start, total, p95, *classes, top in self.timeseries_rows:
+            item = {
+                "start": period_start(start).isoformat(),
+                "requests": total,
+                "percentile_95": p95,
+            }
+            item.update(
+                (f"{code}xx", count) for code, count in zip(STATUS_CLASSES, classes)
+            )
+            item["top_resource"] = top
+            yield item
+
+
+def write_markdown(summary):
+    files = "\n|                       |  ".join(summary.files)
+    yield f"""
 #### Общая информация
 
 |        Метрика        |        Значение        |
 |:---------------------:|-----------------------:|
-|       Файл(-ы)        |  {'\n|                       |  '.join(files)}
-|    Начальная дата     |   {from_date or '-'}
-|     Конечная дата     |   {to_date or '-'}
-|  Количество запросов  |   {stats.total_requests}
-| Средний размер ответа |   {stats.average_size():.2f}b
-|   95p размера ответа  |   {stats.percentile_95():.2f}b
+|       Файл(-ы)        |  {files}
+|    Начальная дата     |   {summary.from_date or '-'}
+|     Конечная дата     |   {summary.to_date or '-'}
+|  Количество запросов  |   {summary.total_requests}
+| Средний размер ответа |   {summary.average_size:.2f}b
+|   95p размера ответа  |   {summary.percentile_95:.2f}b
+"""
+    for p, value in summary.percentiles:
+        yield f"|{percentile_label(p):^23}|   {value:.2f}b\n"
+    for field, count in summary.distinct:
+        yield f"|{DISTINCT_LABELS[field]:^23}|   ~{count}\n"
 
+    yield """
 #### Запрашиваемые ресурсы
 
 |         Ресурс         |  Количество  |
 |:----------------------:|-------------:|
-{"".join([f"|  {res}  |    {count}\n" for res, count in resources])}
+"""
+    for resource, count, error in summary.resources:
+        yield f"|  {resource}  |    {count_label(count, error)}\n"
+
+    yield """
 #### Коды ответа
 
 | Код |  Количество |
 |:---:|------------:|
-{"".join([f"| {code} |    {count}\n" for code, count in status_codes])}
-    """
+"""
+    for code, count in summary.status_codes:
+        yield f"| {code} |    {count}\n"
+
+    if summary.timeseries_rows:
+        yield f"""
+#### Динамика запросов (шаг {window_label(summary.timeseries)})
 
+|      Начало      |  Запросов  |  95p размера ответа  |  2xx  |  3xx  |  4xx  |  5xx  |  Популярный ресурс  |
+|:----------------:|-----------:|---------------------:|------:|------:|------:|------:|:-------------------:|
+"""
+        for start, total, p95, c2, c3, c4, c5, top in summary.timeseries_rows:
+            yield (
+                f"| {period_start(start):%Y-%m-%d %H:%M} |    {total}  |    {p95:.2f}b  "
+                f"|  {c2}  |  {c3}  |  {c4}  |  {c5}  |  {top or '-'}\n"
+            )
+    yield "\n    "
 
-def format_adoc(stats, files, from_date, to_date):
-    resources = stats.resources.most_common(10)
-    status_codes = stats.status_codes.most_common()
 
-    return f"""
+def write_adoc(summary):
+    yield f"""
 == Общая информация
 
 |=== 
 |Метрика                |Значение
-|Файл(-ы)               |{', '.join(files)}
-|Начальная дата         |{from_date or '-'}
-|Конечная дата          |{to_date or '-'}
-|Количество запросов    |{stats.total_requests}
-|Средний размер ответа  |{stats.average_size():.2f}b
-|95p размера ответа     |{stats.percentile_95():.2f}b
-|===
+|Файл(-ы)               |{', '.join(summary.files)}
+|Начальная дата         |{summary.from_date or '-'}
+|Конечная дата          |{summary.to_date or '-'}
+|Количество запросов    |{summary.total_requests}
+|Средний размер ответа  |{summary.average_size:.2f}b
+|95p размера ответа     |{summary.percentile_95:.2f}b
+"""
+    for p, value in summary.percentiles:
+        yield f"|{percentile_label(p):<23}|{value:.2f}b\n"
+    for field, count in summary.distinct:
+        yield f"|{DISTINCT_LABELS[field]:<23}|~{count}\n"
+
+    yield """|===
 
 == Запрашиваемые ресурсы
 
 |=== 
 |Ресурс               |Количество
-{"".join([f"|{res} |{count}\n" for res, count in resources])}|===
+"""
+    for resource, count, error in summary.resources:
+        yield f"|{resource} |{count_label(count, error)}\n"
+
+    yield """|===
 
 == Коды ответа
 
 |=== 
 |Код |Количество
-{"".join([f"|{code} |{count}\n" for code, count in status_codes])}|===
+"""
+    for code, count in summary.status_codes:
+        yield f"|{code} |{count}\n"
+    yield "|==="
+
+    if summary.timeseries_rows:
+        yield f"""
+
+== Динамика запросов (шаг {window_label(summary.timeseries)})
+
+|=== 
+|Начало |Запросов |95p размера ответа |2xx |3xx |4xx |5xx |Популярный ресурс
+"""
+        for start, total, p95, c2, c3, c4, c5, top in summary.timeseries_rows:
+            yield (
+                f"|{period_start(start):%Y-%m-%d %H:%M} |{total} |{p95:.2f}b "
+                f"|{c2} |{c3} |{c4} |{c5} |{top or '-'}\n"
+            )
+        yield "|==="
+    yield "\n    "
+
+
+def write_json(summary):
+    report = summary.to_dict()
+    report["resources"] = list(summary.resource_dicts())
+    report["status_codes"] = list(summary.status_dicts())
+    report["timeseries"] = summary.timeseries and {
+        "interval": summary.timeseries,
+        "rows": list(summary.timeseries_dicts()),
+    }
+    yield from json.JSONEncoder(indent=2).iterencode(report)
+    yield "\n"
+
+
+def write_ndjson(summary):
+    """
+    Отчёт в формате NDJSON: по объекту JSON в строке, вид объекта задаётся
+    полем type — summary, resource, status или timeseries.
     """
+    yield json.dumps({"type": "summary", **summary.to_dict()}) + "\n"
+    for kind, items in (
+        ("resource", summary.resource_dicts()),
+        ("status", summary.status_dicts()),
+        ("timeseries", summary.timeseries_dicts()),
+    ):
+        for item in items:
+            yield json.dumps({"type": kind, **item}) + "\n"
+
+
+# Заголовок отчёта в формате csv
+CSV_HEADER = ("section", "key", "metric", "value")
+
+
+def csv_rows(summary):
+    """Строки отчёта в формате csv в «длинном» виде: раздел, ключ, показатель, значение."""
+    for file in summary.files:
+        yield "summary", "", "file", file
+    yield "summary", "", "from_date", summary.from_date or ""
+    yield "summary", "", "to_date", summary.to_date or ""
+    yield "summary", "", "total_requests", summary.total_requests
+    yield "summary", "", "average_size", summary.average_size
+    for p, value in ((95, summary.percentile_95), *summary.percentiles):
+        yield "percentile", f"{p:g}", "size", value
+    for field, count in summary.distinct:
+        yield "distinct", field, "count", count
+    for resource, count, error in summary.resources:
+        yield "resource", resource, "count", count
+        if error is not None:
+            yield "resource", resource, "error", error
+    for code, count in summary.status_codes:
+        yield "status", code, "count", count
+    for item in summary.timeseries_dicts():
+        start = item.pop("start")
+        for metric, value in item.items():
+            yield "timeseries", start, metric, "" if value is None else value
+
+
+def write_csv(summary):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for row in csv_rows(summary):
+        writer.writerow(row)
+        # Строки выводятся по мере формирования, а не одной строкой в конце
+        if buffer.tell() >= io.DEFAULT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Функции вывода отчёта по форматам
+REPORT_WRITERS = {
+    "markdown": write_markdown,
+    "adoc": write_adoc,
+    "json": write_json,
+    "ndjson": write_ndjson,
+    "csv": write_csv,
+}
+
+# Поддерживаемые форматы отчёта
+OUTPUT_FORMATS = tuple(REPORT_WRITERS)
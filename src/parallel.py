@@ -0,0 +1,185 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from src import instrumentation
+from src.file_handler import split_file
+from src.pipeline import (
+    analyze_source,
+    indexed_ranges,
+    lookup_cache,
+    summarize_source,
+)
+
+# Минимальный размер куска файла, который имеет смысл отдавать отдельному процессу
+MIN_CHUNK_SIZE = 1 << 20
+
+# Сколько задач в среднем приходится на один процесс: с запасом, чтобы
+# процессы, которым достались быстрые куски, не простаивали
+TASKS_PER_WORKER = 4
+
+
+def plan_tasks(log_files, workers, min_chunk_size=MIN_CHUNK_SIZE, file_ranges=None):
+    """
+    Разбиение источников логов на задачи для пула процессов.
+
+    Большие локальные файлы режутся на диапазоны байт так, чтобы на каждый
+    процесс приходилось несколько задач. URL и несуществующие пути
+    обрабатываются целиком одной задачей.
+
+    Args:
+        log_files (list[str]): Пути к файлам или URL.
+        workers (int): Количество процессов.
+        min_chunk_size (int): Минимальный размер диапазона в байтах.
+        file_ranges (dict[str, list[tuple[int, int]]], optional): Диапазоны
+            байт, которые нужно прочитать из файлов, например по индексу
+            времени; остальные файлы читаются целиком.
+
+    Returns:
+        list[tuple[str, int | None, int | None]]: Задачи (источник, начало, конец)
+        в порядке следования строк.
+    """
+    file_ranges = file_ranges or {}
+    local_sizes = {
+        log_file: (
+            sum(end - start for start, end in file_ranges[log_file])
+            if log_file in file_ranges
+            else os.path.getsize(log_file)
+        )
+        for log_file in log_files
+        if os.path.isfile(log_file)
+    }
+    total_size = sum(local_sizes.values())
+    chunk_size = max(
+        min_chunk_size, math.ceil(total_size / (workers * TASKS_PER_WORKER))
+    )
+
+    tasks = []
+    for log_file in log_files:
+        if log_file in file_ranges:
+            # Строки читаются по началу, поэтому диапазоны режутся без
+            # поиска границ строк
+            tasks.extend(
+                (log_file, chunk_start, min(chunk_start + chunk_size, end))
+                for start, end in file_ranges[log_file]
+                for chunk_start in range(start, end, chunk_size)
+            )
+        elif log_file in local_sizes:
+            tasks.extend(
+                (log_file, start, end)
+                for start, end in split_file(log_file, chunk_size)
+            )
+        else:
+            tasks.append((log_file, None, None))
+    return tasks
+
+
+def _run_task(task, options, summarize_files, instrumented=False):
+    # Статистика выполнения собирается в процессе заново для каждой задачи
+    # и возвращается вместе с результатом
+    collector = instrumentation.enable() if instrumented else None
+    source, start, end = task
+    if source in summarize_files:
+        result = summarize_source(source, options, start, end)
+    else:
+        result = (None, *analyze_source(source, options, start, end))
+    return result, collector and collector.to_dict()
+
+
+def analyze_parallel(log_files, options, workers, cache=None):
+    """
+    Сбор статистики по источникам логов в пуле процессов.
+
+    Каждый процесс собирает частичную статистику LogStatistics по своему файлу
+    или диапазону байт, после чего частичные результаты объединяются в порядке
+    следования строк. Поэтому отчёт совпадает с последовательной обработкой.
+    Файлы, статистику которых можно взять из кэша, в процессы не отправляются,
+    а для остальных процессы заодно собирают сводки для кэша. Из файлов,
+    которые диапазон дат пересекает частично, читаются только отрезки индекса
+    времени, пересекающиеся с диапазоном.
+
+    Args:
+        log_files (list[str]): Пути к файлам или URL.
+        options (AnalysisOptions): Параметры фильтрации.
+        workers (int): Количество процессов.
+        cache (AggregateCache, optional): Кэш сводок; None отключает кэш.
+
+    Returns:
+        tuple[LogStatistics, list[str]]: Общая статистика и список файлов,
+        в которых нашлись подходящие записи.
+    """
+    file_results = {}
+    cache_keys = {}
+    file_ranges = {}
+    pending_files = []
+
+    for log_file in log_files:
+        if log_file in file_results or log_file in pending_files:
+            # Повторно указанный файл читается один раз, а его статистика
+            # добавляется для каждого упоминания, как при последовательной
+            # обработке; в кэш попадает сводка одного прохода по файлу
+            continue
+        if cache is not None and os.path.isfile(log_file):
+            key, selected = lookup_cache(log_file, options, cache)
+            if selected is not None:
+                file_results[log_file] = selected
+                continue
+            if key is not None:
+                cache_keys[log_file] = key
+            else:
+                ranges = indexed_ranges(log_file, options, cache)
+                if ranges == []:
+                    file_results[log_file] = (
+                        options.statistics(),
+                        False,
+                    )
+                    continue
+                if ranges is not None:
+                    file_ranges[log_file] = ranges
+        pending_files.append(log_file)
+
+    tasks = plan_tasks(pending_files, workers, file_ranges=file_ranges)
+    if tasks:
+        summaries = {}
+        # Файлы, при чтении которых была ошибка: их сводки неполные
+        failed = set()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                _run_task,
+                tasks,
+                repeat(options),
+                repeat(frozenset(cache_keys)),
+                repeat(instrumentation.collector is not None),
+            )
+            for (source, _, _), (result, run_stats) in zip(tasks, results):
+                summary, partial, has_valid_logs = result
+                if run_stats is not None:
+                    instrumentation.collector.merge(run_stats)
+                if source in file_results:
+                    file_stats, file_has_valid_logs = file_results[source]
+                    partial = file_stats.merge(partial)
+                    has_valid_logs = has_valid_logs or file_has_valid_logs
+                file_results[source] = partial, has_valid_logs
+                if source not in cache_keys:
+                    continue
+                if summary is None:
+                    failed.add(source)
+                elif source in summaries:
+                    summaries[source].merge(summary)
+                else:
+                    summaries[source] = summary
+
+        for source, summary in summaries.items():
+            if source not in failed:
+                cache.put(cache_keys[source], summary.to_dict())
+
+    stats = options.statistics()
+    processed_files = []
+    for log_file in log_files:
+        partial, has_valid_logs = file_results[log_file]
+        stats.merge(partial)
+        if has_valid_logs:
+            processed_files.append(log_file)
+
+    return stats, processed_files
@@ -0,0 +1,638 @@
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+from src import instrumentation
+from src.file_handler import (
+    PREFETCH_DEPTH,
+    PREFETCH_MAX_BYTES,
+    PREFETCH_READERS,
+    PrefetchingLoader,
+    load_logs,
+    load_logs_from_file,
+    load_logs_from_range,
+    load_logs_from_ranges,
+    report_errors,
+)
+from src.filters import FieldFilter, RecordFilter
+from src.http_loader import HttpFetcher
+from src.log_parser import TIMESTAMP_FIELD, parse_log_line
+from src.log_stats import LogStatistics
+from src.time_index import (
+    TimeIndexBuilder,
+    can_index,
+    load_time_index,
+    save_time_index,
+)
+
+# Начало отсчёта поля "ts" записей
+EPOCH = datetime(1970, 1, 1)
+
+# Ширина корзин времени для интервалов временного ряда, кратных часу. Из одних
+# и тех же часовых корзин складываются ряды по часам и по дням и статистика
+# любого диапазона дат, поэтому их сводки в кэше подходят для всех таких
+# запросов.
+HOURLY_BUCKET_SECONDS = 3600
+
+
+def bucket_seconds_for(interval):
+    """
+    Ширина корзин времени, из которых собирается временной ряд с шагом
+    interval секунд.
+
+    Returns:
+        int | None: HOURLY_BUCKET_SECONDS для интервалов, кратных часу,
+        иначе сам interval; None, если интервал не задан.
+    """
+    if not interval:
+        return None
+    return HOURLY_BUCKET_SECONDS if interval % HOURLY_BUCKET_SECONDS == 0 else interval
+
+
+@dataclass(frozen=True)
+class AnalysisOptions:
+    """
+    Параметры обработки логов, общие для всех файлов одного запуска.
+
+    Attributes:
+        from_date (str): Начальная дата в формате ISO8601.
+        to_date (str): Конечная дата в формате ISO8601.
+        filter_field (str): Поле записи для фильтрации.
+        filter_value (str): Шаблон glob для значения поля фильтрации.
+        exact_quantiles (bool): Считать ли квантили размеров ответов точно.
+        filters (tuple[FieldFilter]): Дополнительные условия --filter.
+        match_any (bool): Пропускать запись, если выполнено хотя бы одно
+            условие на поля, а не все.
+        engine (str): Движок подсчёта: "row" — построчный, "columnar" —
+            пакетный на NumPy. Оба дают одинаковую статистику.
+        top_k (int): Размер приближённой сводки ресурсов SpaceSaving;
+            None — ресурсы считаются точно.
+        distinct_precision (int): Точность сводок HyperLogLog количества
+            различных ip, user-agent и ресурсов; None — не считать их.
+        bucket_seconds (int): Ширина корзин времени, по которым дополнительно
+            собирается статистика, см. bucket_seconds_for; None — не делить
+            её по времени.
+    """
+
+    from_date: str = None
+    to_date: str = None
+    filter_field: str = None
+    filter_value: str = None
+    exact_quantiles: bool = False
+    filters: tuple = ()
+    match_any: bool = False
+    engine: str = "row"
+    top_k: int = None
+    distinct_precision: int = None
+    bucket_seconds: int = None
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            from_date=args.from_date,
+            to_date=args.to_date,
+            filter_field=args.filter_field,
+            filter_value=args.filter_value,
+            exact_quantiles=args.exact_quantiles,
+            filters=tuple(args.filters or ()),
+            match_any=args.filter_any,
+            engine=args.engine,
+            top_k=args.top_k,
+            distinct_precision=args.distinct,
+            bucket_seconds=bucket_seconds_for(args.timeseries),
+        )
+
+    def field_filters(self):
+        """Все условия на поля: --filter-field/--filter-value и --filter."""
+        if self.filter_field and self.filter_value:
+            return (FieldFilter(self.filter_field, self.filter_value),) + self.filters
+        return self.filters
+
+    def statistics(self):
+        """Пустая статистика с параметрами подсчёта запуска."""
+        return LogStatistics(
+            self.exact_quantiles,
+            self.top_k,
+            self.distinct_precision,
+            self.bucket_seconds,
+        )
+
+    def record_fields(self):
+        """Поля записи, которые нужны статистике запуска."""
+        return LogStatistics.record_fields(self.distinct_precision, self.bucket_seconds)
+
+    def record_filter(self):
+        """Собирает фильтры запуска в один предикат, см. RecordFilter."""
+        return RecordFilter(
+            self.field_filters(), self.from_date, self.to_date, self.match_any
+        )
+
+
+def date_window(options):
+    """
+    Границы диапазона дат в том же виде, что использует is_within_date_range.
+
+    Returns:
+        tuple[datetime | None, datetime | None]: Начало диапазона и исключённый
+        конец диапазона (следующий день после to_date) без часового пояса.
+    """
+    start = datetime.fromisoformat(options.from_date) if options.from_date else None
+    end = (
+        datetime.fromisoformat(options.to_date) + timedelta(days=1)
+        if options.to_date
+        else None
+    )
+    return start, end
+
+
+def needs_time(options):
+    """
+    Нужно ли время записей для ответа на запрос options: задан диапазон дат
+    или статистика делится на корзины времени.
+    """
+    return bool(options.from_date or options.to_date or options.bucket_seconds)
+
+
+def analyze_lines(lines, stats, options, strings=None):
+    """
+    Разбор строк логов и накопление статистики по прошедшим фильтры записям.
+
+    Args:
+        lines (Iterable[str]): Строки логов.
+        stats (LogStatistics): Статистика, которую нужно дополнить; подойдёт
+            любой объект с методами update(log_record) и merge(LogStatistics).
+        options (AnalysisOptions): Параметры фильтрации.
+        strings (StringTable, optional): Таблица интернирования строковых
+            полей записей; её размер проверяется в начале вызова. Нужна, если
+            stats долго хранит много агрегатов с одними и теми же ресурсами.
+
+    Returns:
+        bool: True, если хотя бы одна запись попала в статистику.
+    """
+    if options.engine == "columnar":
+        from src.columnar import analyze_lines_columnar
+
+        return analyze_lines_columnar(lines, stats, options, strings=strings)
+
+    has_valid_logs = False
+    if strings is not None:
+        strings.trim()
+    record_filter = options.record_filter()
+    fields = options.record_fields() | record_filter.fields
+    prefilter = record_filter.prefilter
+    matches = record_filter.matches
+    parse = parse_log_line
+    update = stats.update
+    collector = instrumentation.collector
+    if collector is not None:
+        parse = collector.parser(parse)
+        prefilter = collector.predicate(prefilter)
+        matches = collector.predicate(matches)
+        update = collector.timed("count", update, "records_accepted")
+
+    for log_line in lines:
+        # Строку без обязательных подстрок фильтров можно не разбирать
+        if prefilter is not None and not prefilter(log_line):
+            continue
+        log_record = parse(log_line, fields, strings)
+        if log_record:
+
+            # Проверяем диапазон дат и фильтры по полям
+            if matches is None or matches(log_record):
+                update(log_record)
+                has_valid_logs = True
+
+    return has_valid_logs
+
+
+def analyze_source(source, options, start=None, end=None):
+    """
+    Сбор частичной статистики по одному источнику логов.
+
+    Args:
+        source (str): Путь к файлу или URL.
+        options (AnalysisOptions): Параметры фильтрации.
+        start (int, optional): Начало диапазона байт локального файла.
+        end (int, optional): Конец диапазона байт локального файла.
+
+    Returns:
+        tuple[LogStatistics, bool]: Статистика источника и признак того,
+        что в нём нашлись подходящие записи.
+    """
+    stats = options.statistics()
+    if start is None:
+        return stats, analyze_lines(load_logs(source), stats, options)
+
+    # Ошибки чтения диапазона обрабатываются так же, как в load_logs_from_files:
+    # сообщаем о них и оставляем уже накопленную статистику
+    try:
+        has_valid_logs = analyze_lines(
+            load_logs_from_range(source, start, end), stats, options
+        )
+    except Exception as e:
+        print(f"Error processing file {source}: {e}")
+        has_valid_logs = stats.total_requests > 0
+    return stats, has_valid_logs
+
+
+class FileSummary:
+    """
+    Статистика файла без учёта диапазона дат вместе с границами его времени.
+
+    По границам времени можно ответить на запрос с любым диапазоном дат,
+    который покрывает файл целиком или не пересекается с ним, не разбирая
+    файл заново. Поэтому именно эта сводка хранится в кэше. Если статистика
+    разделена на корзины времени, границы которых совпадают с границами
+    диапазона, ответ собирается из корзин и для диапазона, пересекающего
+    файл частично.
+
+    Attributes:
+        stats (LogStatistics): Статистика записей, прошедших фильтр по полю.
+        has_valid_logs (bool): Нашлись ли такие записи.
+        min_time (datetime | None): Время самой ранней записи файла.
+        max_time (datetime | None): Время самой поздней записи файла.
+        timed (bool): Известны ли границы времени. Если запросу время
+            не нужно, оно не разбирается, и сводка отвечает только
+            на запросы без диапазона дат.
+    """
+
+    def __init__(self, stats=None, timed=True):
+        self.stats = stats if stats is not None else LogStatistics()
+        self.has_valid_logs = False
+        self.min_time = None
+        self.max_time = None
+        self.timed = timed
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.has_valid_logs = self.has_valid_logs or other.has_valid_logs
+        self.timed = self.timed and other.timed
+        if other.min_time is not None:
+            if self.min_time is None or other.min_time < self.min_time:
+                self.min_time = other.min_time
+            if self.max_time is None or other.max_time > self.max_time:
+                self.max_time = other.max_time
+        return self
+
+    def select(self, options):
+        """
+        Статистика файла для диапазона дат из options без повторного разбора.
+
+        Returns:
+            tuple[LogStatistics, bool] | None: Статистика и признак наличия
+            подходящих записей, или None, если диапазон пересекает файл
+            частично и не совпадает с границами корзин времени либо границы
+            времени файла неизвестны.
+        """
+        if not self.timed:
+            if needs_time(options):
+                return None
+            return self.stats, self.has_valid_logs
+        if self.min_time is None:
+            return self.stats, False
+        start, end = date_window(options)
+        if (start is not None and self.max_time < start) or (
+            end is not None and self.min_time >= end
+        ):
+            return options.statistics(), False
+        if (start is None or start <= self.min_time) and (
+            end is None or self.max_time < end
+        ):
+            return self.stats, self.has_valid_logs
+        if self.stats.buckets is not None:
+            record_filter = options.record_filter()
+            bounds = (record_filter.start, record_filter.end)
+            if all(t is None or t % self.stats.bucket_seconds == 0 for t in bounds):
+                stats = self.stats.window(record_filter.start, record_filter.end)
+                return stats, stats.total_requests > 0
+        return None
+
+    def to_dict(self):
+        return {
+            "stats": self.stats.to_dict(),
+            "has_valid_logs": self.has_valid_logs,
+            "min_time": self.min_time and self.min_time.isoformat(),
+            "max_time": self.max_time and self.max_time.isoformat(),
+            "timed": self.timed,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        summary.stats = LogStatistics.from_dict(data["stats"])
+        summary.has_valid_logs = data["has_valid_logs"]
+        summary.timed = data.get("timed", True)
+        if data["min_time"] is not None:
+            summary.min_time = datetime.fromisoformat(data["min_time"])
+            summary.max_time = datetime.fromisoformat(data["max_time"])
+        return summary
+
+
+def summarize_lines(lines, options, index_builder=None):
+    """
+    Один проход по строкам, собирающий сводку файла и статистику для options.
+
+    Args:
+        lines (Iterable[str]): Строки файла.
+        options (AnalysisOptions): Параметры фильтрации.
+        index_builder (TimeIndexBuilder, optional): Построитель индекса времени,
+            которому передаются все строки файла с их временем. Колоночный
+            движок индекс не строит.
+
+    Returns:
+        tuple[FileSummary, LogStatistics, bool]: Сводка файла без учёта
+        диапазона дат, статистика с его учётом и признак подходящих записей.
+    """
+    if options.engine == "columnar":
+        from src.columnar import summarize_lines_columnar
+
+        return summarize_lines_columnar(lines, options)
+
+    # Без диапазона дат, корзин и индекса время не разбирается: сводка
+    # без границ времени отвечает на такие же запросы, а первый запрос
+    # с диапазоном дат разберёт файл заново и заменит её в кэше
+    timed = index_builder is not None or needs_time(options)
+    summary = FileSummary(options.statistics(), timed)
+    stats = options.statistics()
+    has_valid_logs = False
+    record_filter = options.record_filter()
+    start, end = record_filter.start, record_filter.end
+    matches_fields = record_filter.matches_fields
+    min_time = max_time = None
+    # Строки нельзя отбрасывать до разбора: по всем записям вычисляются
+    # границы времени файла
+    fields = options.record_fields() | record_filter.fields
+    if timed:
+        fields |= {TIMESTAMP_FIELD}
+    add_to_index = index_builder.add if index_builder is not None else None
+    parse = parse_log_line
+    update_summary = summary.stats.update
+    update = stats.update
+    collector = instrumentation.collector
+    if collector is not None:
+        parse = collector.parser(parse)
+        matches_fields = collector.predicate(matches_fields)
+        update_summary = collector.timed("count", update_summary)
+        update = collector.timed("count", update, "records_accepted")
+
+    for log_line in lines:
+        log_record = parse(log_line, fields)
+        if not log_record:
+            if add_to_index is not None:
+                add_to_index(log_line)
+            continue
+
+        if timed:
+            log_time = log_record[TIMESTAMP_FIELD]
+            if add_to_index is not None:
+                add_to_index(log_line, log_time)
+            if min_time is None or log_time < min_time:
+                min_time = log_time
+            if max_time is None or log_time > max_time:
+                max_time = log_time
+
+        if matches_fields is None or matches_fields(log_record):
+            update_summary(log_record)
+            summary.has_valid_logs = True
+            if (start is None or log_time >= start) and (end is None or log_time < end):
+                update(log_record)
+                has_valid_logs = True
+
+    if collector is not None:
+        # Записи, прошедшие фильтры по полям, но не попавшие в диапазон дат
+        collector.count(
+            "lines_filtered", summary.stats.total_requests - stats.total_requests
+        )
+    if min_time is not None:
+        summary.min_time = EPOCH + timedelta(seconds=min_time)
+        summary.max_time = EPOCH + timedelta(seconds=max_time)
+    return summary, stats, has_valid_logs
+
+
+def summarize_source(source, options, start=None, end=None):
+    """
+    Сводка локального файла или его диапазона байт, см. summarize_lines.
+
+    Об ошибке чтения выводится сообщение, а вместо сводки возвращается None:
+    сводку прочитанного не целиком файла нельзя сохранять в кэш.
+    """
+    if start is None:
+        lines = load_logs_from_file(source)
+    else:
+        lines = load_logs_from_range(source, start, end)
+    errors = []
+    summary, stats, has_valid_logs = summarize_lines(
+        report_errors(source, lines, errors), options
+    )
+    return None if errors else summary, stats, has_valid_logs
+
+
+def index_builder(source, options):
+    """
+    Построитель индекса времени для первого полного прохода по файлу.
+
+    Returns:
+        TimeIndexBuilder | None: None, если файл нельзя читать по диапазонам
+        байт, сводку считает колоночный движок или время записей запросу
+        не нужно.
+    """
+    if options.engine != "row" or not needs_time(options) or not can_index(source):
+        return None
+    return TimeIndexBuilder()
+
+
+def indexed_ranges(source, options, cache):
+    """
+    Диапазоны байт файла, в которых могут быть записи из диапазона дат options.
+
+    Индекс времени берётся из кэша, а если его нет, строится отдельным
+    проходом по файлу и сохраняется.
+
+    Returns:
+        list[tuple[int, int]] | None: Диапазоны байт или None, если файл
+        нужно читать целиком.
+    """
+    record_filter = options.record_filter()
+    if (record_filter.start is None and record_filter.end is None) or not can_index(
+        source
+    ):
+        return None
+    index = load_time_index(source, cache)
+    if index is None:
+        return None
+    return index.ranges(record_filter.start, record_filter.end)
+
+
+def cache_options(options):
+    """
+    Параметры, от которых зависит сводка файла: всё, кроме диапазона дат
+    и движка подсчёта.
+    """
+    return replace(options, from_date=None, to_date=None, engine="row")
+
+
+def lookup_cache(source, options, cache):
+    """
+    Поиск сводки локального файла в кэше.
+
+    Returns:
+        tuple[str | None, tuple[LogStatistics, bool] | None]: Ключ, под которым
+        нужно сохранить новую сводку (None, если сводка уже есть), и статистика
+        файла, если её удалось получить из кэша без разбора файла.
+    """
+    key = cache.key(source, cache_options(options))
+    entry = cache.get(key)
+    if entry is None:
+        return key, None
+    summary = FileSummary.from_dict(entry)
+    if not summary.timed and needs_time(options):
+        # Сводка собрана без времени: файл разбирается заново, а новая сводка
+        # с границами времени заменяет прежнюю
+        return key, None
+    return None, summary.select(options)
+
+
+def analyze_file(source, options, cache=None):
+    """
+    Статистика одного источника логов с использованием кэша сводок файлов.
+
+    Если сводка файла есть в кэше и диапазон дат покрывает файл целиком или
+    не пересекается с ним, файл не читается. Если сводки нет, файл разбирается
+    один раз, и сводка сохраняется в кэш.
+
+    Args:
+        source (str): Путь к файлу или URL.
+        options (AnalysisOptions): Параметры фильтрации.
+        cache (AggregateCache, optional): Кэш сводок; None отключает кэш.
+
+    Returns:
+        tuple[LogStatistics, bool]: Статистика источника и признак того,
+        что в нём нашлись подходящие записи.
+    """
+    if cache is None or not os.path.isfile(source):
+        return analyze_source(source, options)
+
+    key, selected = lookup_cache(source, options, cache)
+    if selected is not None:
+        return selected
+    if key is None:
+        # Сводка есть, но диапазон дат пересекает файл частично: читаются
+        # только отрезки индекса времени, которые пересекаются с диапазоном
+        ranges = indexed_ranges(source, options, cache)
+        if ranges is None:
+            return analyze_source(source, options)
+        stats = options.statistics()
+        lines = report_errors(source, load_logs_from_ranges(source, ranges))
+        return stats, analyze_lines(lines, stats, options)
+
+    builder = index_builder(source, options)
+    errors = []
+    summary, stats, has_valid_logs = summarize_lines(
+        report_errors(source, load_logs_from_file(source), errors), options, builder
+    )
+    if not errors:
+        cache.put(key, summary.to_dict())
+        save_time_index(source, cache, builder)
+    return stats, has_valid_logs
+
+
+def analyze_files(
+    log_files,
+    options,
+    cache=None,
+    depth=PREFETCH_DEPTH,
+    max_bytes=PREFETCH_MAX_BYTES,
+    fetcher=None,
+):
+    """
+    Последовательный сбор статистики по источникам логов с упреждающим чтением.
+
+    Локальные файлы, которых нет в кэше, и URL читаются потоками
+    PrefetchingLoader, пока разбираются предыдущие, поэтому чтение с диска
+    и загрузка по сети идут одновременно с разбором. URL загружаются
+    одновременно в fetcher.concurrency потоков через общий пул соединений.
+    При первом полном проходе по файлу строится индекс времени, а из файлов,
+    которые диапазон дат пересекает частично, читаются только отрезки
+    индекса, пересекающиеся с диапазоном.
+    Статистика объединяется в порядке источников, как в analyze_file, а об
+    ошибке чтения источника выводится сообщение.
+
+    Args:
+        log_files (list[str]): Пути к файлам или URL.
+        options (AnalysisOptions): Параметры фильтрации.
+        cache (AggregateCache, optional): Кэш сводок; None отключает кэш.
+        depth (int): Сколько пакетов строк одного источника может ждать разбора.
+        max_bytes (int): Сколько байт прочитанных данных может ждать разбора.
+        fetcher (HttpFetcher, optional): Загрузчик URL; по умолчанию создаётся
+            новый, если среди источников есть URL.
+
+    Returns:
+        tuple[LogStatistics, list[str]]: Общая статистика и список источников,
+        в которых нашлись подходящие записи.
+    """
+    file_results = {}
+    cache_keys = {}
+    file_ranges = {}
+    pending_files = []
+    readers = PREFETCH_READERS
+
+    for log_file in log_files:
+        if log_file.startswith("http"):
+            fetcher = fetcher or HttpFetcher()
+            readers = max(readers, fetcher.concurrency)
+        elif not os.path.isfile(log_file):
+            continue
+        elif cache is not None:
+            key, selected = lookup_cache(log_file, options, cache)
+            if selected is not None:
+                file_results[log_file] = selected
+                continue
+            if key is not None:
+                cache_keys[log_file] = key
+            else:
+                ranges = indexed_ranges(log_file, options, cache)
+                if ranges is not None:
+                    file_ranges[log_file] = ranges
+        pending_files.append(log_file)
+
+    pending = set(pending_files)
+    loader = PrefetchingLoader(
+        pending_files,
+        readers,
+        depth=depth,
+        max_bytes=max_bytes,
+        fetcher=fetcher,
+        ranges=file_ranges,
+    )
+    sources = iter(loader)
+    stats = options.statistics()
+    processed_files = []
+
+    for log_file in log_files:
+        if log_file in file_results:
+            file_stats, has_valid_logs = file_results[log_file]
+        elif log_file not in pending:
+            file_stats, has_valid_logs = analyze_source(log_file, options)
+        else:
+            _, lines = next(sources)
+            errors = []
+            lines = report_errors(log_file, lines, errors)
+            key = cache_keys.get(log_file)
+            if key is None:
+                file_stats = options.statistics()
+                has_valid_logs = analyze_lines(lines, file_stats, options)
+            else:
+                builder = index_builder(log_file, options)
+                summary, file_stats, has_valid_logs = summarize_lines(
+                    lines, options, builder
+                )
+                # Сводка и индекс файла, прочитанного не целиком, в кэш
+                # не попадают: иначе ошибка чтения осталась бы в нём
+                # до изменения файла
+                if not errors:
+                    cache.put(key, summary.to_dict())
+                    save_time_index(log_file, cache, builder)
+        stats.merge(file_stats)
+        if has_valid_logs:
+            processed_files.append(log_file)
+    return stats, processed_files
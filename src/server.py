@@ -0,0 +1,561 @@
+import errno
+import glob
+import io
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUnixStreamServer
+from stat import S_ISSOCK
+from urllib.parse import parse_qsl, urlsplit
+
+from src.checkpoint import FINGERPRINT_SIZE, file_fingerprint
+from src.compressed import detect_compression
+from src.file_handler import AppendedLinesReader
+from src.log_parser import TIMESTAMP_FIELD
+from src.output_formatter import ReportSummary, write_report
+from src.pipeline import (
+    EPOCH,
+    HOURLY_BUCKET_SECONDS,
+    FileSummary,
+    analyze_lines,
+    analyze_source,
+    cache_options,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Как часто сервер проверяет, появились ли новые строки и файлы, в секундах
+REFRESH_INTERVAL = 1.0
+
+# Сколько наборов фильтров сервер держит в памяти одновременно
+MAX_VIEWS = 8
+
+# Типы содержимого ответов по форматам отчёта
+CONTENT_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "adoc": "text/plain; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def view_options(options):
+    """
+    Параметры сводок файлов, из которых сервер отвечает на запрос с options.
+
+    Диапазон дат в них не входит: сводка разделена на корзины времени (по
+    умолчанию часовые), из которых собирается статистика любого диапазона,
+    кратного их ширине.
+    """
+    options = cache_options(options)
+    return replace(
+        options, bucket_seconds=options.bucket_seconds or HOURLY_BUCKET_SECONDS
+    )
+
+
+class TimeBounds:
+    """
+    Статистика для analyze_lines, которая дополнительно запоминает границы
+    времени добавленных записей.
+
+    Attributes:
+        stats (LogStatistics): Статистика записей.
+        min_time (int | None): Время самой ранней записи в секундах.
+        max_time (int | None): Время самой поздней записи в секундах.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.min_time = None
+        self.max_time = None
+
+    def update(self, log_record):
+        log_time = log_record[TIMESTAMP_FIELD]
+        if self.min_time is None or log_time < self.min_time:
+            self.min_time = log_time
+        if self.max_time is None or log_time > self.max_time:
+            self.max_time = log_time
+        self.stats.update(log_record)
+
+    def summary(self, has_valid_logs):
+        summary = FileSummary(self.stats)
+        summary.has_valid_logs = has_valid_logs
+        if self.min_time is not None:
+            summary.min_time = EPOCH + timedelta(seconds=self.min_time)
+            summary.max_time = EPOCH + timedelta(seconds=self.max_time)
+        return summary
+
+
+@dataclass(frozen=True)
+class FileState:
+    """
+    Сводка прочитанной части файла и признаки, по которым видно, что файл
+    изменился.
+
+    Недописанная последняя строка (без перевода строки) входит в summary,
+    как при обычном запуске, но не в committed: после дозаписи она
+    читается заново целиком.
+
+    Состояние не изменяется после создания: новые строки дают новое
+    состояние, поэтому его можно читать из любого потока без блокировок.
+
+    Attributes:
+        device (int): Устройство файла.
+        inode (int): Inode файла.
+        size (int): Размер файла при последней проверке.
+        mtime_ns (int): Время изменения файла при последней проверке.
+        offset (int): Смещение после последней законченной строки.
+        end (int): Смещение после последней прочитанной строки, включая
+            недописанную.
+        fingerprint (str): SHA-256 первых байт файла, см. file_fingerprint.
+        committed (FileSummary): Сводка законченных строк до offset.
+        summary (FileSummary): Сводка всех прочитанных строк до end.
+    """
+
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+    offset: int
+    end: int
+    fingerprint: str
+    committed: FileSummary
+    summary: FileSummary
+
+
+def summarize_appended(reader, options):
+    """Сводка строк reader, см. TimeBounds."""
+    appended = TimeBounds(options.statistics())
+    return appended.summary(analyze_lines(reader, appended, options))
+
+
+def merge_summaries(options, *summaries):
+    """Новая сводка, объединяющая summaries по порядку; они не изменяются."""
+    merged = FileSummary(options.statistics())
+    for summary in summaries:
+        merged.merge(summary)
+    return merged
+
+
+def read_file_state(path, options, previous=None):
+    """
+    Состояние файла с учётом строк, дописанных после previous.
+
+    Если файл не изменился, возвращается previous. Если его заменили (другой
+    inode), он стал короче прочитанного или изменилось его начало, файл
+    читается с начала.
+
+    Args:
+        path (str): Путь к локальному файлу логов.
+        options (AnalysisOptions): Параметры сводки, см. view_options.
+        previous (FileState, optional): Прежнее состояние файла.
+
+    Returns:
+        FileState: Новое состояние; previous не изменяется.
+    """
+    stat = os.stat(path)
+    if previous is not None:
+        same_file = (stat.st_dev, stat.st_ino) == (previous.device, previous.inode)
+        if (
+            same_file
+            and stat.st_size == previous.size
+            and stat.st_mtime_ns == previous.mtime_ns
+        ):
+            return previous
+        if (
+            not same_file
+            or stat.st_size < previous.offset
+            or file_fingerprint(path, min(previous.offset, FINGERPRINT_SIZE))
+            != previous.fingerprint
+        ):
+            previous = None
+
+    reader = AppendedLinesReader(path, previous.offset if previous else 0)
+    committed = summarize_appended(reader, options)
+    if previous is not None:
+        # Опубликованные сводки нельзя изменять: объединение строится заново
+        committed = merge_summaries(options, previous.committed, committed)
+    tail_reader = AppendedLinesReader(path, reader.offset, complete_only=False)
+    tail = summarize_appended(tail_reader, options)
+    summary = (
+        merge_summaries(options, committed, tail)
+        if tail_reader.offset > reader.offset
+        else committed
+    )
+    return FileState(
+        stat.st_dev,
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime_ns,
+        reader.offset,
+        tail_reader.offset,
+        file_fingerprint(path, min(reader.offset, FINGERPRINT_SIZE)),
+        committed,
+        summary,
+    )
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Неизменяемый снимок данных сервера, из которого отвечают на запросы.
+
+    Attributes:
+        version (int): Номер снимка; увеличивается при каждой публикации.
+        updated (float): Время публикации в секундах Unix.
+        files (tuple[str]): Файлы логов в порядке обработки.
+        views (dict): Состояния файлов FileState по путям для каждого набора
+            параметров view_options.
+    """
+
+    version: int = 0
+    updated: float = None
+    files: tuple = ()
+    views: dict = None
+
+
+class LogServer:
+    """
+    Статистика файлов логов, которая держится в памяти и дополняется по мере
+    дозаписи файлов.
+
+    Для каждого набора фильтров по полям (вида) хранятся сводки файлов
+    FileSummary. Вид создаётся при первом запросе с новыми фильтрами и
+    вытесняется, если к нему дольше всех не обращались, когда видов больше
+    max_views. Обновление читает только дописанные строки и публикует новый
+    неизменяемый снимок Snapshot; запросы читают последний опубликованный
+    снимок без блокировок, поэтому не ждут обновления и не мешают ему.
+
+    Attributes:
+        paths (list[str]): Пути к файлам логов (могут содержать символы
+            подстановки); новые файлы подхватываются при обновлении.
+        max_views (int): Сколько видов хранится одновременно.
+        snapshot (Snapshot): Последний опубликованный снимок.
+    """
+
+    def __init__(self, paths, max_views=MAX_VIEWS, clock=time.time):
+        self.paths = list(paths)
+        self.max_views = max_views
+        self.clock = clock
+        self.snapshot = Snapshot(views={})
+        self._lock = threading.Lock()
+        self._last_used = {}
+        # Последняя ошибка чтения каждого файла, о которой уже сообщили
+        self._errors = {}
+
+    def discover(self):
+        """Файлы логов по шаблонам paths без повторов, в порядке шаблонов."""
+        files = {}
+        for path in self.paths:
+            for log_file in glob.glob(path) or [path]:
+                if os.path.isfile(log_file):
+                    files[log_file] = None
+        return tuple(files)
+
+    def refresh(self):
+        """
+        Дочитывает дописанные строки и новые файлы всех видов и публикует
+        новый снимок, если что-то изменилось.
+
+        Returns:
+            Snapshot: Последний снимок.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            files = self.discover()
+            views = {}
+            changed = files != snapshot.files
+            for view, states in snapshot.views.items():
+                views[view] = self._read_states(files, view, states)
+                changed = (
+                    changed
+                    or views[view].keys() != states.keys()
+                    or any(views[view][path] is not states[path] for path in states)
+                )
+            if not changed:
+                return snapshot
+            return self._publish(files, views)
+
+    def _read_states(self, files, view, states):
+        new_states = {}
+        for path in files:
+            previous = states.get(path)
+            try:
+                new_states[path] = read_file_state(path, view, previous)
+            except OSError:
+                # Файл удалили или переименовали после поиска; он вернётся
+                # в снимок при следующем обновлении, если появится снова
+                continue
+            except Exception as e:
+                # Ошибка в одном файле не останавливает обновление остальных:
+                # его прежнее состояние остаётся в снимке, а чтение
+                # повторяется при следующем обновлении
+                self._report_error(path, e)
+                if previous is not None:
+                    new_states[path] = previous
+            else:
+                self._errors.pop(path, None)
+        return new_states
+
+    def _report_error(self, path, error):
+        # Об одной и той же ошибке сообщается один раз, а не на каждом обновлении
+        if self._errors.get(path) != str(error):
+            self._errors[path] = str(error)
+            print(f"Error processing file {path}: {error}", flush=True)
+
+    def _publish(self, files, views):
+        self.snapshot = Snapshot(self.snapshot.version + 1, self.clock(), files, views)
+        return self.snapshot
+
+    def add_view(self, view):
+        """
+        Читает файлы последнего снимка для нового вида и публикует снимок
+        с ним.
+
+        Файлы читаются без блокировки, поэтому обновление снимка в это время
+        не останавливается; строки, дописанные за время чтения, добавятся
+        при следующем обновлении.
+
+        Returns:
+            Snapshot: Снимок, в котором есть вид view.
+        """
+        files = self.snapshot.files or self.discover()
+        states = self._read_states(files, view, {})
+        with self._lock:
+            views = dict(self.snapshot.views)
+            if view in views:
+                return self.snapshot
+            while len(views) >= self.max_views:
+                oldest = min(views, key=lambda key: self._last_used.get(key, 0))
+                del views[oldest]
+                self._last_used.pop(oldest, None)
+            views[view] = states
+            return self._publish(self.snapshot.files or files, views)
+
+    def query(self, options):
+        """
+        Статистика файлов логов для параметров options.
+
+        Ответ собирается из сводок вида options: файлы, которые диапазон дат
+        покрывает целиком или не задевает, и диапазоны, границы которых
+        кратны ширине корзин, не читаются. Остальные файлы, которые диапазон
+        задевает частично, разбираются заново до прочитанного в снимке смещения.
+
+        Args:
+            options (AnalysisOptions): Параметры фильтрации и подсчёта.
+
+        Returns:
+            tuple[LogStatistics, list[str]]: Общая статистика и список файлов,
+            в которых нашлись подходящие записи.
+        """
+        view = view_options(options)
+        self._last_used[view] = self.clock()
+        snapshot = self.snapshot
+        if view not in snapshot.views:
+            snapshot = self.add_view(view)
+        states = snapshot.views[view]
+
+        bucketed = replace(options, bucket_seconds=view.bucket_seconds, engine="row")
+        stats = bucketed.statistics()
+        processed_files = []
+        for path in snapshot.files:
+            state = states.get(path)
+            if state is None:
+                continue
+            selected = state.summary.select(bucketed)
+            if selected is None:
+                if detect_compression(path) is not None:
+                    selected = analyze_source(path, bucketed)
+                else:
+                    selected = analyze_source(path, bucketed, 0, state.end)
+            file_stats, has_valid_logs = selected
+            stats.merge(file_stats)
+            if has_valid_logs:
+                processed_files.append(path)
+        if options.bucket_seconds is None:
+            # Корзины вида нужны только для выбора диапазона дат
+            stats = stats.totals()
+        return stats, processed_files
+
+    def status(self):
+        """Сведения о последнем снимке для проверки работы сервера."""
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version,
+            "updated": snapshot.updated
+            and datetime.fromtimestamp(snapshot.updated, timezone.utc).isoformat(),
+            "files": list(snapshot.files),
+            "views": len(snapshot.views),
+        }
+
+    def watch(self, interval, stop):
+        """
+        Обновляет снимок каждые interval секунд, пока не установлено
+        событие stop.
+        """
+        while not stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Поток обновления не завершается: сервер отвечает из последнего
+                # снимка и пробует обновить его снова через interval секунд
+                print(f"Error refreshing snapshot: {e}", flush=True)
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов к серверу.
+
+    GET /report принимает те же параметры, что и командная строка, без
+    ведущих "--": например, /report?from=2015-05-17&filter=status!=2*&format=json.
+    Флаги задаются без значения (filter-any), повторяемые параметры
+    повторяются. GET /status возвращает сведения о снимке в JSON.
+    """
+
+    server_version = "log-analyzer"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/status":
+            self.send_body(
+                "application/json", json.dumps(self.server.log_server.status())
+            )
+        elif url.path == "/report":
+            self.send_report(url.query)
+        else:
+            self.send_error(404)
+
+    def send_report(self, query):
+        argv = [
+            f"--{name}={value}" if value else f"--{name}"
+            for name, value in parse_qsl(query, keep_blank_values=True)
+        ]
+        try:
+            args = self.server.parse_query(argv)
+        except ValueError as e:
+            self.send_error(400, explain=str(e))
+            return
+
+        try:
+            stats, files = self.server.log_server.query(args.options)
+        except ValueError as e:
+            self.send_error(400, explain=str(e))
+            return
+        summary = ReportSummary(
+            stats,
+            files,
+            args.from_date,
+            args.to_date,
+            args.percentiles,
+            args.timeseries,
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[args.format])
+        self.end_headers()
+        out = io.TextIOWrapper(self.wfile, encoding="utf-8")
+        write_report(summary, args.format, out)
+        out.flush()
+        out.detach()
+
+    def send_body(self, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # У клиентов Unix-сокета нет адреса
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class UnixReportServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def remove_stale_socket(path):
+    """
+    Удаляет Unix-сокет, оставшийся от прошлого запуска.
+
+    Raises:
+        OSError: Если по пути лежит не сокет или сокет ещё принимает
+            подключения (сервер уже запущен).
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket", path)
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+    raise OSError(errno.EADDRINUSE, "Address already in use", path)
+
+
+def make_server(
+    log_server, parse_query, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None
+):
+    """
+    HTTP-сервер запросов к log_server на адресе host:port или Unix-сокете.
+
+    Args:
+        log_server (LogServer): Статистика, из которой отвечают на запросы.
+        parse_query (Callable): Разбор параметров запроса в виде списка
+            аргументов командной строки; возвращает пространство имён
+            с атрибутом options (AnalysisOptions) и параметрами отчёта,
+            а при ошибке выбрасывает ValueError.
+        host (str): Адрес для подключения по TCP.
+        port (int): Порт; 0 — выбрать свободный.
+        socket_path (str, optional): Путь к Unix-сокету вместо TCP; оставшийся
+            от прошлого запуска сокет удаляется, см. remove_stale_socket.
+
+    Returns:
+        socketserver.BaseServer: Сервер, ещё не обрабатывающий запросы.
+
+    Raises:
+        OSError: Если адрес занят или по пути socket_path лежит не сокет.
+    """
+    if socket_path is not None:
+        remove_stale_socket(socket_path)
+        server = UnixReportServer(socket_path, ReportHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ReportHandler)
+    server.log_server = log_server
+    server.parse_query = parse_query
+    return server
+
+
+def serve(log_server, server, interval=REFRESH_INTERVAL):
+    """
+    Обрабатывает запросы, пока процесс не прервут, и обновляет снимок
+    в отдельном потоке.
+
+    Args:
+        log_server (LogServer): Статистика сервера.
+        server (socketserver.BaseServer): Сервер, см. make_server.
+        interval (float): Период обновления снимка в секундах.
+    """
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=log_server.watch, args=(interval, stop), daemon=True
+    )
+    watcher.start()
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        if isinstance(server, UnixReportServer):
+            os.remove(server.server_address)
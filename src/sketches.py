@@ -0,0 +1,558 @@
+import base64
+import heapq
+import itertools
+import math
+import re
+from collections import Counter
+from hashlib import blake2b
+from operator import itemgetter
+
+# Относительная погрешность квантилей LogHistogram по умолчанию
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Максимальное количество корзин LogHistogram по умолчанию. При точности 1%
+# столько корзин покрывают значения от 1 байта до ~10^17 байт, поэтому на
+# практике склейка корзин не происходит и погрешность остаётся гарантированной.
+DEFAULT_MAX_BUCKETS = 2048
+
+# Точность HyperLogLog по умолчанию: 2^12 регистров по байту (4 КиБ),
+# стандартная погрешность оценки 1.04 / sqrt(2^12) ~ 1.6%
+DEFAULT_HLL_PRECISION = 12
+
+# Допустимая точность HyperLogLog
+MIN_HLL_PRECISION = 4
+MAX_HLL_PRECISION = 16
+
+# Кэш хэшей значений для HyperLogLog. Повторяющиеся значения (ресурсы,
+# user-agent) хэшируются один раз; кэш очищается при переполнении.
+_hash_cache = {}
+MAX_HASH_CACHE_SIZE = 1 << 14
+
+
+def quantile_rank(count, q):
+    """
+    Номер элемента отсортированной выборки, который считается q-квантилем.
+
+    Совпадает с исходным определением 95-го процентиля: sorted[int(n * q) - 1],
+    где индекс -1 означает последний элемент.
+
+    Args:
+        count (int): Размер выборки.
+        q (float): Уровень квантиля от 0 до 1.
+
+    Returns:
+        int: Индекс элемента от 0 до count - 1.
+    """
+    rank = int(count * q) - 1
+    return rank if rank >= 0 else count - 1
+
+
+def _walk_quantiles(levels, count, items):
+    """
+    Квантили распределения, заданного парами «значение — количество»
+    по возрастанию значений.
+
+    Returns:
+        list[float]: Значения квантилей в порядке levels, см. quantile_rank.
+    """
+    levels = list(levels)
+    if not count:
+        return [0] * len(levels)
+    ranks = sorted((quantile_rank(count, q), i) for i, q in enumerate(levels))
+    results = [0] * len(levels)
+    position = seen = 0
+    value = 0
+    for value, value_count in items:
+        seen += value_count
+        while position < len(ranks) and seen > ranks[position][0]:
+            results[ranks[position][1]] = value
+            position += 1
+        if position == len(ranks):
+            return results
+    for _, i in ranks[position:]:
+        results[i] = value
+    return results
+
+
+class ExactQuantiles:
+    """
+    Точное распределение значений для вычисления квантилей.
+
+    Хранит количество повторений каждого значения, поэтому память растёт
+    с числом различных значений, а не с числом записей.
+
+    Attributes:
+        values (Counter): Счётчик значений.
+        count (int): Количество добавленных значений.
+    """
+
+    kind = "exact"
+
+    def __init__(self):
+        self.values = Counter()
+        self.count = 0
+
+    def add(self, value, count=1):
+        self.values[value] += count
+        self.count += count
+
+    def merge(self, other):
+        if not isinstance(other, ExactQuantiles):
+            raise ValueError("Cannot merge exact quantiles with an approximate sketch")
+        self.values.update(other.values)
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """
+        Вычисляет q-квантиль значений.
+
+        Args:
+            q (float): Уровень квантиля от 0 до 1.
+
+        Returns:
+            float: Значение квантиля, или 0, если значений нет.
+        """
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, levels):
+        """
+        Вычисляет несколько квантилей за один проход по отсортированным
+        значениям.
+
+        Args:
+            levels (Iterable[float]): Уровни квантилей от 0 до 1.
+
+        Returns:
+            list[float]: Значения квантилей в порядке levels; нули, если
+            значений нет.
+        """
+        return _walk_quantiles(
+            levels,
+            self.count,
+            ((value, self.values[value]) for value in sorted(self.values)),
+        )
+
+    def to_dict(self):
+        return {"kind": self.kind, "values": sorted(self.values.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        for value, count in data["values"]:
+            sketch.add(value, count)
+        return sketch
+
+
+class LogHistogram:
+    """
+    Гистограмма с логарифмическими корзинами для приближённых квантилей.
+
+    Значение v > 0 попадает в корзину с номером ceil(log(v) / log(gamma)),
+    где gamma = (1 + alpha) / (1 - alpha), а оценкой корзины служит
+    2 * gamma^i / (gamma + 1). Любой квантиль, вычисленный по гистограмме,
+    отличается от точного значения элемента с тем же рангом не более чем на
+    alpha относительно этого значения. Гистограммы с одинаковой точностью
+    объединяются сложением счётчиков корзин без потери точности.
+
+    Память ограничена max_buckets корзинами. Если корзин становится больше,
+    младшие корзины склеиваются, и гарантия точности перестаёт действовать
+    только для самых маленьких значений.
+
+    Attributes:
+        relative_accuracy (float): Относительная погрешность alpha.
+        max_buckets (int): Максимальное количество корзин.
+        buckets (dict[int, int]): Количество значений в каждой корзине.
+        zero_count (int): Количество нулевых значений.
+        count (int): Количество добавленных значений.
+    """
+
+    kind = "log_histogram"
+
+    def __init__(
+        self,
+        relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+        max_buckets=DEFAULT_MAX_BUCKETS,
+    ):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def key(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def estimate(self, key):
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        self.count += count
+        if value <= 0:
+            self.zero_count += count
+            return
+        key = self.key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        # Склеиваем самые младшие корзины, пока их число не уложится в лимит
+        keys = sorted(self.buckets)
+        excess = keys[: len(keys) - self.max_buckets + 1]
+        collapsed = sum(self.buckets.pop(key) for key in excess)
+        self.buckets[excess[-1]] = collapsed
+
+    def merge(self, other):
+        if (
+            not isinstance(other, LogHistogram)
+            or other.relative_accuracy != self.relative_accuracy
+        ):
+            raise ValueError("Cannot merge histograms with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def quantile(self, q):
+        """
+        Вычисляет приближённый q-квантиль значений.
+
+        Args:
+            q (float): Уровень квантиля от 0 до 1.
+
+        Returns:
+            float: Оценка квантиля, или 0, если значений нет.
+        """
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, levels):
+        """
+        Вычисляет несколько приближённых квантилей за один проход по корзинам.
+
+        Args:
+            levels (Iterable[float]): Уровни квантилей от 0 до 1.
+
+        Returns:
+            list[float]: Оценки квантилей в порядке levels; нули, если
+            значений нет.
+        """
+        estimate = self.estimate
+        return _walk_quantiles(
+            levels,
+            self.count,
+            itertools.chain(
+                ((0, self.zero_count),),
+                ((estimate(key), self.buckets[key]) for key in sorted(self.buckets)),
+            ),
+        )
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "buckets": sorted(self.buckets.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.zero_count = data["zero_count"]
+        sketch.buckets = dict(data["buckets"])
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class SpaceSaving(dict):
+    """
+    Приближённые частоты ключей с ограниченной памятью (алгоритм Space-Saving).
+
+    Хранится не больше capacity ключей. Новый ключ при заполненной сводке
+    вытесняет ключ с наименьшим счётчиком m и получает его счётчик m плюс
+    своё количество, а m запоминается как погрешность нового ключа. Поэтому
+    счётчик каждого ключа не меньше точного и превышает его не больше чем на
+    погрешность ключа, а любой ключ с точной частотой больше наименьшего
+    счётчика (не больше N / capacity для N добавлений) есть в сводке. Пока
+    различных ключей не больше capacity, счётчики точные.
+
+    Как и Counter, это словарь «ключ — счётчик» с порядком первого появления
+    ключей: x[key] += count добавляет количество с вытеснением, а update
+    объединяет сводки, например частичные результаты процессов.
+
+    Attributes:
+        capacity (int): Максимальное количество ключей.
+        errors (dict): Погрешность счётчиков ключей, попавших в сводку
+            вытеснением; у остальных ключей погрешность 0.
+    """
+
+    kind = "space_saving"
+
+    def __init__(self, capacity):
+        super().__init__()
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.errors = {}
+        # Куча (счётчик, ключ) с одной записью на ключ. Запись может отставать
+        # от счётчика ключа и обновляется, только когда оказывается наверху.
+        self._heap = []
+
+    def __missing__(self, key):
+        return 0
+
+    def __setitem__(self, key, value, _set=dict.__setitem__):
+        if key in self:
+            _set(self, key, value)
+            return
+        heap = self._heap
+        if len(heap) < self.capacity:
+            _set(self, key, value)
+            heapq.heappush(heap, (value, key))
+            return
+        # Наверху кучи ключ с наименьшим счётчиком, если его запись не отстала
+        while True:
+            minimum, victim = heap[0]
+            current = self[victim]
+            if current == minimum:
+                break
+            heapq.heapreplace(heap, (current, victim))
+        heapq.heapreplace(heap, (minimum + value, key))
+        del self[victim]
+        errors = self.errors
+        errors.pop(victim, None)
+        _set(self, key, minimum + value)
+        errors[key] = minimum
+
+    def __reduce__(self):
+        return SpaceSaving.from_dict, (self.to_dict(),)
+
+    def min_count(self):
+        """
+        Наименьший счётчик заполненной сводки: граница точной частоты ключей,
+        которых в сводке нет, или 0, пока сводка не заполнена.
+        """
+        return min(self.values()) if len(self) >= self.capacity else 0
+
+    def error(self, key):
+        """Насколько счётчик ключа может превышать его точную частоту."""
+        return self.errors.get(key, 0)
+
+    def most_common(self, n=None):
+        """
+        Ключи с наибольшими счётчиками, как Counter.most_common.
+
+        Returns:
+            list[tuple]: Пары (ключ, счётчик) по убыванию счётчика; ключи
+            с равными счётчиками идут в порядке первого появления.
+        """
+        if n is None:
+            return sorted(self.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.items(), key=itemgetter(1))
+
+    def update(self, other):
+        """
+        Объединяет сводку с другой сводкой SpaceSaving.
+
+        Счётчик ключа складывается из счётчиков обеих сводок; если в
+        заполненной сводке ключа нет, вместо его счётчика берётся наименьший
+        счётчик этой сводки, и он же добавляется к погрешности. Из объединения
+        остаются capacity ключей с наибольшими счётчиками, поэтому границы
+        погрешности сохраняются. Пока ключей не больше capacity, результат
+        совпадает с Counter.update, включая порядок ключей.
+
+        Raises:
+            ValueError: Если other не SpaceSaving.
+        """
+        if not isinstance(other, SpaceSaving):
+            raise ValueError("Cannot merge a top-K summary with exact counts")
+        own_min, other_min = self.min_count(), other.min_count()
+        merged = {}
+        errors = {}
+        for key, count in self.items():
+            other_count = other.get(key)
+            if other_count is None:
+                merged[key] = count + other_min
+                error = self.error(key) + other_min
+            else:
+                merged[key] = count + other_count
+                error = self.error(key) + other.error(key)
+            if error:
+                errors[key] = error
+        for key, count in other.items():
+            if key not in merged:
+                merged[key] = count + own_min
+                error = other.error(key) + own_min
+                if error:
+                    errors[key] = error
+        if len(merged) > self.capacity:
+            top = heapq.nlargest(self.capacity, merged.items(), key=itemgetter(1))
+            kept = {key for key, _ in top}
+            merged = {key: count for key, count in merged.items() if key in kept}
+            errors = {key: error for key, error in errors.items() if key in kept}
+        self._replace(merged, errors)
+        return self
+
+    def _replace(self, counts, errors):
+        self.clear()
+        dict.update(self, counts)
+        self.errors = errors
+        self._heap = [(count, key) for key, count in counts.items()]
+        heapq.heapify(self._heap)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "capacity": self.capacity,
+            "items": [[key, count, self.error(key)] for key, count in self.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        counts = {key: count for key, count, _ in data["items"]}
+        errors = {key: error for key, _, error in data["items"] if error}
+        sketch._replace(counts, errors)
+        return sketch
+
+
+def stable_hash(value):
+    """
+    64-битный хэш строки, одинаковый во всех процессах и запусках.
+
+    Встроенный hash для строк зависит от PYTHONHASHSEED, поэтому не годится
+    для сводок, которые объединяются между процессами и хранятся в кэше.
+    """
+    hashed = _hash_cache.get(value)
+    if hashed is None:
+        hashed = int.from_bytes(
+            blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        if len(_hash_cache) >= MAX_HASH_CACHE_SIZE:
+            _hash_cache.clear()
+        _hash_cache[value] = hashed
+    return hashed
+
+
+# Ненулевые регистры HyperLogLog
+_NONZERO_REGISTER = re.compile(rb"[^\x00]")
+
+
+class HyperLogLog:
+    """
+    Приближённое количество различных значений (алгоритм HyperLogLog).
+
+    Старшие precision бит 64-битного хэша значения выбирают регистр, а в
+    регистре хранится наибольший номер первой единицы в остальных битах.
+    Память постоянна — 2^precision байт — при любом количестве значений,
+    стандартная погрешность оценки 1.04 / sqrt(2^precision). Для малых
+    количеств используется линейный подсчёт по пустым регистрам. Сводки
+    с одинаковой точностью объединяются поэлементным максимумом регистров
+    без потери точности, поэтому результат не зависит от разбиения данных
+    между файлами и процессами.
+
+    Attributes:
+        precision (int): Количество бит хэша, выбирающих регистр.
+        registers (bytearray): Регистры.
+    """
+
+    kind = "hyperloglog"
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        if not MIN_HLL_PRECISION <= precision <= MAX_HLL_PRECISION:
+            raise ValueError(
+                f"precision must be between {MIN_HLL_PRECISION} "
+                f"and {MAX_HLL_PRECISION}"
+            )
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._shift = 64 - precision
+        self._mask = (1 << self._shift) - 1
+
+    def add(self, value):
+        """Учитывает строковое значение."""
+        hashed = _hash_cache.get(value)
+        if hashed is None:
+            hashed = stable_hash(value)
+        index = hashed >> self._shift
+        rank = self._shift - (hashed & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_hash(self, hashed):
+        """Учитывает значение по его хэшу stable_hash."""
+        index = hashed >> self._shift
+        rank = self._shift - (hashed & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if not isinstance(other, HyperLogLog) or other.precision != self.precision:
+            raise ValueError(
+                "Cannot merge HyperLogLog sketches with different precision"
+            )
+        registers, other_registers = self.registers, other.registers
+        size = len(registers)
+        if registers.count(0) == size:
+            self.registers = bytearray(other_registers)
+        elif size - other_registers.count(0) < size // 8:
+            # В сводке небольшого количества значений (например, корзины
+            # времени) почти все регистры пустые: обходим только ненулевые
+            for match in _NONZERO_REGISTER.finditer(other_registers):
+                index = match.start()
+                if other_registers[index] > registers[index]:
+                    registers[index] = other_registers[index]
+        else:
+            self.registers = bytearray(map(max, registers, other_registers))
+        return self
+
+    def count(self):
+        """
+        Оценка количества различных значений.
+
+        Returns:
+            int: Округлённая оценка.
+        """
+        size = len(self.registers)
+        if size >= 128:
+            alpha = 0.7213 / (1 + 1.079 / size)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[size]
+        estimate = alpha * size * size / math.fsum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "precision": self.precision,
+            "registers": base64.b64encode(self.registers).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        registers = base64.b64decode(data["registers"])
+        if len(registers) != len(sketch.registers):
+            raise ValueError("Inconsistent HyperLogLog registers")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+def quantiles_from_dict(data):
+    """Восстанавливает распределение значений из снимка по его типу."""
+    if data["kind"] == ExactQuantiles.kind:
+        return ExactQuantiles.from_dict(data)
+    if data["kind"] == LogHistogram.kind:
+        return LogHistogram.from_dict(data)
+    raise ValueError(f"Unknown quantile sketch kind: {data['kind']}")
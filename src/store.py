@@ -0,0 +1,413 @@
+import json
+import os
+import shutil
+from datetime import timedelta
+
+from src.cache import file_identity
+from src.columnar import aggregate_columns, np, require_numpy
+from src.file_handler import load_logs_from_file, load_logs_from_url
+from src.log_parser import TIMESTAMP_FIELD, parse_log_line
+from src.pipeline import EPOCH
+from src.sketches import stable_hash
+
+# Версия формата хранилища; хранилище другой версии нужно собрать заново
+STORE_VERSION = 1
+
+DEFAULT_STORE_DIR = os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"),
+    "log-analyzer",
+    "store",
+)
+
+MANIFEST_FILE = "manifest.json"
+
+DAY_SECONDS = 86400
+
+# Сколько записей одного дня копится перед записью отрезка на диск
+SEGMENT_ROWS = 1 << 20
+
+# Строковые поля хранятся номерами в словаре значений отрезка,
+# числовые — столбцами целых чисел
+STRING_FIELDS = ("ip", "method", "resource", "agent")
+NUMERIC_FIELDS = {TIMESTAMP_FIELD: "int64", "status": "int32", "size": "int64"}
+
+# Поля записи, которые сохраняются в хранилище
+STORED_FIELDS = frozenset(STRING_FIELDS) | frozenset(NUMERIC_FIELDS)
+
+# Поля, хэши значений которых нужны для количества различных значений
+HASHED_FIELDS = ("ip", "agent")
+
+
+def _fits(value, dtype):
+    return 0 <= value <= np.iinfo(dtype).max
+
+
+class SegmentWriter:
+    """
+    Столбцы записей одного дня до записи отрезка на диск.
+
+    Строковые поля кодируются номерами в порядке первого появления значения,
+    поэтому порядок ресурсов при подсчёте совпадает с порядком строк.
+
+    Attributes:
+        values (dict[str, dict[str, int]]): Номера значений строковых полей.
+        columns (dict[str, list[int]]): Столбцы номеров и числовых полей.
+    """
+
+    def __init__(self):
+        self.values = {field: {} for field in STRING_FIELDS}
+        self.columns = {field: [] for field in (*STRING_FIELDS, *NUMERIC_FIELDS)}
+
+    def __len__(self):
+        return len(self.columns[TIMESTAMP_FIELD])
+
+    def add(self, log_record):
+        for field in STRING_FIELDS:
+            ids = self.values[field]
+            value = log_record[field]
+            code = ids.get(value)
+            if code is None:
+                code = ids[value] = len(ids)
+            self.columns[field].append(code)
+        for field in NUMERIC_FIELDS:
+            self.columns[field].append(log_record[field])
+
+    def write(self, path):
+        """
+        Записывает отрезок в каталог path.
+
+        Каждый столбец хранится в своём файле .npy, словарь значений каждого
+        строкового поля — в своём файле JSON, поэтому запрос читает только
+        нужные поля.
+
+        Returns:
+            dict: Описание отрезка для манифеста: количество записей и границы
+            их времени.
+        """
+        os.makedirs(path)
+        for field in STRING_FIELDS:
+            np.save(
+                os.path.join(path, f"{field}.npy"),
+                np.array(self.columns[field], dtype=np.int32),
+            )
+            with open(os.path.join(path, f"{field}.json"), "w", encoding="utf-8") as f:
+                json.dump(list(self.values[field]), f, ensure_ascii=False)
+        for field, dtype in NUMERIC_FIELDS.items():
+            np.save(
+                os.path.join(path, f"{field}.npy"),
+                np.array(self.columns[field], dtype=dtype),
+            )
+        timestamps = self.columns[TIMESTAMP_FIELD]
+        return {"rows": len(self), "min_ts": min(timestamps), "max_ts": max(timestamps)}
+
+
+class Segment:
+    """
+    Отрезок хранилища, прочитанный с диска: записи одного дня одного
+    источника.
+
+    Столбцы и словари значений читаются при первом обращении и только те,
+    которые нужны запросу.
+
+    Attributes:
+        path (str): Каталог отрезка.
+        rows (int): Количество записей.
+    """
+
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows
+        self._columns = {}
+        self._values = {}
+
+    def column(self, field):
+        """Столбец числового поля или номеров значений строкового поля."""
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = np.load(
+                os.path.join(self.path, f"{field}.npy")
+            )
+        return column
+
+    def values(self, field):
+        """Значения строкового поля по номерам."""
+        values = self._values.get(field)
+        if values is None:
+            with open(os.path.join(self.path, f"{field}.json"), encoding="utf-8") as f:
+                values = self._values[field] = json.load(f)
+        return values
+
+    def hashes(self, field):
+        """Столбец хэшей stable_hash значений строкового поля."""
+        table = np.fromiter(
+            (stable_hash(value) for value in self.values(field)),
+            dtype=np.uint64,
+            count=len(self.values(field)),
+        )
+        return table[self.column(field)]
+
+    def field_mask(self, field_filter):
+        """
+        Маска записей, прошедших условие на поле.
+
+        Условие проверяется один раз для каждого различного значения поля,
+        а не для каждой записи. Поля, которых нет в хранилище, считаются
+        отсутствующими, как у записей, которые возвращает parse_log_line.
+        """
+        field = field_filter.field
+        predicate = field_filter.compile()
+        if field in STRING_FIELDS:
+            values = self.values(field)
+            codes = self.column(field)
+        elif field in NUMERIC_FIELDS:
+            unique, codes = np.unique(self.column(field), return_inverse=True)
+            values = unique.tolist()
+        else:
+            return np.full(self.rows, predicate({}), dtype=bool)
+        table = np.fromiter(
+            (predicate({field: value}) for value in values),
+            dtype=bool,
+            count=len(values),
+        )
+        return table[codes]
+
+
+class ColumnStore:
+    """
+    Локальное колоночное хранилище разобранных записей логов для повторных
+    запросов без разбора строк.
+
+    Записи каждого источника делятся по дням (по полю "ts") на отрезки
+    в каталогах <день>/<номер>, манифест хранит источники в порядке
+    загрузки с признаками их файлов и отрезками. Запрос пропускает дни
+    и отрезки вне диапазона дат, читает только нужные столбцы и проверяет
+    условия фильтров по словарям значений.
+
+    Attributes:
+        directory (str): Каталог хранилища.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        require_numpy()
+        self.directory = directory
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def load_manifest(self):
+        """
+        Манифест хранилища; пустой, если хранилище ещё не создано.
+
+        Raises:
+            ValueError: Если версия хранилища не поддерживается.
+        """
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"version": STORE_VERSION, "next_segment": 0, "sources": []}
+        if manifest.get("version") != STORE_VERSION:
+            raise ValueError(
+                f"Unsupported store version {manifest.get('version')} "
+                f"in {self.directory}, ingest the logs into a new store"
+            )
+        return manifest
+
+    def _save_manifest(self, manifest):
+        # Манифест заменяется атомарно: запрос видит либо старые отрезки
+        # источника, либо новые
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._manifest_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def ingest(self, source):
+        """
+        Загружает записи источника в хранилище.
+
+        Если источник уже загружен и его файл не изменился, он не читается.
+        Изменившийся файл загружается заново на прежнее место в порядке
+        источников. URL загружаются при каждом вызове.
+
+        Args:
+            source (str): Путь к файлу или URL.
+
+        Returns:
+            tuple[int, int] | None: Количество загруженных записей
+            и нераспознанных строк или None, если источник не изменился.
+        """
+        manifest = self.load_manifest()
+        identity = file_identity(source) if os.path.isfile(source) else None
+        key = identity["path"] if identity else source
+        position = next(
+            (i for i, entry in enumerate(manifest["sources"]) if entry["key"] == key),
+            None,
+        )
+        if position is not None and identity is not None:
+            if manifest["sources"][position]["identity"] == identity:
+                return None
+
+        lines = (
+            load_logs_from_url(source)
+            if source.startswith("http")
+            else load_logs_from_file(source)
+        )
+        writers = {}
+        segments = []
+        records = skipped = 0
+        try:
+            for line in lines:
+                try:
+                    log_record = parse_log_line(line, STORED_FIELDS)
+                except ValueError:
+                    log_record = None
+                if (
+                    log_record is None
+                    or not _fits(log_record["status"], np.int32)
+                    or not _fits(log_record["size"], np.int64)
+                ):
+                    skipped += 1
+                    continue
+                day = log_record[TIMESTAMP_FIELD] // DAY_SECONDS
+                writer = writers.get(day)
+                if writer is None:
+                    writer = writers[day] = SegmentWriter()
+                writer.add(log_record)
+                records += 1
+                if len(writer) >= SEGMENT_ROWS:
+                    segments.append(self._write_segment(manifest, day, writer))
+                    writers[day] = SegmentWriter()
+            for day in sorted(writers):
+                if len(writers[day]):
+                    segments.append(self._write_segment(manifest, day, writers[day]))
+        except BaseException:
+            self._remove_segments(segments)
+            raise
+
+        entry = {
+            "key": key,
+            "source": source,
+            "identity": identity,
+            "segments": sorted(segments, key=lambda segment: segment["day"]),
+        }
+        if position is None:
+            manifest["sources"].append(entry)
+            replaced = []
+        else:
+            replaced = manifest["sources"][position]["segments"]
+            manifest["sources"][position] = entry
+        self._save_manifest(manifest)
+        self._remove_segments(replaced)
+        return records, skipped
+
+    def _write_segment(self, manifest, day, writer):
+        day_label = (EPOCH + timedelta(days=day)).date().isoformat()
+        name = f"{day_label}/{manifest['next_segment']:06d}"
+        manifest["next_segment"] += 1
+        segment = writer.write(os.path.join(self.directory, name))
+        segment.update(path=name, day=day_label)
+        return segment
+
+    def _remove_segments(self, segments):
+        for segment in segments:
+            path = os.path.join(self.directory, segment["path"])
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+    def query(self, options):
+        """
+        Статистика записей хранилища, прошедших фильтры options.
+
+        Отрезки обрабатываются по дням, а в пределах дня — в порядке
+        загрузки источников, и их статистика объединяется в этом порядке.
+        Если источники загружены в порядке файлов, а строки в файлах идут
+        по времени, отчёт совпадает с разбором файлов.
+
+        Args:
+            options (AnalysisOptions): Параметры фильтрации и подсчёта.
+
+        Returns:
+            tuple[LogStatistics, list[str]]: Статистика и источники
+            в порядке загрузки, в которых нашлись подходящие записи.
+
+        Raises:
+            ValueError: Если фильтр проверяет поле "time", которое хранится
+                только в виде "ts".
+        """
+        record_filter = options.record_filter()
+        if any(f.field == "time" for f in record_filter.field_filters):
+            raise ValueError(
+                'Filters on "time" are not supported by the store, use --from/--to'
+            )
+        start, end = record_filter.start, record_filter.end
+        sources = self.load_manifest()["sources"]
+        segments = [
+            (segment, position)
+            for position, entry in enumerate(sources)
+            for segment in entry["segments"]
+            if (start is None or segment["max_ts"] >= start)
+            and (end is None or segment["min_ts"] < end)
+        ]
+        segments.sort(key=lambda item: item[0]["day"])
+
+        stats = options.statistics()
+        matched = set()
+        for description, position in segments:
+            segment = Segment(
+                os.path.join(self.directory, description["path"]),
+                description["rows"],
+            )
+            mask = self._mask(segment, description, record_filter)
+            if mask is not None and not mask.any():
+                continue
+            if mask is None:
+                mask = np.ones(segment.rows, dtype=bool)
+
+            columns = {
+                field: segment.column(field) for field in ("resource", "status", "size")
+            }
+            part = options.statistics()
+            if part.buckets is not None:
+                columns[TIMESTAMP_FIELD] = segment.column(TIMESTAMP_FIELD)
+            for field in HASHED_FIELDS:
+                if field in part.distinct:
+                    columns[field] = segment.hashes(field)
+            stats.merge(
+                aggregate_columns(columns, mask, part, segment.values("resource"))
+            )
+            matched.add(position)
+        return stats, [
+            entry["source"]
+            for position, entry in enumerate(sources)
+            if position in matched
+        ]
+
+    @staticmethod
+    def _mask(segment, description, record_filter):
+        # Маска записей отрезка, прошедших фильтры; None — прошли все
+        checks = [
+            segment.field_mask(field_filter)
+            for field_filter in record_filter.field_filters
+        ]
+        mask = None
+        if checks:
+            combine = np.logical_or if record_filter.match_any else np.logical_and
+            mask = combine.reduce(checks)
+        start, end = record_filter.start, record_filter.end
+        # Время проверяется, только если диапазон пересекает отрезок частично
+        if (start is not None and description["min_ts"] < start) or (
+            end is not None and description["max_ts"] >= end
+        ):
+            timestamps = segment.column(TIMESTAMP_FIELD)
+            dates = np.ones(segment.rows, dtype=bool)
+            if start is not None:
+                dates &= timestamps >= start
+            if end is not None:
+                dates &= timestamps < end
+            mask = dates if mask is None else mask & dates
+        return mask
@@ -0,0 +1,244 @@
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from src.compressed import detect_compression
+from src.file_handler import iter_lines, read_chunks
+from src.log_parser import TIMESTAMP_FIELD, parse_log_line
+
+# Версия формата индекса; при её изменении старые индексы не используются
+INDEX_VERSION = 1
+
+# Ширина корзины времени: строки одной минуты попадают в один отрезок индекса
+BUCKET_SECONDS = 60
+
+# Поля, которые нужны для построения индекса
+INDEX_FIELDS = frozenset((TIMESTAMP_FIELD,))
+
+
+@dataclass(frozen=True)
+class IndexParameters:
+    """
+    Параметры, от которых зависит индекс времени; входят в ключ кэша.
+
+    Attributes:
+        kind (str): Вид записи кэша, отличает индекс от сводок файлов.
+        version (int): Версия формата индекса.
+        bucket_seconds (int): Ширина корзины времени в секундах.
+    """
+
+    kind: str = "time-index"
+    version: int = INDEX_VERSION
+    bucket_seconds: int = BUCKET_SECONDS
+
+
+class TimeIndex:
+    """
+    Индекс времени файла логов: отрезки строк с границами байт и времени.
+
+    Новый отрезок начинается со строки, время которой попадает в другую
+    корзину, чем время первой строки текущего отрезка. Для каждого отрезка
+    хранятся наименьшее и наибольшее время его записей, поэтому индекс верен
+    и для файлов, строки которых идут не строго по времени. Строки без
+    времени относятся к отрезку, в котором находятся.
+
+    Отрезки, которые могут пересекаться с диапазоном дат, находятся двоичным
+    поиском по наибольшему времени среди отрезков от начала файла
+    и наименьшему — до конца файла.
+
+    Attributes:
+        starts (list[int]): Смещения начала отрезков.
+        min_times (list[int]): Наименьшее время записей отрезков, см. поле "ts".
+        max_times (list[int]): Наибольшее время записей отрезков.
+        size (int): Размер проиндексированной части файла.
+    """
+
+    def __init__(self, starts, min_times, max_times, size):
+        self.starts = starts
+        self.min_times = min_times
+        self.max_times = max_times
+        self.size = size
+        self._prefix_max = []
+        for max_time in max_times:
+            previous = self._prefix_max[-1] if self._prefix_max else max_time
+            self._prefix_max.append(max(previous, max_time))
+        self._suffix_min = []
+        for min_time in reversed(min_times):
+            previous = self._suffix_min[-1] if self._suffix_min else min_time
+            self._suffix_min.append(min(previous, min_time))
+        self._suffix_min.reverse()
+
+    def ranges(self, start=None, end=None):
+        """
+        Диапазоны байт, в которых могут быть записи из интервала [start, end).
+
+        Args:
+            start (int, optional): Начало интервала в секундах, см. поле "ts".
+            end (int, optional): Конец интервала.
+
+        Returns:
+            list[tuple[int, int]]: Диапазоны байт по возрастанию; соседние
+            отрезки объединены.
+        """
+        first = 0 if start is None else bisect_left(self._prefix_max, start)
+        last = len(self.starts) if end is None else bisect_left(self._suffix_min, end)
+        ranges = []
+        for i in range(first, last):
+            if (start is not None and self.max_times[i] < start) or (
+                end is not None and self.min_times[i] >= end
+            ):
+                continue
+            range_start = self.starts[i]
+            range_end = self.starts[i + 1] if i + 1 < len(self.starts) else self.size
+            if ranges and ranges[-1][1] == range_start:
+                ranges[-1] = (ranges[-1][0], range_end)
+            else:
+                ranges.append((range_start, range_end))
+        return ranges
+
+    def to_dict(self):
+        return {
+            "starts": self.starts,
+            "min_times": self.min_times,
+            "max_times": self.max_times,
+            "size": self.size,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        starts, min_times, max_times = (
+            data["starts"],
+            data["min_times"],
+            data["max_times"],
+        )
+        if not len(starts) == len(min_times) == len(max_times):
+            raise ValueError("Inconsistent time index")
+        return cls(starts, min_times, max_times, data["size"])
+
+
+class TimeIndexBuilder:
+    """
+    Построение индекса времени по строкам файла в порядке следования.
+
+    Смещения строк вычисляются по их длине, поэтому строки должны идти подряд
+    с начала файла и без перевода строки, как их возвращает iter_lines.
+
+    Attributes:
+        bucket_seconds (int): Ширина корзины времени в секундах.
+        offset (int): Смещение следующей строки.
+    """
+
+    def __init__(self, bucket_seconds=BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.offset = 0
+        self.starts = []
+        self.min_times = []
+        self.max_times = []
+        self._bucket = None
+
+    def add(self, line, log_time=None):
+        """
+        Учитывает очередную строку файла.
+
+        Args:
+            line (str): Строка без перевода строки.
+            log_time (int, optional): Время записи (поле "ts") или None,
+                если строка не разобрана.
+        """
+        line_start = self.offset
+        self.offset += (len(line) if line.isascii() else len(line.encode())) + 1
+        if log_time is None:
+            return
+        bucket = log_time // self.bucket_seconds
+        if bucket != self._bucket:
+            self._bucket = bucket
+            # Строки без времени в начале файла относятся к первому отрезку
+            self.starts.append(line_start if self.starts else 0)
+            self.min_times.append(log_time)
+            self.max_times.append(log_time)
+        elif log_time < self.min_times[-1]:
+            self.min_times[-1] = log_time
+        elif log_time > self.max_times[-1]:
+            self.max_times[-1] = log_time
+
+    def finish(self, size):
+        """
+        Индекс файла размером size байт.
+
+        Returns:
+            TimeIndex | None: Индекс или None, если строки покрыли не весь
+            файл (чтение прервалось или файл изменился).
+        """
+        # У последней строки файла может не быть перевода строки
+        if self.offset not in (size, size + 1):
+            return None
+        return TimeIndex(self.starts, self.min_times, self.max_times, size)
+
+
+def build_time_index(file_name, bucket_seconds=BUCKET_SECONDS):
+    """
+    Построение индекса времени отдельным проходом по файлу.
+
+    Из строк извлекается только время, поэтому проход дешевле полного разбора.
+
+    Returns:
+        TimeIndex | None: Индекс или None, если файл изменился во время чтения.
+    """
+    size = os.path.getsize(file_name)
+    builder = TimeIndexBuilder(bucket_seconds)
+    for line in iter_lines(read_chunks(file_name, 0, size)):
+        try:
+            log_record = parse_log_line(line, INDEX_FIELDS)
+        except ValueError:
+            log_record = None
+        builder.add(line, log_record[TIMESTAMP_FIELD] if log_record else None)
+    return builder.finish(size)
+
+
+def can_index(source):
+    """Можно ли читать источник по диапазонам байт индекса."""
+    return os.path.isfile(source) and detect_compression(source) is None
+
+
+def index_key(source, cache):
+    """Ключ индекса времени файла в кэше AggregateCache."""
+    return cache.key(source, IndexParameters())
+
+
+def load_time_index(source, cache, key=None):
+    """
+    Индекс времени файла из кэша; если его нет, он строится и сохраняется.
+
+    Args:
+        source (str): Путь к несжатому локальному файлу.
+        cache (AggregateCache): Кэш, в котором хранятся индексы.
+        key (str, optional): Ключ индекса, если он уже вычислен.
+
+    Returns:
+        TimeIndex | None: Индекс или None, если его не удалось построить.
+    """
+    key = key or index_key(source, cache)
+    entry = cache.get(key)
+    if entry is not None:
+        try:
+            return TimeIndex.from_dict(entry)
+        except (KeyError, TypeError, ValueError):
+            pass
+    index = build_time_index(source)
+    if index is not None:
+        cache.put(key, index.to_dict())
+    return index
+
+
+def save_time_index(source, cache, builder):
+    """
+    Сохраняет в кэш индекс, построенный при полном проходе по файлу.
+
+    Индекс не сохраняется, если построителя нет или строки покрыли не весь
+    файл.
+    """
+    if builder is None:
+        return
+    index = builder.finish(os.path.getsize(source))
+    if index is not None:
+        cache.put(index_key(source, cache), index.to_dict())
@@ -0,0 +1,62 @@
+import unittest
+
+from benchmarks.generate import generate_lines, parse_statuses
+from benchmarks.suite import compare
+from src.log_parser import parse_log_line
+from src.log_stats import LogStatistics
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_generated_lines(self):
+        """
+        Тестирует генератор синтетических логов.
+
+        Входные данные:
+        - 5000 строк с 10 ресурсами, сильным перекосом и двумя кодами ответа.
+
+        Ожидаемый результат:
+        - Все строки разбираются, используются только заданные коды ответа,
+          самый частый ресурс — первый, при том же seed строки совпадают.
+        """
+        params = {"resources": 10, "skew": 2, "statuses": parse_statuses("200:9,404:1")}
+        lines = list(generate_lines(5000, **params))
+        stats = LogStatistics()
+        for line in lines:
+            stats.update(parse_log_line(line))
+        self.assertEqual(stats.total_requests, 5000)
+        self.assertEqual(set(stats.status_codes), {200, 404})
+        self.assertEqual(len(stats.resources), 10)
+        self.assertEqual(stats.resources.most_common(1)[0][0], "/downloads/product_1")
+        self.assertEqual(list(generate_lines(5000, **params)), lines)
+        self.assertNotEqual(list(generate_lines(5000, seed=1, **params)), lines)
+
+    def test_compare(self):
+        """
+        Тестирует поиск падений скорости относительно сохранённых результатов.
+
+        Ожидаемый результат:
+        - Отмечается только этап, скорость которого упала больше порога;
+          этапы без сохранённых результатов пропускаются.
+        """
+        baseline = {
+            "logs.txt": {
+                "parse": {"items_per_second": 1000},
+                "update": {"items_per_second": 1000},
+            }
+        }
+        results = {
+            "logs.txt": {
+                "parse": {"items_per_second": 850},
+                "update": {"items_per_second": 950},
+                "main": {"items_per_second": 10},
+            }
+        }
+        regressions = compare(results, baseline, threshold=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("logs.txt/parse:"))
+        self.assertEqual(compare(results, baseline, threshold=0.2), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from dataclasses import replace
+from io import StringIO
+from unittest.mock import patch
+
+from src.cache import AggregateCache, file_identity
+from src.parallel import analyze_parallel
+from src.pipeline import (
+    AnalysisOptions,
+    FileSummary,
+    analyze_file,
+    analyze_files,
+    analyze_source,
+    cache_options,
+)
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class TestAggregateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = AggregateCache(os.path.join(self.tmp_dir, "cache"))
+        self.log_file = os.path.join(self.tmp_dir, "access.log")
+        shutil.copy(LOG_FILE, self.log_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key_changes_with_file(self):
+        """
+        Тестирует зависимость ключа от содержимого файла и параметров.
+
+        Ожидаемый результат:
+        - Ключ не меняется для того же файла и меняется после дописывания
+          строки или при других параметрах фильтрации.
+        """
+        options = AnalysisOptions()
+        key = self.cache.key(self.log_file, options)
+        self.assertEqual(self.cache.key(self.log_file, options), key)
+        self.assertNotEqual(
+            self.cache.key(self.log_file, AnalysisOptions(filter_field="agent")), key
+        )
+
+        with open(self.log_file, "a") as f:
+            f.write("\n")
+        self.assertNotEqual(self.cache.key(self.log_file, options), key)
+
+    def test_file_identity_hash(self):
+        """
+        Тестирует добавление хэша содержимого в признаки файла.
+
+        Ожидаемый результат:
+        - Хэш есть только при use_hash=True.
+        """
+        self.assertNotIn("sha256", file_identity(self.log_file))
+        self.assertEqual(len(file_identity(self.log_file, use_hash=True)["sha256"]), 64)
+
+    def test_lru_eviction(self):
+        """
+        Тестирует вытеснение давно неиспользуемых записей.
+
+        Ожидаемый результат:
+        - При превышении лимита удаляется запись, которую дольше всего не читали.
+        """
+        cache = AggregateCache(self.cache.directory, max_entries=2)
+        cache.put("first", {"value": 1})
+        cache.put("second", {"value": 2})
+        os.utime(cache._entry_path("first"), ns=(1, 1))
+        os.utime(cache._entry_path("second"), ns=(2, 2))
+        self.assertEqual(cache.get("first"), {"value": 1})
+
+        cache.put("third", {"value": 3})
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(cache.get("first"), {"value": 1})
+        self.assertEqual(cache.get("third"), {"value": 3})
+
+    def test_corrupted_entry(self):
+        """
+        Тестирует чтение повреждённой записи.
+
+        Ожидаемый результат:
+        - Запись считается отсутствующей и удаляется.
+        """
+        os.makedirs(self.cache.directory)
+        with open(self.cache._entry_path("broken"), "w") as f:
+            f.write("{")
+        self.assertIsNone(self.cache.get("broken"))
+        self.assertFalse(os.path.exists(self.cache._entry_path("broken")))
+
+    def test_analyze_file_reuses_summary(self):
+        """
+        Тестирует повторное использование сводки файла для разных диапазонов дат.
+
+        Ожидаемый результат:
+        - Первый запуск разбирает файл, следующие запуски с диапазонами дат,
+          покрывающими файл или не пересекающимися с ним, файл не читают,
+          а результаты совпадают с обработкой без кэша.
+        """
+        options = AnalysisOptions(from_date="2015-05-17")
+        expected = analyze_source(self.log_file, options)
+        stats, has_valid_logs = analyze_file(self.log_file, options, self.cache)
+        self.assertEqual(stats.total_requests, expected[0].total_requests)
+        self.assertTrue(has_valid_logs)
+
+        with patch("src.pipeline.load_logs") as load_logs:
+            stats, has_valid_logs = analyze_file(self.log_file, options, self.cache)
+            self.assertEqual(
+                list(stats.resources.items()), list(expected[0].resources.items())
+            )
+            self.assertEqual(stats.percentile_95(), expected[0].percentile_95())
+
+            stats, has_valid_logs = analyze_file(
+                self.log_file, AnalysisOptions(to_date="2015-05-16"), self.cache
+            )
+            self.assertEqual(stats.total_requests, 0)
+            self.assertFalse(has_valid_logs)
+            load_logs.assert_not_called()
+
+    def test_analyze_file_partial_overlap(self):
+        """
+        Тестирует диапазон дат, частично пересекающий файл.
+
+        Ожидаемый результат:
+        - Файл разбирается заново, результат совпадает с обработкой без кэша.
+        """
+        options = AnalysisOptions(from_date="2015-05-17T12:00:00")
+        analyze_file(self.log_file, AnalysisOptions(), self.cache)
+        stats, _ = analyze_file(self.log_file, options, self.cache)
+        self.assertEqual(
+            stats.total_requests,
+            analyze_source(self.log_file, options)[0].total_requests,
+        )
+
+    def test_summary_without_time(self):
+        """
+        Тестирует сводку запуска без диапазона дат и корзин времени.
+
+        Ожидаемый результат:
+        - Время записей не разбирается, сводка без границ времени отвечает
+          на запуски без диапазона дат без чтения файла.
+        - Первый запуск с диапазоном дат разбирает файл заново и заменяет
+          сводку сводкой с границами времени; результаты совпадают
+          с обработкой без кэша.
+        """
+        options = AnalysisOptions()
+        key = self.cache.key(self.log_file, cache_options(options))
+        with patch("src.log_parser.parse_log_timestamp") as parse_log_timestamp:
+            analyze_file(self.log_file, options, self.cache)
+            parse_log_timestamp.assert_not_called()
+        self.assertFalse(FileSummary.from_dict(self.cache.get(key)).timed)
+
+        with patch("src.pipeline.load_logs") as load_logs:
+            stats, has_valid_logs = analyze_file(self.log_file, options, self.cache)
+            load_logs.assert_not_called()
+        self.assertEqual(
+            stats.to_dict(), analyze_source(self.log_file, options)[0].to_dict()
+        )
+        self.assertTrue(has_valid_logs)
+
+        dated = AnalysisOptions(to_date="2015-05-17")
+        stats, _ = analyze_file(self.log_file, dated, self.cache)
+        self.assertEqual(
+            stats.to_dict(), analyze_source(self.log_file, dated)[0].to_dict()
+        )
+        self.assertTrue(FileSummary.from_dict(self.cache.get(key)).timed)
+        with patch("src.pipeline.load_logs") as load_logs:
+            analyze_file(self.log_file, dated, self.cache)
+            load_logs.assert_not_called()
+
+    def test_read_error_not_cached(self):
+        """
+        Тестирует файл, который не удалось прочитать целиком.
+
+        Входные данные:
+        - Файл с байтом не в UTF-8 в середине, обработанный дважды
+          с кэшем функциями analyze_file, analyze_files и analyze_parallel.
+
+        Ожидаемый результат:
+        - Оба запуска сообщают об ошибке (в процессах пула — в их stdout)
+          и дают одну и ту же статистику
+          прочитанной части; ни сводка, ни индекс времени в кэш не попадают.
+        """
+        with open(LOG_FILE, "rb") as f:
+            data = f.read()
+        middle = data.index(b"\n", len(data) // 2) + 1
+        with open(self.log_file, "wb") as f:
+            f.write(data[:middle] + b"\xff\n" + data[middle:])
+
+        options = AnalysisOptions(from_date="2015-05-17")
+        runs = {
+            "analyze_file": lambda: analyze_file(self.log_file, options, self.cache),
+            "analyze_files": lambda: analyze_files(
+                [self.log_file], options, self.cache
+            ),
+            "analyze_parallel": lambda: analyze_parallel(
+                [self.log_file], options, workers=2, cache=self.cache
+            ),
+        }
+        for name, run in runs.items():
+            with self.subTest(name=name):
+                totals = []
+                for _ in range(2):
+                    with redirect_stdout(StringIO()) as out:
+                        totals.append(run()[0].total_requests)
+                    if name != "analyze_parallel":
+                        # Процессы пула выводят сообщение в свой stdout
+                        self.assertIn("Error processing file", out.getvalue())
+                self.assertEqual(totals[0], totals[1])
+                self.assertFalse(os.path.exists(self.cache.directory))
+
+    def test_bucketed_summary_answers_partial_overlap(self):
+        """
+        Тестирует диапазон дат, частично пересекающий файл, при сводке
+        с часовыми корзинами времени.
+
+        Ожидаемый результат:
+        - Для диапазона по границам часов файл не читается, статистика
+          собирается из корзин и совпадает с обработкой без кэша.
+        """
+        options = AnalysisOptions(from_date="2015-05-17T12:00:00", bucket_seconds=3600)
+        analyze_file(self.log_file, replace(options, from_date=None), self.cache)
+        expected, expected_valid = analyze_source(self.log_file, options)
+
+        with patch("src.pipeline.load_logs") as load_logs, patch(
+            "src.pipeline.load_logs_from_ranges"
+        ) as load_logs_from_ranges:
+            stats, has_valid_logs = analyze_file(self.log_file, options, self.cache)
+            load_logs.assert_not_called()
+            load_logs_from_ranges.assert_not_called()
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+        self.assertEqual(has_valid_logs, expected_valid)
+
+
+if __name__ == "__main__":
+    unittest.main()
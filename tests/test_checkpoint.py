@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.checkpoint import CheckpointStore
+from src.pipeline import AnalysisOptions
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = CheckpointStore(os.path.join(self.tmp_dir, "state"))
+        self.log_file = os.path.join(self.tmp_dir, "access.log")
+        with open(LOG_FILE) as f:
+            self.lines = [line.rstrip("\n") + "\n" for line in f][:30]
+        self.options = AnalysisOptions()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, path, lines, mode="a"):
+        with open(path, mode) as f:
+            f.write("".join(lines))
+
+    def test_reads_only_appended_lines(self):
+        """
+        Тестирует инкрементальное чтение растущего файла.
+
+        Ожидаемый результат:
+        - Каждый запуск добавляет к статистике только новые строки,
+          недописанная строка учитывается, когда её допишут до конца.
+        """
+        self.write(self.log_file, self.lines[:10])
+        stats, has_valid_logs = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 10)
+        self.assertTrue(has_valid_logs)
+
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 10)
+
+        partial = self.lines[10]
+        self.write(self.log_file, [partial[:20]])
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 10)
+
+        self.write(self.log_file, [partial[20:]] + self.lines[11:15])
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 15)
+
+    def test_invalid_utf8_line(self):
+        """
+        Тестирует строку с байтами не в UTF-8.
+
+        Входные данные:
+        - Между законченными строками дописана строка с байтом 0xff,
+          затем дописаны ещё строки.
+
+        Ожидаемый результат:
+        - Строка не учитывается, а контрольная точка сдвигается за неё:
+          следующий запуск добавляет только новые строки.
+        """
+        self.write(self.log_file, self.lines[:5])
+        with open(self.log_file, "ab") as f:
+            f.write(self.lines[5].encode("utf-8").replace(b"GET", b"G\xffT"))
+        self.write(self.log_file, self.lines[6:10])
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 9)
+
+        self.write(self.log_file, self.lines[10:12])
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 11)
+
+    def test_checkpoint_files(self):
+        """
+        Тестирует хранение контрольных точек.
+
+        Входные данные:
+        - Контрольные точки нескольких файлов, одна из которых повреждена.
+
+        Ожидаемый результат:
+        - Для каждого файла хранится своя точка, временных файлов не остаётся.
+        - Повреждённая точка считается отсутствующей: файл читается с начала,
+          а точка записывается заново.
+        """
+        log_files = [os.path.join(self.tmp_dir, f"access{i}.log") for i in range(3)]
+        for log_file in log_files:
+            self.write(log_file, self.lines[:5])
+            self.store.analyze(log_file, self.options)
+        names = os.listdir(self.store.directory)
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(name.endswith(".json") for name in names))
+
+        self.write(os.path.join(self.store.directory, names[0]), ["{"], mode="w")
+        for log_file in log_files:
+            self.write(log_file, self.lines[5:10])
+            stats, _ = self.store.analyze(log_file, self.options)
+            self.assertEqual(stats.total_requests, 10)
+        self.assertEqual(sorted(os.listdir(self.store.directory)), sorted(names))
+
+    def test_logrotate_rename(self):
+        """
+        Тестирует ротацию с переименованием файла.
+
+        Ожидаемый результат:
+        - Хвост переименованного файла дочитывается, новый файл читается
+          с начала, ни одна строка не теряется и не учитывается дважды.
+        """
+        self.write(self.log_file, self.lines[:10])
+        self.store.analyze(self.log_file, self.options)
+
+        self.write(self.log_file, self.lines[10:12])
+        os.rename(self.log_file, self.log_file + ".1")
+        self.write(self.log_file, self.lines[12:20], mode="w")
+
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 20)
+
+    def test_copytruncate(self):
+        """
+        Тестирует усечение файла на месте (copytruncate).
+
+        Ожидаемый результат:
+        - Файл читается с начала, накопленная статистика сохраняется,
+          в том числе если файл успел вырасти больше прежнего смещения.
+        """
+        self.write(self.log_file, self.lines[:5])
+        self.store.analyze(self.log_file, self.options)
+
+        self.write(self.log_file, self.lines[5:7], mode="w")
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 7)
+
+        self.write(self.log_file, self.lines[20:30], mode="w")
+        stats, _ = self.store.analyze(self.log_file, self.options)
+        self.assertEqual(stats.total_requests, 17)
+
+
+if __name__ == "__main__":
+    unittest.main()
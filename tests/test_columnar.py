@@ -0,0 +1,107 @@
+import os
+import unittest
+
+from src.columnar import (
+    analyze_lines_columnar,
+    is_available,
+    summarize_lines_columnar,
+)
+from src.filters import FieldFilter
+from src.follow import RollingStatistics
+from src.pipeline import AnalysisOptions, analyze_lines, summarize_lines
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs.txt")
+
+
+@unittest.skipUnless(is_available(), "numpy is not installed")
+class TestColumnarEngine(unittest.TestCase):
+
+    def setUp(self):
+        with open(LOG_FILE) as f:
+            self.lines = f.readlines()
+        # Строки, которые не разбираются и которые разбираются только
+        # регулярным выражением
+        self.lines.insert(3, "garbage\n")
+        self.lines.insert(
+            7,
+            '1.2.3.4 - - [17/may/2015:08:05:32 +0000] "GET /new HTTP/1.1" 200 - "-" "x"',
+        )
+
+    def test_same_statistics_as_row_engine(self):
+        """
+        Тестирует совпадение статистики колоночного и построчного движков.
+
+        Входные данные:
+        - Строки logs.txt, разные фильтры и размеры пакетов, подсчёт
+          различных значений, корзины времени.
+
+        Ожидаемый результат:
+        - Снимки статистики и порядок ресурсов совпадают.
+        """
+        cases = [
+            AnalysisOptions(),
+            AnalysisOptions(exact_quantiles=True),
+            AnalysisOptions(from_date="2015-05-18", to_date="2015-05-19"),
+            AnalysisOptions(filter_field="agent", filter_value="Debian*"),
+            AnalysisOptions(
+                filters=(FieldFilter("status", "404"), FieldFilter("method", "HEAD")),
+                match_any=True,
+                from_date="2015-05-20",
+            ),
+            AnalysisOptions(from_date="2015-05-18", distinct_precision=10),
+            AnalysisOptions(
+                filter_field="method", filter_value="GET", bucket_seconds=3600
+            ),
+        ]
+        for options in cases:
+            expected = options.statistics()
+            has_valid_logs = analyze_lines(self.lines, expected, options)
+            for batch_size in (100, 100000):
+                with self.subTest(options=options, batch_size=batch_size):
+                    stats = options.statistics()
+                    self.assertEqual(
+                        analyze_lines_columnar(self.lines, stats, options, batch_size),
+                        has_valid_logs,
+                    )
+                    self.assertEqual(stats.to_dict(), expected.to_dict())
+                    self.assertEqual(
+                        stats.resources.most_common(10),
+                        expected.resources.most_common(10),
+                    )
+
+    def test_same_summary_as_row_engine(self):
+        """
+        Тестирует совпадение сводки файла колоночного и построчного движков.
+
+        Ожидаемый результат:
+        - Совпадают сводка, статистика с учётом диапазона дат и границы времени.
+        """
+        options = AnalysisOptions(
+            from_date="2015-05-18",
+            filter_field="resource",
+            filter_value="*product_1",
+        )
+        summary, stats, has_valid_logs = summarize_lines(self.lines, options)
+        columnar = summarize_lines_columnar(self.lines, options, batch_size=500)
+        self.assertEqual(columnar[0].to_dict(), summary.to_dict())
+        self.assertEqual(columnar[1].to_dict(), stats.to_dict())
+        self.assertEqual(columnar[2], has_valid_logs)
+
+    def test_engine_option(self):
+        """
+        Тестирует выбор движка через AnalysisOptions и пакетное пополнение
+        скользящей статистики.
+
+        Ожидаемый результат:
+        - analyze_lines с engine="columnar" дополняет RollingStatistics
+          пакетами и считает все записи.
+        """
+        rolling = RollingStatistics()
+        rolling.advance(100)
+        options = AnalysisOptions(engine="columnar")
+        self.assertTrue(analyze_lines(self.lines, rolling, options))
+        self.assertEqual(rolling.window(60).total_requests, len(self.lines) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
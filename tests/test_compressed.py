@@ -0,0 +1,171 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest.mock import patch
+
+from src import compressed
+from src.compressed import (
+    decompressed_blocks,
+    detect_compression,
+    independent_frames,
+    prefetch,
+)
+from src.file_handler import (
+    AppendedLinesReader,
+    load_logs_from_file,
+    read_chunks,
+    split_file,
+)
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+def bgzf_compress(data, block_size):
+    """Сжатие в формат BGZF: члены gzip с размером блока в заголовке."""
+    blocks = []
+    for start in range(0, len(data), block_size):
+        chunk = data[start : start + block_size]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        body = compressor.compress(chunk) + compressor.flush()
+        blocks.append(
+            b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+            + struct.pack("<H", 18 + len(body) + 8 - 1)
+            + body
+            + struct.pack("<II", zlib.crc32(chunk), len(chunk))
+        )
+    return b"".join(blocks)
+
+
+class TestCompressedLogs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(LOG_FILE, "rb") as f:
+            self.data = f.read()
+        self.lines = list(load_logs_from_file(LOG_FILE))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_formats(self):
+        """
+        Тестирует чтение файлов gzip, bz2 и xz.
+
+        Входные данные:
+        - Файл логов, сжатый каждым форматом, и gzip из двух членов.
+
+        Ожидаемый результат:
+        - Формат определяется по сигнатуре, строки совпадают с несжатым файлом,
+          сжатый файл не делится на диапазоны.
+        """
+        middle = len(self.data) // 2
+        cases = [
+            ("gzip", gzip.compress(self.data)),
+            (
+                "gzip",
+                gzip.compress(self.data[:middle]) + gzip.compress(self.data[middle:]),
+            ),
+            ("bz2", bz2.compress(self.data)),
+            ("xz", lzma.compress(self.data)),
+        ]
+        for compression, data in cases:
+            with self.subTest(compression=compression):
+                path = self.write("access.log.1", data)
+                self.assertEqual(detect_compression(path), compression)
+                self.assertEqual(list(load_logs_from_file(path)), self.lines)
+                self.assertEqual(split_file(path, 100), [(0, len(data))])
+                with self.assertRaises(ValueError):
+                    list(read_chunks(path, 10, len(data)))
+        self.assertIsNone(detect_compression(LOG_FILE))
+
+    def test_bgzf_frames(self):
+        """
+        Тестирует параллельную распаковку блоков BGZF.
+
+        Ожидаемый результат:
+        - Блоки находятся без распаковки и группируются, а строки совпадают
+          с несжатым файлом.
+        """
+        path = self.write("access.log.gz", bgzf_compress(self.data, 4096))
+        with patch.object(compressed, "FRAME_GROUP_SIZE", 8192):
+            frames = independent_frames(path, "gzip")
+            self.assertGreater(len(frames), 2)
+            self.assertEqual(
+                b"".join(decompressed_blocks(path, "gzip", workers=3)), self.data
+            )
+        self.assertIsNone(
+            independent_frames(self.write("plain.gz", gzip.compress(self.data)), "gzip")
+        )
+
+    @unittest.skipIf(compressed.zstandard is None, "zstandard is not installed")
+    def test_zstd_frames(self):
+        """
+        Тестирует чтение файла zstd из нескольких кадров.
+
+        Входные данные:
+        - Кадры по 10000 байт исходных данных и пропускаемый кадр в конце,
+          как у таблицы поиска seekable zstd.
+
+        Ожидаемый результат:
+        - Кадры находятся по заголовкам, строки совпадают с несжатым файлом.
+        """
+        compressor = compressed.zstandard.ZstdCompressor(write_checksum=True)
+        data = b"".join(
+            compressor.compress(self.data[start : start + 10000])
+            for start in range(0, len(self.data), 10000)
+        )
+        data += struct.pack("<II", 0x184D2A5E, 4) + b"seek"
+        path = self.write("access.log.zst", data)
+
+        self.assertEqual(detect_compression(path), "zstd")
+        with patch.object(compressed, "FRAME_GROUP_SIZE", 4096):
+            self.assertGreater(len(independent_frames(path, "zstd")), 2)
+            self.assertEqual(list(load_logs_from_file(path)), self.lines)
+
+    def test_appended_lines_reader(self):
+        """
+        Тестирует инкрементальное чтение сжатого файла.
+
+        Ожидаемый результат:
+        - Файл читается целиком один раз, смещение становится равным его размеру.
+        """
+        data = gzip.compress(self.data)
+        path = self.write("access.log.2.gz", data)
+        reader = AppendedLinesReader(path)
+        self.assertEqual(list(reader), self.lines)
+        self.assertEqual(reader.offset, len(data))
+        self.assertEqual(list(AppendedLinesReader(path, reader.offset)), [])
+
+    def test_prefetch(self):
+        """
+        Тестирует получение элементов в фоновом потоке.
+
+        Ожидаемый результат:
+        - Порядок элементов сохраняется, исключение передаётся потребителю.
+        """
+        self.assertEqual(list(prefetch(iter(range(100)), depth=2)), list(range(100)))
+
+        def failing():
+            yield 1
+            raise OSError("broken")
+
+        items = prefetch(failing())
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(OSError):
+            next(items)
+
+
+if __name__ == "__main__":
+    unittest.main()
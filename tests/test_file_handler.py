@@ -1,10 +1,21 @@
+import io
 import os
+import shutil
+import tempfile
+import time
 import unittest
+from contextlib import redirect_stdout
+
 from src.file_handler import (
+    PrefetchingLoader,
+    iter_lines,
+    read_chunks,
     load_logs,
     load_logs_from_url,
     load_logs_from_file,
     load_logs_from_files,
+    load_logs_from_range,
+    split_file,
 )
 
 
@@ -61,6 +72,66 @@ class TestFileHandlerWithRealData(unittest.TestCase):
             logs,
         )
 
+    def test_load_logs_from_range(self):
+        """
+        Тестирование функций split_file и load_logs_from_range.
+
+        Проверяет, что строки, прочитанные по диапазонам байт, в сумме
+        совпадают со строками всего файла без потерь и повторов.
+
+        Входные данные:
+            - Имя файла: "../logs/2015-05-17.txt"
+            - Размер диапазона: 1000 байт
+
+        Ожидаемый результат:
+            - Объединение строк всех диапазонов совпадает со строками файла.
+        """
+        file_name = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+        logs = list(load_logs_from_file(file_name))
+        ranges = split_file(file_name, 1000)
+        self.assertTrue(len(ranges) > 1)
+
+        logs_from_ranges = [
+            line
+            for start, end in ranges
+            for line in load_logs_from_range(file_name, start, end)
+        ]
+        self.assertEqual(logs_from_ranges, logs)
+
+    def test_read_chunks(self):
+        """
+        Тестирование функций read_chunks и iter_lines.
+
+        Проверяет, что блоки выровнены по границам строк при любом размере
+        буфера, в том числе меньшем длины строки, и для файла без перевода
+        строки в конце.
+
+        Входные данные:
+            - Файл из строк разной длины, включая пустую.
+            - Размеры буфера: 1, 5 и 1024 байта.
+
+        Ожидаемый результат:
+            - Все блоки, кроме последнего, заканчиваются переводом строки.
+            - Блоки в сумме дают файл, а строки совпадают со строками файла.
+        """
+        data = b"first line\n\nthird\nlast without newline"
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+
+        for chunk_size in (1, 5, 1024):
+            chunks = list(read_chunks(f.name, chunk_size=chunk_size))
+            self.assertEqual(b"".join(chunks), data)
+            self.assertTrue(all(chunk.endswith(b"\n") for chunk in chunks[:-1]))
+            self.assertEqual(
+                list(iter_lines(chunks)),
+                ["first line", "", "third", "last without newline"],
+            )
+            self.assertEqual(
+                list(iter_lines(read_chunks(f.name, 3, 13, chunk_size))),
+                ["", "third"],
+            )
+
     def test_load_logs(self):
         """
         Тестирование функции load_logs.
@@ -115,5 +186,79 @@ class TestFileHandlerWithRealData(unittest.TestCase):
         )
 
 
+class TestPrefetchingLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.files = []
+        self.lines = []
+        for index in range(4):
+            lines = [f"file {index} line {number}" for number in range(100000)]
+            path = os.path.join(self.tmp_dir, f"access.log.{index}")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            self.files.append(path)
+            self.lines.append(lines)
+
+    def test_order_and_errors(self):
+        """
+        Тестирование порядка строк и ошибок чтения PrefetchingLoader.
+
+        Входные данные:
+            - Четыре файла по 100000 строк и каталог вместо файла между ними.
+
+        Ожидаемый результат:
+            - Файлы и их строки выдаются в исходном порядке.
+            - Ошибка чтения каталога передаётся при обходе его строк,
+              остальные файлы читаются полностью.
+            - load_logs_from_files сообщает об ошибке и продолжает чтение.
+        """
+        files = self.files[:2] + [self.tmp_dir] + self.files[2:]
+        loader = PrefetchingLoader(files, readers=3, depth=2)
+        result = []
+        for file_name, lines in loader:
+            if file_name == self.tmp_dir:
+                with self.assertRaises(OSError):
+                    list(lines)
+            else:
+                result.append(list(lines))
+        self.assertEqual(result, self.lines)
+
+        directory = os.path.join(self.tmp_dir, "access.log.1d")
+        os.mkdir(directory)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            lines = list(load_logs_from_files(os.path.join(self.tmp_dir, "access.*")))
+        self.assertEqual(lines, [line for file in self.lines for line in file])
+        self.assertIn(f"Error processing file {directory}", output.getvalue())
+
+    def test_bounded_queues(self):
+        """
+        Тестирование ограничения очередей PrefetchingLoader и остановки чтения.
+
+        Входные данные:
+            - Глубина очереди 2 пакета и ограничение памяти в 1 байт.
+
+        Ожидаемый результат:
+            - Пока потребитель стоит, в очереди разбираемого файла не больше
+              двух пакетов, а остальные файлы не читаются вперёд.
+            - После прекращения обхода потоки чтения завершаются.
+        """
+        loader = PrefetchingLoader(self.files, readers=2, depth=2, max_bytes=1)
+        files = iter(loader)
+        file_name, lines = next(files)
+        self.assertEqual(next(lines), self.lines[0][0])
+        time.sleep(0.2)
+        self.assertEqual(file_name, self.files[0])
+        self.assertEqual(len(loader._batches[0]), 2)
+        self.assertFalse(any(loader._batches[1:]))
+
+        files.close()
+        for thread in loader.threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+
 if __name__ == "__main__":
     unittest.main()
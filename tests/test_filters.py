@@ -0,0 +1,165 @@
+import unittest
+
+from src.filters import FieldFilter, RecordFilter, date_bounds
+from src.log_parser import ALL_FIELDS, TIMESTAMP_FIELD, parse_log_line
+from src.log_stats import LogStatistics
+from src.pipeline import AnalysisOptions, analyze_lines
+
+LINES = [
+    '93.180.71.3 - - [17/May/2015:08:05:32 +0000] "GET /downloads/product_1 HTTP/1.1" 304 0 "-" "Debian APT-HTTP/1.3 (0.8.16~exp12ubuntu10.21)"',
+    '80.91.33.133 - - [18/May/2015:23:59:59 +0000] "GET /downloads/product_2 HTTP/1.1" 404 337 "-" "Wget/1.13.4 (linux-gnu)"',
+    '217.168.17.5 - - [19/May/2015:00:00:00 +0200] "HEAD /downloads/product_2 HTTP/1.1" 200 490 "-" "Mozilla/5.0"',
+]
+
+
+class TestFilters(unittest.TestCase):
+
+    def records(self, record_filter):
+        fields = ALL_FIELDS | record_filter.fields
+        return [
+            parse_log_line(line, fields)["ip"]
+            for line in LINES
+            if record_filter(parse_log_line(line, fields))
+        ]
+
+    def test_parse_expression(self):
+        """
+        Тестирует разбор выражений --filter.
+
+        Ожидаемый результат:
+        - Операторы =, !=, ~ и !~ дают условия нужного вида.
+        - Выражение без оператора или с некорректным регулярным выражением
+          вызывает ValueError.
+        """
+        self.assertEqual(FieldFilter.parse("agent=Moz*"), FieldFilter("agent", "Moz*"))
+        self.assertEqual(
+            FieldFilter.parse("status!=2*"), FieldFilter("status", "2*", negate=True)
+        )
+        self.assertEqual(
+            FieldFilter.parse("resource~a=b"), FieldFilter("resource", "a=b", "regex")
+        )
+        self.assertEqual(
+            FieldFilter.parse("agent!~^Wget"),
+            FieldFilter("agent", "^Wget", "regex", True),
+        )
+        for expression in ("status", "=404", "agent~("):
+            with self.assertRaises(ValueError):
+                FieldFilter.parse(expression)
+
+    def test_glob_and_regex(self):
+        """
+        Тестирует шаблоны glob и регулярные выражения.
+
+        Ожидаемый результат:
+        - Шаблон glob соответствует значению поля целиком, регулярное
+          выражение ищется в любом месте значения, числа сравниваются
+          в строковом виде.
+        """
+        cases = [
+            (FieldFilter("agent", "Wget*"), ["80.91.33.133"]),
+            (FieldFilter("agent", "Mozilla"), []),
+            (FieldFilter("resource", "*product_[12]"), [r.split()[0] for r in LINES]),
+            (FieldFilter("status", "[34]0?"), ["93.180.71.3", "80.91.33.133"]),
+            (FieldFilter("agent", r"\(linux", "regex"), ["80.91.33.133"]),
+            (FieldFilter("method", "GET", negate=True), ["217.168.17.5"]),
+            (FieldFilter("referrer", "*"), []),
+            (FieldFilter("referrer", "*", negate=True), [r.split()[0] for r in LINES]),
+        ]
+        for field_filter, expected in cases:
+            with self.subTest(field_filter=field_filter):
+                self.assertEqual(self.records(RecordFilter([field_filter])), expected)
+
+    def test_combine_filters(self):
+        """
+        Тестирует объединение условий через И и ИЛИ вместе с диапазоном дат.
+
+        Ожидаемый результат:
+        - Без match_any нужны все условия, с match_any — хотя бы одно.
+        - Диапазон дат применяется в обоих случаях.
+        """
+        filters = [FieldFilter("status", "404"), FieldFilter("method", "HEAD")]
+        self.assertEqual(self.records(RecordFilter(filters)), [])
+        self.assertEqual(
+            self.records(RecordFilter(filters, match_any=True)),
+            ["80.91.33.133", "217.168.17.5"],
+        )
+        self.assertEqual(
+            self.records(RecordFilter(filters, from_date="2015-05-19", match_any=True)),
+            ["217.168.17.5"],
+        )
+
+    def test_date_bounds(self):
+        """
+        Тестирует границы диапазона дат в секундах.
+
+        Ожидаемый результат:
+        - Результат совпадает с LogStatistics.is_within_date_range, в том числе
+          на границах суток и для записей с ненулевым часовым поясом.
+        """
+        start, end = date_bounds("2015-05-18", "2015-05-18")
+        self.assertEqual(end - start, 86400)
+        self.assertEqual(date_bounds("2015-05-18T00:00:00.5", None)[0], start + 1)
+
+        for from_date, to_date in [
+            ("2015-05-18", "2015-05-18"),
+            ("2015-05-19", None),
+            (None, "2015-05-18"),
+            ("2015-05-18T23:59:59", "2015-05-17"),
+        ]:
+            record_filter = RecordFilter(from_date=from_date, to_date=to_date)
+            for line in LINES:
+                log_record = parse_log_line(line, ALL_FIELDS | {TIMESTAMP_FIELD})
+                self.assertEqual(
+                    record_filter(log_record),
+                    LogStatistics.is_within_date_range(log_record, from_date, to_date),
+                )
+
+    def test_prefilter(self):
+        """
+        Тестирует отбрасывание строк до разбора.
+
+        Ожидаемый результат:
+        - Проверка строится только по обязательным подстрокам шаблонов glob
+          для полей, входящих в строку без изменений.
+        - Для ИЛИ проверка есть, только если подстрока есть у каждого условия.
+        """
+        prefilter = RecordFilter(
+            [FieldFilter("agent", "*Wget/[0-9]*"), FieldFilter("method", "G?T")]
+        ).prefilter
+        self.assertEqual([prefilter(line) for line in LINES], [False, True, False])
+
+        self.assertIsNone(RecordFilter([FieldFilter("status", "404")]).prefilter)
+        self.assertIsNone(RecordFilter([FieldFilter("agent", "W", "regex")]).prefilter)
+        self.assertIsNone(
+            RecordFilter([FieldFilter("agent", "W*", negate=True)]).prefilter
+        )
+        self.assertIsNone(
+            RecordFilter(
+                [FieldFilter("agent", "Wget*"), FieldFilter("status", "404")],
+                match_any=True,
+            ).prefilter
+        )
+
+    def test_analyze_with_options(self):
+        """
+        Тестирует фильтрацию строк через AnalysisOptions.
+
+        Входные данные:
+        - --filter-field/--filter-value вместе с дополнительным условием.
+
+        Ожидаемый результат:
+        - Учитываются записи, удовлетворяющие обоим условиям.
+        """
+        options = AnalysisOptions(
+            filter_field="resource",
+            filter_value="/downloads/*",
+            filters=(FieldFilter("status", "2*", negate=True),),
+        )
+        stats = LogStatistics()
+        self.assertTrue(analyze_lines(LINES, stats, options))
+        self.assertEqual(stats.total_requests, 2)
+        self.assertEqual(stats.status_codes, {304: 1, 404: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
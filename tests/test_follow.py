@@ -0,0 +1,158 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.columnar import is_available
+from src.follow import FileFollower, RollingStatistics, follow
+from src.pipeline import AnalysisOptions, analyze_lines
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class TestRollingStatistics(unittest.TestCase):
+
+    def add(self, rolling, now, resource):
+        rolling.advance(now)
+        rolling.update({"resource": resource, "status": 200, "size": 100})
+
+    def test_windows_and_expiration(self):
+        """
+        Тестирует скользящие окна и удаление устаревших корзин.
+
+        Ожидаемый результат:
+        - Окно учитывает только свежие корзины, корзины старше самого
+          длинного окна удаляются.
+        """
+        rolling = RollingStatistics(windows=(10, 60), bucket_seconds=5)
+        self.add(rolling, 0, "/old")
+        self.add(rolling, 52, "/recent")
+        self.add(rolling, 58, "/recent")
+
+        self.assertEqual(rolling.window(10).resources, {"/recent": 2})
+        self.assertEqual(rolling.window(60).total_requests, 3)
+        self.assertEqual(rolling.rates()[0], (10, 2, 0.2))
+
+        rolling.advance(120)
+        self.assertEqual(list(rolling.buckets), [24])
+        self.assertEqual(rolling.window(60).total_requests, 0)
+
+    def test_buckets_share_strings(self):
+        """
+        Тестирует интернирование ресурсов в корзинах скользящей статистики.
+
+        Входные данные:
+        - Одни и те же строки лога в двух корзинах, построчный и колоночный
+          движки.
+
+        Ожидаемый результат:
+        - Ключи ресурсов обеих корзин являются одними объектами строк.
+        """
+        with open(LOG_FILE) as f:
+            lines = [line.rstrip("\n") for line in f][:50]
+        engines = ["row", "columnar"] if is_available() else ["row"]
+        for engine in engines:
+            with self.subTest(engine=engine):
+                rolling = RollingStatistics(windows=(60,), bucket_seconds=5)
+                options = AnalysisOptions(engine=engine)
+                for now in (0, 10):
+                    rolling.advance(now)
+                    analyze_lines(list(lines), rolling, options, rolling.strings)
+                first, second = (
+                    list(bucket.resources) for bucket in rolling.buckets.values()
+                )
+                self.assertEqual(first, second)
+                for a, b in zip(first, second):
+                    self.assertIs(a, b)
+
+
+class TestFileFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp_dir, "access.log")
+        with open(LOG_FILE) as f:
+            self.lines = [line.rstrip("\n") for line in f][:10]
+        self.write(self.lines[:2], mode="w")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, lines, mode="a"):
+        with open(self.log_file, mode) as f:
+            f.write("".join(line + "\n" for line in lines))
+
+    def test_follows_appended_lines(self):
+        """
+        Тестирует чтение дописываемых строк.
+
+        Ожидаемый результат:
+        - Существующие строки пропускаются, недописанная строка возвращается
+          только после перевода строки.
+        - Строка с байтами не в UTF-8 возвращается пустой, следующие строки
+          читаются как обычно.
+        """
+        follower = FileFollower(self.log_file)
+        self.assertEqual(follower.poll(), [])
+
+        with open(self.log_file, "a") as f:
+            f.write(self.lines[2][:10])
+        self.assertEqual(follower.poll(), [])
+        with open(self.log_file, "a") as f:
+            f.write(self.lines[2][10:] + "\n")
+        self.assertEqual(follower.poll(), [self.lines[2]])
+        with open(self.log_file, "ab") as f:
+            f.write(b"\xff bad\n" + self.lines[3].encode("utf-8") + b"\n")
+        self.assertEqual(follower.poll(), ["", self.lines[3]])
+        follower.close()
+
+    def test_rotation_and_truncation(self):
+        """
+        Тестирует ротацию и усечение отслеживаемого файла.
+
+        Ожидаемый результат:
+        - После переименования старый файл дочитывается, затем читается новый
+          с начала; после усечения чтение продолжается с начала файла.
+        """
+        follower = FileFollower(self.log_file, from_start=True)
+        self.assertEqual(follower.poll(), self.lines[:2])
+
+        self.write(self.lines[2:3])
+        os.rename(self.log_file, self.log_file + ".1")
+        self.write(self.lines[3:5], mode="w")
+        self.assertEqual(follower.poll(), [self.lines[2]])
+        self.assertEqual(follower.poll(), [])
+        self.assertEqual(follower.poll(), self.lines[3:5])
+
+        self.write(self.lines[5:6], mode="w")
+        self.assertEqual(follower.poll(), [self.lines[5]])
+        follower.close()
+
+    def test_follow_report(self):
+        """
+        Тестирует периодический вывод отчёта в режиме --follow.
+
+        Ожидаемый результат:
+        - Отчёт содержит скорость запросов и статистику по прочитанным строкам.
+        """
+        ticks = iter(range(100))
+        out = io.StringIO()
+        follow(
+            self.log_file,
+            AnalysisOptions(),
+            interval=1,
+            from_start=True,
+            out=out,
+            clock=lambda: next(ticks),
+            sleep=lambda seconds: None,
+            refreshes=1,
+        )
+        report = out.getvalue()
+        self.assertIn("#### Скорость запросов", report)
+        self.assertIn("|  1m  |    2  |    0.03", report)
+        self.assertIn("|  Количество запросов  |   2", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import gzip
+import io
+import os
+import socket
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.file_handler import load_logs_from_file, load_logs_from_url
+from src.http_loader import HttpFetcher
+from src.log_stats import LogStatistics
+from src.pipeline import AnalysisOptions, analyze_files, analyze_lines
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class LogHandler(BaseHTTPRequestHandler):
+    """
+    Сервер файлов логов с поддержкой диапазонов байт и сжатия gzip.
+
+    Файл /broken/... обрывает первую передачу тела на середине, файл
+    /plain/... не поддерживает диапазоны и всегда отвечает всем телом.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.sockets.add(self.request)
+
+    def finish(self):
+        super().finish()
+        with self.server.lock:
+            self.server.sockets.discard(self.request)
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.connections.add(self.client_address)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            self.send_body(head)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def send_body(self, head):
+        data = self.server.files.get(self.path.split("/")[-1])
+        if data is None:
+            self.send_error(404)
+            return
+        ranges = not self.path.startswith("/plain/")
+        status = 200
+        range_header = self.headers.get("Range")
+        if ranges and range_header:
+            first, last = range_header.split("=")[1].split("-")
+            end = int(last) + 1 if last else len(data)
+            data = data[int(first) : end]
+            status = 206
+        elif "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            encoding = "gzip"
+        else:
+            encoding = None
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        if ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 200 and encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if head:
+            return
+        if "/broken/" in self.path and not self.server.broken:
+            self.server.broken = True
+            self.wfile.write(data[: len(data) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+
+
+class TestHttpLoader(unittest.TestCase):
+
+    def setUp(self):
+        with open(LOG_FILE, "rb") as f:
+            self.data = f.read()
+        self.lines = list(load_logs_from_file(LOG_FILE))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), LogHandler)
+        self.server.daemon_threads = False
+        self.server.sockets = set()
+        self.server.files = {"access.log": self.data}
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.lock = threading.Lock()
+        self.server.active = self.server.max_active = 0
+        self.server.broken = False
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.stop_server)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop_server(self):
+        # Соединения keep-alive закрываются со стороны сервера, чтобы потоки
+        # обработки запросов завершились
+        self.server.shutdown()
+        with self.server.lock:
+            for connection in self.server.sockets:
+                connection.shutdown(socket.SHUT_RDWR)
+        self.server.server_close()
+
+    def test_gzip_and_keep_alive(self):
+        """
+        Тестирует загрузку нескольких URL через общий пул соединений.
+
+        Входные данные:
+        - Пять загрузок одного файла одним загрузчиком без деления на диапазоны.
+
+        Ожидаемый результат:
+        - Ответы приходят сжатыми gzip, строки совпадают с файлом.
+        - Все запросы идут по одному соединению.
+        """
+        fetcher = HttpFetcher(slice_workers=1)
+        for _ in range(5):
+            lines = list(load_logs_from_url(f"{self.base}/access.log", fetcher))
+            self.assertEqual(lines, self.lines)
+        self.assertTrue(
+            all(
+                "gzip" in headers["Accept-Encoding"]
+                for _, headers in self.server.requests
+            )
+        )
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_resume_interrupted_download(self):
+        """
+        Тестирует продолжение оборванной загрузки.
+
+        Входные данные:
+        - Сервер обрывает первую передачу сжатого тела на середине;
+          сервер с диапазонами и без них.
+
+        Ожидаемый результат:
+        - Загрузка продолжается с места обрыва запросом диапазона, а если
+          сервер диапазоны не поддерживает, полученные байты пропускаются.
+          Строки совпадают с файлом без потерь и повторов.
+        """
+        for prefix in ("broken", "plain/broken"):
+            with self.subTest(prefix=prefix):
+                self.server.broken = False
+                self.server.requests.clear()
+                fetcher = HttpFetcher(slice_workers=1)
+                lines = list(
+                    load_logs_from_url(f"{self.base}/{prefix}/access.log", fetcher)
+                )
+                self.assertEqual(lines, self.lines)
+                self.assertEqual(len(self.server.requests), 2)
+                resumed = self.server.requests[1][1]
+                self.assertRegex(resumed["Range"], r"^bytes=[1-9]\d*-$")
+                self.assertEqual(resumed["Accept-Encoding"], "identity")
+
+    def test_parallel_slices(self):
+        """
+        Тестирует параллельную загрузку большого файла диапазонами.
+
+        Входные данные:
+        - Диапазоны по 16 КиБ, не больше трёх одновременно.
+
+        Ожидаемый результат:
+        - Файл загружается диапазонами, одновременно выполняется не больше
+          трёх запросов, данные совпадают с файлом.
+        """
+        fetcher = HttpFetcher(slice_size=16384, slice_workers=3)
+        data = b"".join(fetcher.blocks(f"{self.base}/access.log"))
+        self.assertEqual(data, self.data)
+        ranges = [headers for _, headers in self.server.requests if "Range" in headers]
+        self.assertEqual(len(ranges), -(-len(self.data) // 16384))
+        self.assertLessEqual(self.server.max_active, 3)
+
+    def test_analyze_urls(self):
+        """
+        Тестирует обработку нескольких URL в analyze_files.
+
+        Входные данные:
+        - Три URL файла и URL несуществующего файла между ними.
+
+        Ожидаемый результат:
+        - Статистика совпадает с обработкой строк файла три раза,
+          об ошибке несуществующего файла выводится сообщение.
+        - Одновременно выполняется не больше concurrency * slice_workers
+          запросов.
+        """
+        url = f"{self.base}/access.log"
+        missing = f"{self.base}/missing.log"
+        options = AnalysisOptions(filter_field="agent", filter_value="Debian*")
+        expected = LogStatistics()
+        for _ in range(3):
+            analyze_lines(self.lines, expected, options)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            stats, processed_files = analyze_files(
+                [url, missing, url, url],
+                options,
+                fetcher=HttpFetcher(concurrency=2, slice_size=65536),
+            )
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+        self.assertEqual(processed_files, [url, url, url])
+        self.assertIn(f"Error processing file {missing}: 404", output.getvalue())
+        self.assertLessEqual(self.server.max_active, 2 * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from src import instrumentation
+from src.file_handler import load_logs_from_file
+from src.log_stats import LogStatistics
+from src.main import main
+from src.parallel import analyze_parallel
+from src.pipeline import AnalysisOptions, analyze_lines, summarize_lines
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp_dir, "access.log")
+        with open(LOG_FILE) as f:
+            self.lines = f.read().splitlines()
+        self.lines[10:10] = ["garbage", "more garbage"]
+        with open(self.log_file, "w") as f:
+            f.write("\n".join(self.lines))
+        self.addCleanup(instrumentation.disable)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_counters(self):
+        """
+        Тестирует счётчики строк при построчной обработке.
+
+        Входные данные:
+        - Файл с двумя нераспознаваемыми строками; фильтр по полю agent
+          и диапазон дат при обработке analyze_lines и summarize_lines.
+
+        Ожидаемый результат:
+        - Статистика совпадает с обработкой без сбора статистики выполнения.
+        - Прочитанные строки делятся на нераспознанные, отфильтрованные
+          и принятые, примеры нераспознанных строк сохраняются.
+        """
+        options = AnalysisOptions(
+            filter_field="agent", filter_value="*Debian*", from_date="2015-05-17T12"
+        )
+        expected = LogStatistics()
+        analyze_lines(load_logs_from_file(self.log_file), expected, options)
+
+        for name in ("analyze_lines", "summarize_lines"):
+            with self.subTest(name=name):
+                run_stats = instrumentation.enable()
+                if name == "analyze_lines":
+                    stats = LogStatistics()
+                    analyze_lines(load_logs_from_file(self.log_file), stats, options)
+                else:
+                    _, stats, _ = summarize_lines(
+                        load_logs_from_file(self.log_file), options
+                    )
+                instrumentation.disable()
+
+                self.assertEqual(stats.to_dict(), expected.to_dict())
+                counters = run_stats.counters
+                self.assertEqual(counters["lines_read"], len(self.lines))
+                self.assertEqual(counters["records_accepted"], stats.total_requests)
+                self.assertEqual(
+                    counters["lines_rejected"]
+                    + counters["lines_filtered"]
+                    + counters["records_accepted"],
+                    len(self.lines),
+                )
+                self.assertEqual(counters["bytes_read"], os.path.getsize(self.log_file))
+                self.assertIn("parse", run_stats.stages)
+                self.assertIn("read", run_stats.stages)
+        self.assertEqual(run_stats.counters["lines_rejected"], 2)
+        self.assertEqual(run_stats.samples, ["garbage", "more garbage"])
+
+    def test_parallel_workers(self):
+        """
+        Тестирует сбор статистики выполнения в процессах пула.
+
+        Ожидаемый результат:
+        - Счётчики процессов объединяются в статистике основного процесса.
+        """
+        run_stats = instrumentation.enable()
+        analyze_parallel([self.log_file, LOG_FILE], AnalysisOptions(), workers=2)
+        lines = len(self.lines) * 2 - 2
+        self.assertEqual(run_stats.counters["lines_read"], lines)
+        self.assertEqual(run_stats.counters["lines_rejected"], 2)
+        self.assertEqual(run_stats.stages["parse"]["calls"], lines)
+
+    def test_main_stats_and_profile(self):
+        """
+        Тестирует параметры --stats и --profile.
+
+        Ожидаемый результат:
+        - Статистика выполнения записывается в JSON с этапами, счётчиками
+          и пиковой памятью, профиль сохраняется в формате pstats, отчёт
+          не меняется, после запуска сбор статистики отключён.
+        """
+        stats_file = os.path.join(self.tmp_dir, "stats.json")
+        profile_file = os.path.join(self.tmp_dir, "run.prof")
+        args = ["analyzer", "--path", self.log_file, "--no-cache"]
+
+        output = io.StringIO()
+        with patch.object(sys, "argv", args), redirect_stdout(output):
+            main()
+        expected = output.getvalue()
+
+        output = io.StringIO()
+        with patch.object(
+            sys, "argv", args + ["--stats", stats_file, "--profile", profile_file]
+        ), redirect_stdout(output):
+            main()
+        self.assertEqual(output.getvalue(), expected)
+        self.assertIsNone(instrumentation.collector)
+
+        with open(stats_file) as f:
+            data = json.load(f)
+        for stage in ("total", "analyze", "format", "read", "parse"):
+            self.assertIn(stage, data["stages"])
+        self.assertIsNotNone(data["stages"]["total"]["cpu_seconds"])
+        self.assertEqual(data["counters"]["lines_rejected"], 2)
+        self.assertGreater(data["peak_memory_mb"]["process"], 0)
+        self.assertGreater(pstats.Stats(profile_file).total_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
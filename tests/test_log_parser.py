@@ -1,6 +1,12 @@
+import os
 import unittest
-from datetime import datetime, timezone
-from src.log_parser import parse_log_line
+from datetime import datetime, timedelta, timezone
+from src.log_parser import (
+    StringTable,
+    parse_log_line,
+    parse_log_line_regex,
+    parse_log_time,
+)
 
 
 class TestLogParser(unittest.TestCase):
@@ -100,6 +106,131 @@ class TestLogParser(unittest.TestCase):
         }
         self.assertEqual(parse_log_line(log_line), expected_output)
 
+    def test_parse_matches_regex_on_real_logs(self):
+        """
+        Тестирует совпадение быстрого разбора с эталонным на реальных логах.
+
+        Входные данные:
+        - Все строки файла logs.txt.
+
+        Ожидаемый результат:
+        - parse_log_line и parse_log_line_regex возвращают одинаковые записи.
+        """
+        file_name = os.path.join(os.path.dirname(__file__), "../logs.txt")
+        with open(file_name) as f:
+            for line in f:
+                self.assertEqual(parse_log_line(line), parse_log_line_regex(line))
+
+    def test_parse_nonstandard_lines(self):
+        """
+        Тестирует разбор строк, отличающихся от стандартного вида.
+
+        Входные данные:
+        - Строки с табуляцией в запросе, кавычкой в ресурсе, лишним текстом
+          в конце и пустым временем, которые быстрый разбор передаёт
+          регулярному выражению.
+
+        Ожидаемый результат:
+        - Результат совпадает с эталонным разбором, в том числе при разборе
+          только части полей.
+        """
+        lines = [
+            '1.2.3.4 - - [17/May/2015:08:05:32 +0000] "GET /a\tb HTTP/1.1" 200 5 "-" "x"',
+            '1.2.3.4 - - [17/May/2015:08:05:32 +0000] "GET /a"b HTTP/1.1" 200 5 "-" "x"',
+            '1.2.3.4 - - [17/May/2015:08:05:32 +0000] "GET / HTTP/1.1" 200 5 "-" "x" tail',
+            '1.2.3.4 - - [17/may/2015:08:05:32 +0000] "GET / HTTP/1.1" 200 - "-" "x"',
+            '1.2.3.4 - - [] "GET / HTTP/1.1" 200 1 "-" "a"',
+        ]
+        fields = frozenset(("resource", "status"))
+        for line in lines:
+            self.assertEqual(parse_log_line(line), parse_log_line_regex(line))
+            self.assertEqual(
+                parse_log_line(line, fields) is None,
+                parse_log_line_regex(line) is None,
+            )
+        self.assertIsNotNone(parse_log_line(lines[3]))
+        self.assertIsNone(parse_log_line(lines[4]))
+
+    def test_parse_log_time(self):
+        """
+        Тестирует разбор времени с ненулевым часовым поясом и ошибками формата.
+
+        Ожидаемый результат:
+        - Часовой пояс сохраняется, несуществующее время вызывает ValueError,
+          как и в datetime.strptime.
+        """
+        self.assertEqual(
+            parse_log_time("01/Jun/2015:23:59:59 -0130"),
+            datetime(
+                2015, 6, 1, 23, 59, 59, tzinfo=timezone(-timedelta(hours=1, minutes=30))
+            ),
+        )
+        for time_str in ("31/Jun/2015:10:00:00 +0000", "01/Jun/2015:24:00:00 +0000"):
+            with self.assertRaises(ValueError):
+                parse_log_time(time_str)
+
+    def test_parse_selected_fields(self):
+        """
+        Тестирует извлечение только запрошенных полей.
+
+        Входные данные:
+        - Стандартная строка и строка для эталонного разбора, поля resource,
+          status и size.
+
+        Ожидаемый результат:
+        - Возвращаются только запрошенные поля с теми же значениями.
+        - Некорректное время не разбирается и не вызывает ошибку.
+        """
+        fields = frozenset(("resource", "status", "size"))
+        lines = [
+            '93.180.71.3 - - [17/May/2015:08:05:32 +0000] "GET /a HTTP/1.1" 304 0 "-" "x"',
+            '93.180.71.3 - - [17/may/2015:08:05:32 +0000] "GET /b HTTP/1.1" 200 - "-" "x"',
+        ]
+        for line in lines:
+            full = parse_log_line(line)
+            self.assertEqual(
+                parse_log_line(line, fields), {field: full[field] for field in fields}
+            )
+
+        line = '1.2.3.4 - - [99/Foo/2015:08:05:32 +0000] "GET / HTTP/1.1" 200 5 "-" "x"'
+        self.assertEqual(
+            parse_log_line(line, fields), {"resource": "/", "status": 200, "size": 5}
+        )
+        with self.assertRaises(ValueError):
+            parse_log_line(line)
+
+    def test_string_table(self):
+        """
+        Тестирует интернирование полей записей через StringTable.
+
+        Входные данные:
+        - Стандартная строка и строка для эталонного разбора с одинаковыми
+          методом, ресурсом и user-agent; таблица на две строки.
+
+        Ожидаемый результат:
+        - Записи совпадают с разбором без таблицы, а одинаковые значения
+          полей являются одним объектом.
+        - trim очищает таблицу, в которой больше max_size строк.
+        """
+        lines = [
+            '1.2.3.4 - - [17/May/2015:08:05:32 +0000] "GET /a HTTP/1.1" 200 5 "-" "x y"',
+            '1.2.3.4 - - [17/may/2015:08:05:32 +0000] "GET /a HTTP/1.1" 200 5 "-" "x y"',
+        ]
+        fields = frozenset(("method", "resource", "agent"))
+        strings = StringTable()
+        records = [parse_log_line(line, fields, strings) for line in lines]
+        for line, log_record in zip(lines, records):
+            self.assertEqual(log_record, parse_log_line(line, fields))
+        for field in fields:
+            self.assertIs(records[0][field], records[1][field])
+
+        strings = StringTable(max_size=2)
+        for line in lines:
+            parse_log_line(line, fields, strings)
+        self.assertEqual(len(strings), 3)
+        strings.trim()
+        self.assertEqual(len(strings), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from datetime import datetime, timezone
 from collections import Counter
@@ -8,7 +10,7 @@ class TestLogStatistics(unittest.TestCase):
 
     def setUp(self):
         """Создание экземпляра LogStatistics для использования в тестах."""
-        self.log_stats = LogStatistics()
+        self.log_stats = LogStatistics(exact_quantiles=True)
         self.sample_records = [
             {
                 "resource": "/index",
@@ -41,8 +43,8 @@ class TestLogStatistics(unittest.TestCase):
         Тестирует метод update для обновления статистики по логу.
 
         Ожидаемый результат:
-        - Обновленные значения total_requests, resources, status_codes и response_sizes
-          соответствуют переданным данным.
+        - Обновленные значения total_requests, resources, status_codes, response_sizes
+          и total_size соответствуют переданным данным.
         """
         for record in self.sample_records:
             self.log_stats.update(record)
@@ -52,7 +54,11 @@ class TestLogStatistics(unittest.TestCase):
             self.log_stats.resources, Counter({"/index": 2, "/about": 1, "/contact": 1})
         )
         self.assertEqual(self.log_stats.status_codes, Counter({200: 2, 404: 1, 500: 1}))
-        self.assertEqual(self.log_stats.response_sizes, [500, 250, 1000, 150])
+        self.assertEqual(
+            self.log_stats.response_sizes.values,
+            Counter({500: 1, 250: 1, 1000: 1, 150: 1}),
+        )
+        self.assertEqual(self.log_stats.total_size, 1900)
 
     def test_average_size(self):
         """
@@ -82,6 +88,222 @@ class TestLogStatistics(unittest.TestCase):
         # 95-й процентиль в отсортированном [150, 250, 500, 1000] будет 500
         self.assertEqual(self.log_stats.percentile_95(), 500)
 
+    def test_percentile_95_approximate(self):
+        """
+        Тестирует 95-й процентиль в режиме по умолчанию с гистограммой размеров.
+
+        Ожидаемый результат:
+        - Значение отличается от точного не более чем на 1%, а средний размер
+          считается точно.
+        """
+        log_stats = LogStatistics()
+        for record in self.sample_records:
+            log_stats.update(record)
+
+        self.assertAlmostEqual(log_stats.percentile_95(), 500, delta=5)
+        self.assertEqual(log_stats.average_size(), 475)
+
+    def test_quantile(self):
+        """
+        Тестирует метод quantile для произвольных уровней квантиля.
+
+        Ожидаемый результат:
+        - Возвращает элементы отсортированной выборки с рангом int(n * q) - 1.
+        """
+        for size in range(1, 1001):
+            self.log_stats.update({"resource": "/", "status": 200, "size": size})
+
+        self.assertEqual(self.log_stats.quantile(0.5), 500)
+        self.assertEqual(self.log_stats.quantile(0.99), 990)
+        self.assertEqual(self.log_stats.quantile(0.999), 999)
+
+    def test_merge_and_add(self):
+        """
+        Тестирует объединение статистик методом merge и оператором +.
+
+        Ожидаемый результат:
+        - Объединение статистик по частям записей совпадает со статистикой
+          по всем записям сразу, исходные слагаемые при сложении не меняются.
+        """
+        first = LogStatistics(exact_quantiles=True)
+        second = LogStatistics(exact_quantiles=True)
+        for record in self.sample_records[:2]:
+            first.update(record)
+        for record in self.sample_records[2:]:
+            second.update(record)
+        for record in self.sample_records:
+            self.log_stats.update(record)
+
+        combined = first + second
+        self.assertEqual(first.total_requests, 2)
+        self.assertEqual(combined.total_requests, self.log_stats.total_requests)
+        self.assertEqual(combined.resources, self.log_stats.resources)
+        self.assertEqual(combined.status_codes, self.log_stats.status_codes)
+        self.assertEqual(combined.percentile_95(), self.log_stats.percentile_95())
+
+        first.merge(second)
+        self.assertEqual(
+            first.response_sizes.values, self.log_stats.response_sizes.values
+        )
+
+    def test_merge_different_quantile_modes(self):
+        """
+        Тестирует объединение точной и приближённой статистик.
+
+        Ожидаемый результат:
+        - Выбрасывается ValueError, исходная статистика не меняется.
+        """
+        self.log_stats.update(self.sample_records[0])
+        approximate = LogStatistics()
+        approximate.update(self.sample_records[1])
+
+        with self.assertRaises(ValueError):
+            self.log_stats.merge(approximate)
+        self.assertEqual(self.log_stats.total_requests, 1)
+
+    def test_snapshot_roundtrip(self):
+        """
+        Тестирует сохранение статистики в снимок и загрузку из него.
+
+        Ожидаемый результат:
+        - Загруженная статистика совпадает с исходной, включая порядок ресурсов,
+          средний размер и 95-й процентиль.
+        """
+        for record in self.sample_records:
+            self.log_stats.update(record)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "stats.json")
+            self.log_stats.save(path)
+            loaded = LogStatistics.load(path)
+
+        self.assertEqual(loaded.total_requests, 4)
+        self.assertTrue(loaded.exact_quantiles)
+        self.assertEqual(
+            list(loaded.resources.items()), list(self.log_stats.resources.items())
+        )
+        self.assertEqual(loaded.status_codes, self.log_stats.status_codes)
+        self.assertEqual(loaded.average_size(), self.log_stats.average_size())
+        self.assertEqual(loaded.percentile_95(), self.log_stats.percentile_95())
+
+    def test_top_k_resources(self):
+        """
+        Тестирует статистику с ограниченным количеством ресурсов.
+
+        Входные данные:
+        - top_k=2 и три различных ресурса.
+
+        Ожидаемый результат:
+        - Хранится не больше двух ресурсов, самый частый ресурс не теряется.
+        - Снимок сохраняет сводку и top_k.
+        - Объединение с точной статистикой выбрасывает ValueError.
+        """
+        stats = LogStatistics(top_k=2)
+        for record in self.sample_records:
+            stats.update(record)
+
+        self.assertEqual(len(stats.resources), 2)
+        self.assertEqual(stats.resources.most_common(1), [("/index", 2)])
+
+        loaded = LogStatistics.from_dict(stats.to_dict())
+        self.assertEqual(loaded.top_k, 2)
+        self.assertEqual(list(loaded.resources.items()), list(stats.resources.items()))
+        self.assertEqual(loaded.resources.errors, stats.resources.errors)
+
+        with self.assertRaises(ValueError):
+            stats.merge(LogStatistics())
+
+    def test_distinct_counts(self):
+        """
+        Тестирует количество различных значений полей.
+
+        Входные данные:
+        - Статистики с distinct_precision, собранные по частям записей.
+
+        Ожидаемый результат:
+        - Оценки совпадают с точным количеством различных ip, user-agent
+          и ресурсов, в том числе после объединения и загрузки из снимка.
+        - Объединение со статистикой без подсчёта выбрасывает ValueError.
+        """
+        first, second = LogStatistics(distinct_precision=10), LogStatistics(
+            distinct_precision=10
+        )
+        for i, record in enumerate(self.sample_records):
+            record = dict(record, ip=f"10.0.0.{i % 3}", agent=f"agent {i % 2}")
+            (first if i % 2 else second).update(record)
+        stats = LogStatistics.from_dict((first + second).to_dict())
+
+        self.assertEqual(stats.distinct_precision, 10)
+        self.assertEqual(
+            {field: sketch.count() for field, sketch in stats.distinct.items()},
+            {"ip": 3, "agent": 2, "resource": 3},
+        )
+        with self.assertRaises(ValueError):
+            stats.merge(LogStatistics())
+
+    def test_time_buckets(self):
+        """
+        Тестирует статистику по корзинам времени.
+
+        Входные данные:
+        - Записи за три часа двух суток в часовых корзинах, собранные двумя
+          статистиками.
+
+        Ожидаемый результат:
+        - Каждая корзина совпадает со статистикой своих записей, суточные
+          корзины rollup — с объединением часовых, window — со статистикой
+          записей интервала, в том числе после загрузки из снимка; totals —
+          со статистикой всех записей без корзин.
+        - Шаг, не кратный корзинам, и объединение со статистикой без корзин
+          выбрасывают ValueError.
+        """
+        hour, day = 3600, 86400
+        records = [
+            dict(record, ts=ts)
+            for ts in (0, 60, hour + 5, day + 10)
+            for record in self.sample_records
+        ]
+        first, second = LogStatistics(bucket_seconds=hour), LogStatistics(
+            bucket_seconds=hour
+        )
+        for i, record in enumerate(records):
+            (first if i < 6 else second).update(record)
+        stats = LogStatistics.from_dict((first + second).to_dict())
+
+        def expected(start, end):
+            expected = LogStatistics()
+            for record in records:
+                if start <= record["ts"] < end:
+                    expected.update(record)
+            return expected.to_dict()
+
+        self.assertEqual(sorted(stats.buckets), [0, hour, day])
+        self.assertEqual(stats.buckets[hour].to_dict(), expected(hour, 2 * hour))
+        daily = stats.rollup(day)
+        self.assertEqual(list(daily), [0, day])
+        self.assertEqual(daily[0].to_dict(), expected(0, day))
+        window = stats.window(hour, 2 * day)
+        self.assertEqual(sorted(window.buckets), [hour, day])
+        self.assertEqual(dict(window.to_dict(), buckets=None), expected(hour, 2 * day))
+        self.assertEqual(stats.totals().to_dict(), expected(0, 2 * day))
+
+        with self.assertRaises(ValueError):
+            stats.rollup(hour + 1)
+        with self.assertRaises(ValueError):
+            stats.merge(LogStatistics())
+
+    def test_snapshot_unsupported_version(self):
+        """
+        Тестирует загрузку снимка неподдерживаемой версии.
+
+        Ожидаемый результат:
+        - Выбрасывается ValueError.
+        """
+        snapshot = self.log_stats.to_dict()
+        snapshot["version"] = 0
+        with self.assertRaises(ValueError):
+            LogStatistics.from_dict(snapshot)
+
     def test_is_within_date_range_within_range(self):
         """
         Тестирует проверку записи лога, находящейся внутри диапазона.
@@ -1,7 +1,12 @@
+import csv
+import io
+import json
 import unittest
 from collections import Counter
 
-from src.output_formatter import format_output
+from src.log_stats import LogStatistics
+from src.output_formatter import ReportSummary, format_output, write_report
+from src.sketches import HyperLogLog, SpaceSaving
 
 
 class TestOutputFormatter(unittest.TestCase):
@@ -25,6 +30,12 @@ class TestOutputFormatter(unittest.TestCase):
         def percentile_95(self):
             return 400.0  # Пример 95-го перцентиля
 
+        def quantile(self, q):
+            return 1000.0 * q  # Пример произвольного квантиля
+
+        def quantiles(self, levels):
+            return [self.quantile(q) for q in levels]
+
     def setUp(self):
         self.stats = self.MockStats()
         self.files = ["file1.log", "file2.log"]
@@ -103,6 +114,222 @@ class TestOutputFormatter(unittest.TestCase):
         )
         self.assertEqual(result.strip(), expected_output.strip())
 
+    def test_format_with_percentiles(self):
+        markdown = format_output(
+            self.stats,
+            self.files,
+            self.from_date,
+            self.to_date,
+            "markdown",
+            percentiles=(50, 99.9),
+        )
+        self.assertIn(
+            "|   95p размера ответа  |   400.00b\n"
+            "|  50p размера ответа   |   500.00b\n"
+            "| 99.9p размера ответа  |   999.00b\n\n#### Запрашиваемые ресурсы",
+            markdown,
+        )
+
+        adoc = format_output(
+            self.stats, self.files, self.from_date, self.to_date, "adoc", (99,)
+        )
+        self.assertIn(
+            "|95p размера ответа     |400.00b\n|99p размера ответа     |990.00b\n|===",
+            adoc,
+        )
+
+    def test_format_distinct_counts(self):
+        """
+        Тестирует вывод количества различных значений.
+
+        Входные данные:
+        - Статистика со сводками HyperLogLog для ip и ресурсов.
+
+        Ожидаемый результат:
+        - Оценки выводятся в общей информации со знаком приближения.
+        """
+        self.stats.distinct = {"ip": HyperLogLog(), "resource": HyperLogLog()}
+        for i in range(3):
+            self.stats.distinct["ip"].add(f"10.0.0.{i}")
+        self.stats.distinct["resource"].add("/index")
+
+        markdown = format_output(
+            self.stats, self.files, self.from_date, self.to_date, "markdown"
+        )
+        self.assertIn(
+            "|   95p размера ответа  |   400.00b\n"
+            "|     Уникальных IP     |   ~3\n"
+            "|  Уникальных ресурсов  |   ~1\n\n#### Запрашиваемые ресурсы",
+            markdown,
+        )
+        adoc = format_output(
+            self.stats, self.files, self.from_date, self.to_date, "adoc"
+        )
+        self.assertIn(
+            "|Уникальных IP          |~3\n|Уникальных ресурсов    |~1\n|===", adoc
+        )
+
+    def test_format_timeseries(self):
+        """
+        Тестирует вывод временного ряда.
+
+        Входные данные:
+        - Статистика с часовыми корзинами за два часа, шаг ряда 1h и 1d.
+
+        Ожидаемый результат:
+        - Для каждого шага выводится строка с количеством запросов,
+          95-м процентилем, классами кодов ответа и популярным ресурсом.
+        - Без шага раздел не выводится.
+        """
+        stats = LogStatistics(exact_quantiles=True, bucket_seconds=3600)
+        for ts, resource, status in (
+            (0, "/a", 200),
+            (10, "/b", 404),
+            (20, "/b", 304),
+            (3600, "/a", 500),
+        ):
+            stats.update({"ts": ts, "resource": resource, "status": status, "size": 10})
+
+        markdown = format_output(
+            stats, self.files, None, None, "markdown", timeseries=3600
+        )
+        self.assertIn(
+            "#### Динамика запросов (шаг 1h)\n\n",
+            markdown,
+        )
+        self.assertIn(
+            "| 1970-01-01 00:00 |    3  |    10.00b  |  1  |  1  |  1  |  0  |  /b\n"
+            "| 1970-01-01 01:00 |    1  |    10.00b  |  0  |  0  |  0  |  1  |  /a\n",
+            markdown,
+        )
+        adoc = format_output(stats, self.files, None, None, "adoc", timeseries=86400)
+        self.assertIn(
+            "== Динамика запросов (шаг 1d)\n\n|=== \n"
+            "|Начало |Запросов |95p размера ответа |2xx |3xx |4xx |5xx "
+            "|Популярный ресурс\n"
+            "|1970-01-01 00:00 |4 |10.00b |1 |1 |1 |1 |/a\n|===",
+            adoc,
+        )
+        self.assertNotIn(
+            "Динамика", format_output(stats, self.files, None, None, "markdown")
+        )
+
+    def test_format_json(self):
+        """
+        Тестирует отчёт в формате json.
+
+        Входные данные:
+        - Статистика с приближённым подсчётом ресурсов и дополнительным
+          процентилем.
+
+        Ожидаемый результат:
+        - Отчёт читается json.loads; ресурсы идут по убыванию количества
+          с границей погрешности, коды ответа — по убыванию количества.
+        """
+        self.stats.resources = SpaceSaving(10)
+        self.stats.resources["/a"] += 3
+        self.stats.resources["/b"] += 5
+        report = json.loads(
+            format_output(self.stats, self.files, self.from_date, None, "json", (50,))
+        )
+        self.assertEqual(report["files"], self.files)
+        self.assertEqual(report["from_date"], self.from_date)
+        self.assertIsNone(report["to_date"])
+        self.assertEqual(report["total_requests"], 100)
+        self.assertEqual(report["percentiles"], {"95": 400.0, "50": 500.0})
+        self.assertEqual(
+            report["resources"],
+            [
+                {"resource": "/b", "count": 5, "error": 0},
+                {"resource": "/a", "count": 3, "error": 0},
+            ],
+        )
+        self.assertEqual(
+            report["status_codes"],
+            [
+                {"status": 200, "count": 80},
+                {"status": 404, "count": 10},
+                {"status": 500, "count": 10},
+            ],
+        )
+        self.assertIsNone(report["timeseries"])
+
+    def test_format_ndjson_and_csv(self):
+        """
+        Тестирует отчёты в форматах ndjson и csv.
+
+        Входные данные:
+        - Статистика с часовыми корзинами и шагом ряда 1h.
+
+        Ожидаемый результат:
+        - В ndjson каждая строка — объект JSON с полем type.
+        - В csv после заголовка идут строки раздел, ключ, показатель,
+          значение, в том числе для временного ряда.
+        """
+        stats = LogStatistics(exact_quantiles=True, bucket_seconds=3600)
+        for ts, resource, status in ((0, "/a", 200), (3600, "/b", 404)):
+            stats.update({"ts": ts, "resource": resource, "status": status, "size": 10})
+
+        ndjson = format_output(stats, self.files, None, None, "ndjson", timeseries=3600)
+        lines = [json.loads(line) for line in ndjson.splitlines()]
+        self.assertEqual(
+            [line["type"] for line in lines],
+            ["summary", "resource", "resource", "status", "status"]
+            + ["timeseries"] * 2,
+        )
+        self.assertEqual(
+            lines[-1],
+            {
+                "type": "timeseries",
+                "start": "1970-01-01T01:00:00+00:00",
+                "requests": 1,
+                "percentile_95": 10,
+                "2xx": 0,
+                "3xx": 0,
+                "4xx": 1,
+                "5xx": 0,
+                "top_resource": "/b",
+            },
+        )
+
+        rows = list(
+            csv.reader(
+                io.StringIO(
+                    format_output(stats, self.files, None, None, "csv", timeseries=3600)
+                )
+            )
+        )
+        self.assertEqual(rows[0], ["section", "key", "metric", "value"])
+        self.assertIn(["summary", "", "file", "file1.log"], rows)
+        self.assertIn(["summary", "", "total_requests", "2"], rows)
+        self.assertIn(["resource", "/a", "count", "1"], rows)
+        self.assertIn(["status", "404", "count", "1"], rows)
+        self.assertIn(
+            ["timeseries", "1970-01-01T00:00:00+00:00", "top_resource", "/a"], rows
+        )
+
+    def test_write_report(self):
+        """
+        Тестирует вывод отчёта в поток.
+
+        Ожидаемый результат:
+        - Текстовый отчёт совпадает с format_output и завершается переводом
+          строки, как при выводе print.
+        - Неизвестный формат вызывает ValueError.
+        """
+        summary = ReportSummary(self.stats, self.files, self.from_date, self.to_date)
+        for output_format in ("markdown", "json"):
+            out = io.StringIO()
+            write_report(summary, output_format, out)
+            expected = format_output(
+                self.stats, self.files, self.from_date, self.to_date, output_format
+            )
+            if output_format == "markdown":
+                expected += "\n"
+            self.assertEqual(out.getvalue(), expected)
+        with self.assertRaises(ValueError):
+            write_report(summary, "xml", io.StringIO())
+
 
 if __name__ == "__main__":
     unittest.main()
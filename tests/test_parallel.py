@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+
+from src.cache import AggregateCache
+from src.file_handler import load_logs
+from src.log_stats import LogStatistics
+from src.parallel import analyze_parallel, plan_tasks
+from src.pipeline import AnalysisOptions, analyze_files, analyze_lines
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), "../logs")
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.files = [
+            os.path.join(LOGS_DIR, name)
+            for name in ("2015-05-17.txt", "2015-05-18.txt", "2015-05-19.txt")
+        ]
+
+    def analyze_serial(self, options):
+        stats = LogStatistics()
+        processed_files = []
+        for log_file in self.files:
+            if analyze_lines(load_logs(log_file), stats, options):
+                processed_files.append(log_file)
+        return stats, processed_files
+
+    def assert_same_stats(self, expected, actual):
+        self.assertEqual(actual.total_requests, expected.total_requests)
+        self.assertEqual(
+            list(actual.resources.items()), list(expected.resources.items())
+        )
+        self.assertEqual(
+            list(actual.status_codes.items()), list(expected.status_codes.items())
+        )
+        self.assertEqual(actual.average_size(), expected.average_size())
+        self.assertEqual(actual.percentile_95(), expected.percentile_95())
+
+    def test_plan_tasks_splits_large_files(self):
+        """
+        Тестирует разбиение файлов на диапазоны байт.
+
+        Ожидаемый результат:
+        - Диапазоны каждого файла идут подряд и покрывают его целиком.
+        """
+        tasks = plan_tasks(self.files, workers=4, min_chunk_size=4096)
+        self.assertGreater(len(tasks), len(self.files))
+        for log_file in self.files:
+            ranges = [
+                (start, end) for source, start, end in tasks if source == log_file
+            ]
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], os.path.getsize(log_file))
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+
+    def test_analyze_parallel_matches_serial(self):
+        """
+        Тестирует совпадение параллельной и последовательной обработки.
+
+        Ожидаемый результат:
+        - Статистика и список обработанных файлов совпадают, включая порядок
+          ресурсов с одинаковым количеством запросов.
+        """
+        options = AnalysisOptions(
+            from_date="2015-05-18", filter_field="agent", filter_value="Mozilla*"
+        )
+        expected_stats, expected_files = self.analyze_serial(options)
+        stats, processed_files = analyze_parallel(self.files, options, workers=2)
+
+        self.assert_same_stats(expected_stats, stats)
+        self.assertEqual(processed_files, expected_files)
+        self.assertEqual(processed_files, self.files[1:])
+
+    def test_analyze_parallel_with_cache(self):
+        """
+        Тестирует параллельную обработку с кэшем сводок файлов.
+
+        Ожидаемый результат:
+        - Холодный и тёплый запуски дают тот же результат, что и обработка
+          без кэша, а тёплый запуск не создаёт задач для процессов.
+        """
+        options = AnalysisOptions(to_date="2015-05-18")
+        expected_stats, expected_files = self.analyze_serial(options)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = AggregateCache(cache_dir)
+            for _ in range(2):
+                stats, processed_files = analyze_parallel(
+                    self.files, options, workers=2, cache=cache
+                )
+                self.assert_same_stats(expected_stats, stats)
+                self.assertEqual(processed_files, expected_files)
+            self.assertEqual(len(os.listdir(cache_dir)), len(self.files))
+
+    def test_analyze_parallel_repeated_path(self):
+        """
+        Тестирует файл, указанный несколько раз.
+
+        Входные данные:
+        - Один и тот же файл дважды, с кэшем и без.
+
+        Ожидаемый результат:
+        - Статистика файла учитывается по разу для каждого упоминания, как при
+          последовательной обработке, а в кэш попадает сводка одного прохода:
+          следующий запуск по одному файлу даёт обычный результат.
+        """
+        options = AnalysisOptions()
+        single, _ = analyze_files(self.files[:1], options)
+        expected, expected_files = analyze_files(self.files[:1] * 2, options)
+        self.assertEqual(expected.total_requests, 2 * single.total_requests)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for cache in (None, AggregateCache(cache_dir)):
+                with self.subTest(cache=cache):
+                    stats, processed_files = analyze_parallel(
+                        self.files[:1] * 2, options, workers=2, cache=cache
+                    )
+                    self.assert_same_stats(expected, stats)
+                    self.assertEqual(processed_files, expected_files)
+            stats, _ = analyze_parallel(
+                self.files[:1], options, workers=2, cache=AggregateCache(cache_dir)
+            )
+            self.assert_same_stats(single, stats)
+
+    def test_analyze_files_matches_serial(self):
+        """
+        Тестирует последовательную обработку с упреждающим чтением файлов.
+
+        Входные данные:
+        - Запуски без кэша, с холодным и тёплым кэшем и с диапазоном дат,
+          частично пересекающим файл.
+
+        Ожидаемый результат:
+        - Статистика и список обработанных файлов совпадают с обработкой
+          файлов по одному.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = AggregateCache(cache_dir)
+            for options, file_cache in [
+                (AnalysisOptions(filter_field="agent", filter_value="Debian*"), None),
+                (AnalysisOptions(to_date="2015-05-18"), cache),
+                (AnalysisOptions(to_date="2015-05-18"), cache),
+                (AnalysisOptions(from_date="2015-05-18T12:00:00"), cache),
+            ]:
+                with self.subTest(options=options, cache=file_cache):
+                    expected_stats, expected_files = self.analyze_serial(options)
+                    stats, processed_files = analyze_files(
+                        self.files, options, file_cache, depth=1, max_bytes=1
+                    )
+                    self.assert_same_stats(expected_stats, stats)
+                    self.assertEqual(processed_files, expected_files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,329 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.client import HTTPConnection
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from src.filters import FieldFilter
+from src.main import parse_report_query
+from src.pipeline import AnalysisOptions, analyze_files
+from src.server import LogServer, make_server, read_file_state
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), "../logs")
+DAYS = ("2015-05-17", "2015-05-18", "2015-05-19")
+NEW_LINE = (
+    '1.2.3.4 - - [19/May/2015:23:00:00 +0000] "GET /new HTTP/1.1" 404 5 "-" "x"\n'
+)
+
+
+class TestLogServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.files = []
+        for day in DAYS:
+            path = os.path.join(self.tmp_dir, f"{day}.txt")
+            shutil.copy(os.path.join(LOG_DIR, f"{day}.txt"), path)
+            self.files.append(path)
+        self.server = LogServer([os.path.join(self.tmp_dir, "*.txt")])
+        self.server.refresh()
+
+    def assert_matches_analysis(self, options):
+        expected, expected_files = analyze_files(
+            list(self.server.snapshot.files), options
+        )
+        stats, files = self.server.query(options)
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+        self.assertEqual(
+            stats.resources.most_common(10), expected.resources.most_common(10)
+        )
+        self.assertEqual(files, expected_files)
+
+    def test_query_matches_analysis(self):
+        """
+        Тестирует совпадение ответа сервера с разбором файлов.
+
+        Входные данные:
+        - Три файла логов; запросы без фильтров, с диапазонами дат,
+          границы которых кратны часу и не кратны, с фильтрами, точными
+          квантилями, различными значениями и корзинами времени.
+
+        Ожидаемый результат:
+        - Статистика, порядок ресурсов и список файлов совпадают с analyze_files.
+        """
+        cases = [
+            AnalysisOptions(),
+            AnalysisOptions(from_date="2015-05-18", to_date="2015-05-18"),
+            AnalysisOptions(from_date="2015-05-18T12:34:56"),
+            AnalysisOptions(
+                filters=(FieldFilter("status", "2*", negate=True),),
+                to_date="2015-05-18",
+            ),
+            AnalysisOptions(
+                exact_quantiles=True,
+                distinct_precision=10,
+                bucket_seconds=86400,
+                from_date="2015-05-17T06:00:00",
+            ),
+        ]
+        for options in cases:
+            with self.subTest(options=options):
+                self.assert_matches_analysis(options)
+
+    def test_incremental_refresh(self):
+        """
+        Тестирует обновление снимка при изменении файлов.
+
+        Входные данные:
+        - Дописанная строка без перевода строки, затем её окончание,
+          новый файл и перезаписанный более коротким содержимым файл.
+
+        Ожидаемый результат:
+        - Без изменений снимок не публикуется заново.
+        - После каждого изменения ответ совпадает с разбором файлов,
+          а прежний снимок и его сводки не меняются.
+        """
+        options = AnalysisOptions()
+        self.assert_matches_analysis(options)
+        snapshot = self.server.snapshot
+        self.assertIs(self.server.refresh(), snapshot)
+
+        old_states = dict(next(iter(snapshot.views.values())))
+        old_total = old_states[self.files[2]].summary.stats.total_requests
+        with open(self.files[2], "a") as f:
+            f.write(NEW_LINE[:40])
+        self.assertIsNot(self.server.refresh(), snapshot)
+        self.assert_matches_analysis(options)
+        with open(self.files[2], "a") as f:
+            f.write(NEW_LINE[40:])
+        self.server.refresh()
+        self.assert_matches_analysis(options)
+        self.assert_matches_analysis(
+            AnalysisOptions(filter_field="resource", filter_value="/new")
+        )
+
+        with open(os.path.join(self.tmp_dir, "2015-05-20.txt"), "w") as f:
+            f.write(NEW_LINE)
+        with open(self.files[0], "w") as f:
+            f.write(NEW_LINE * 3)
+        self.server.refresh()
+        self.assertEqual(len(self.server.snapshot.files), 4)
+        self.assert_matches_analysis(options)
+
+        self.assertEqual(next(iter(snapshot.views.values())), old_states)
+        self.assertEqual(
+            old_states[self.files[2]].summary.stats.total_requests, old_total
+        )
+
+    def test_refresh_errors(self):
+        """
+        Тестирует обновление снимка при ошибках чтения файлов.
+
+        Входные данные:
+        - Дописанная строка с байтом не в UTF-8, затем ошибка при чтении
+          одного файла на двух обновлениях подряд и ошибка всего обновления
+          в потоке watch.
+
+        Ожидаемый результат:
+        - Строка не в UTF-8 пропускается, следующие строки учитываются
+          (разбор файла целиком, как и раньше, останавливается на ней).
+        - Файл с ошибкой сохраняет прежнее состояние, остальные файлы
+          обновляются, сообщение об ошибке выводится один раз.
+        - Поток watch продолжает обновлять снимок после ошибки.
+        """
+        with open(self.files[2], "ab") as f:
+            f.write(b"\xff\n" + NEW_LINE.encode("utf-8"))
+        self.server.refresh()
+        stats, _ = self.server.query(
+            AnalysisOptions(filter_field="resource", filter_value="/new")
+        )
+        self.assertEqual(stats.total_requests, 1)
+
+        states = dict(next(iter(self.server.snapshot.views.values())))
+
+        def failing(path, view, previous=None):
+            if path == self.files[0]:
+                raise RuntimeError("broken")
+            return read_file_state(path, view, previous)
+
+        with open(self.files[0], "a") as f:
+            f.write(NEW_LINE)
+        with open(self.files[1], "a") as f:
+            f.write(NEW_LINE)
+        with patch("src.server.read_file_state", side_effect=failing), redirect_stdout(
+            StringIO()
+        ) as out:
+            self.server.refresh()
+            self.server.refresh()
+        self.assertEqual(out.getvalue().count("Error processing file"), 1)
+        new_states = next(iter(self.server.snapshot.views.values()))
+        self.assertIs(new_states[self.files[0]], states[self.files[0]])
+        self.assertIsNot(new_states[self.files[1]], states[self.files[1]])
+
+        stop = threading.Event()
+        calls = []
+
+        def refresh():
+            calls.append(None)
+            if len(calls) == 1:
+                raise RuntimeError("broken")
+            stop.set()
+
+        with patch.object(self.server, "refresh", side_effect=refresh), redirect_stdout(
+            StringIO()
+        ) as out:
+            self.server.watch(0.001, stop)
+        self.assertEqual(len(calls), 2)
+        self.assertIn("Error refreshing snapshot", out.getvalue())
+
+    def test_views_limit(self):
+        """
+        Тестирует ограничение количества видов в памяти.
+
+        Входные данные:
+        - max_views 2 и запросы с тремя разными фильтрами.
+
+        Ожидаемый результат:
+        - Хранится не больше двух видов; вытесняется давно не использованный.
+        """
+        times = iter(range(100))
+        server = LogServer(self.files, max_views=2, clock=lambda: next(times))
+        first = AnalysisOptions(filter_field="method", filter_value="GET")
+        second = AnalysisOptions(filter_field="method", filter_value="HEAD")
+        third = AnalysisOptions(filter_field="method", filter_value="POST")
+        for options in (first, second, first, third):
+            server.query(options)
+        self.assertEqual(server.status()["views"], 2)
+        self.assertEqual(
+            {view.filters for view in server.snapshot.views},
+            {first.filters, third.filters},
+        )
+
+
+class TestReportServer(unittest.TestCase):
+
+    def setUp(self):
+        self.files = [os.path.join(LOG_DIR, f"{day}.txt") for day in DAYS]
+        self.log_server = LogServer(self.files)
+        self.log_server.refresh()
+
+    def start(self, **kwargs):
+        server = make_server(self.log_server, parse_report_query, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_http_api(self):
+        """
+        Тестирует запросы по HTTP.
+
+        Входные данные:
+        - /report с фильтром, датой и форматом json, с неверными
+          параметрами, /status и неизвестный путь.
+
+        Ожидаемый результат:
+        - Отчёт совпадает с разбором файлов с теми же фильтрами.
+        - Неверные параметры, в том числе даты, и параметр output дают ответ 400,
+          неизвестный путь — 404.
+        """
+        server = self.start(port=0)
+        connection = HTTPConnection(*server.server_address)
+        self.addCleanup(connection.close)
+
+        def get(path):
+            connection.request("GET", path)
+            response = connection.getresponse()
+            return response.status, response.read().decode("utf-8")
+
+        query = urlencode(
+            {"from": "2015-05-18", "filter": "status!=2*", "format": "json"}
+        )
+        status, body = get(f"/report?{query}")
+        self.assertEqual(status, 200)
+        expected, expected_files = analyze_files(
+            self.files,
+            AnalysisOptions(
+                from_date="2015-05-18",
+                filters=(FieldFilter("status", "2*", negate=True),),
+            ),
+        )
+        report = json.loads(body)
+        self.assertEqual(report["total_requests"], expected.total_requests)
+        self.assertEqual(report["files"], expected_files)
+
+        for path in (
+            "/report?top-k=0",
+            "/report?output=report.md",
+            "/report?x=1",
+            "/report?from=garbage",
+            "/report?to=2015-05-17T00:00:00%2B03:00",
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(get(path)[0], 400)
+        self.assertEqual(get("/stats")[0], 404)
+
+        status, body = get("/status")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["files"], self.files)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are unavailable")
+    def test_unix_socket(self):
+        """
+        Тестирует запрос через Unix-сокет.
+
+        Входные данные:
+        - Обычный файл по пути сокета, сокет, оставшийся от прошлого
+          запуска, запрос /report в формате ndjson и запуск второго сервера
+          на том же сокете.
+
+        Ожидаемый результат:
+        - Обычный файл не удаляется, сервер не запускается (OSError).
+        - Оставшийся сокет заменяется, первая строка ответа — сводка с общим
+          числом запросов по всем файлам.
+        - Второй сервер не запускается, пока первый принимает подключения.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        socket_path = os.path.join(tmp_dir, "analyzer.sock")
+        with open(socket_path, "w") as f:
+            f.write("data")
+        with self.assertRaises(OSError):
+            make_server(self.log_server, parse_report_query, socket_path=socket_path)
+        with open(socket_path) as f:
+            self.assertEqual(f.read(), "data")
+        os.remove(socket_path)
+
+        # Сокет, который никто не слушает, как после аварийного завершения
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(socket_path)
+        self.start(socket_path=socket_path)
+        with self.assertRaises(OSError):
+            make_server(self.log_server, parse_report_query, socket_path=socket_path)
+
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(socket_path)
+            client.sendall(b"GET /report?format=ndjson HTTP/1.0\r\n\r\n")
+            response = b""
+            while chunk := client.recv(65536):
+                response += chunk
+        head, body = response.decode("utf-8").split("\r\n\r\n", 1)
+        self.assertTrue(head.startswith("HTTP/1.0 200"))
+        summary = json.loads(body.splitlines()[0])
+        expected, _ = analyze_files(self.files, AnalysisOptions())
+        self.assertEqual(summary["type"], "summary")
+        self.assertEqual(summary["total_requests"], expected.total_requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
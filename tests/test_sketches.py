@@ -0,0 +1,313 @@
+import pickle
+import random
+import unittest
+from collections import Counter
+
+from src.sketches import (
+    ExactQuantiles,
+    HyperLogLog,
+    LogHistogram,
+    SpaceSaving,
+    quantile_rank,
+    quantiles_from_dict,
+    stable_hash,
+)
+
+
+class TestSketches(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(42)
+        self.values = [int(generator.lognormvariate(8, 2)) for _ in range(20000)]
+        self.levels = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+    def exact_quantile(self, q):
+        ordered = sorted(self.values)
+        return ordered[quantile_rank(len(ordered), q)]
+
+    def test_exact_quantiles(self):
+        """
+        Тестирует точное распределение ExactQuantiles.
+
+        Ожидаемый результат:
+        - Квантили совпадают с элементами отсортированного списка значений.
+        """
+        sketch = ExactQuantiles()
+        for value in self.values:
+            sketch.add(value)
+
+        for q in self.levels:
+            self.assertEqual(sketch.quantile(q), self.exact_quantile(q))
+
+    def test_log_histogram_relative_error(self):
+        """
+        Тестирует гарантию точности LogHistogram.
+
+        Ожидаемый результат:
+        - Каждый квантиль отличается от точного не более чем на relative_accuracy.
+        """
+        sketch = LogHistogram(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+
+        for q in self.levels:
+            expected = self.exact_quantile(q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected), 0.01 * expected)
+
+    def test_quantiles_in_one_pass(self):
+        """
+        Тестирует вычисление нескольких квантилей за один проход.
+
+        Входные данные:
+        - Уровни в произвольном порядке, включая крайние 0 и 1.
+
+        Ожидаемый результат:
+        - Значения идут в порядке уровней и совпадают с точными квантилями
+          с точностью сводки; для пустого распределения возвращаются нули.
+        """
+        levels = (0.99, 0, 0.5, 1, 0.95)
+        self.values += [0, 0]
+        expected = [self.exact_quantile(q) for q in levels]
+        for sketch, accuracy in ((ExactQuantiles(), 0), (LogHistogram(), 0.01)):
+            with self.subTest(kind=sketch.kind):
+                self.assertEqual(sketch.quantiles(levels), [0] * len(levels))
+                for value in self.values:
+                    sketch.add(value)
+                for value, exact in zip(sketch.quantiles(levels), expected):
+                    self.assertLessEqual(abs(value - exact), accuracy * exact)
+
+    def test_log_histogram_merge(self):
+        """
+        Тестирует объединение гистограмм, построенных по частям данных.
+
+        Ожидаемый результат:
+        - Объединённая гистограмма совпадает с гистограммой по всем данным.
+        """
+        whole, first, second = LogHistogram(), LogHistogram(), LogHistogram()
+        for index, value in enumerate(self.values):
+            whole.add(value)
+            (first if index % 2 else second).add(value)
+
+        first.merge(second)
+        self.assertEqual(first.buckets, whole.buckets)
+        self.assertEqual(first.count, whole.count)
+        with self.assertRaises(ValueError):
+            first.merge(LogHistogram(relative_accuracy=0.05))
+
+    def test_log_histogram_bounded_buckets(self):
+        """
+        Тестирует ограничение памяти LogHistogram.
+
+        Ожидаемый результат:
+        - Количество корзин не превышает max_buckets, старшие квантили
+          по-прежнему точны в пределах погрешности.
+        """
+        sketch = LogHistogram(max_buckets=256)
+        for value in self.values:
+            sketch.add(value)
+
+        self.assertLessEqual(len(sketch.buckets), 256)
+        expected = self.exact_quantile(0.99)
+        self.assertLessEqual(abs(sketch.quantile(0.99) - expected), 0.01 * expected)
+
+    def test_snapshot_roundtrip(self):
+        """
+        Тестирует сохранение распределений в снимок и восстановление по типу.
+
+        Ожидаемый результат:
+        - Восстановленные распределения дают те же квантили.
+        """
+        for sketch in (ExactQuantiles(), LogHistogram()):
+            for value in self.values:
+                sketch.add(value)
+            restored = quantiles_from_dict(sketch.to_dict())
+            self.assertIsInstance(restored, type(sketch))
+            self.assertEqual(restored.quantile(0.95), sketch.quantile(0.95))
+
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(7)
+        keys = [f"/r{rank}" for rank in range(1, 5001)]
+        weights = [1 / rank**1.1 for rank in range(1, 5001)]
+        self.stream = generator.choices(keys, weights=weights, k=50000)
+
+    @staticmethod
+    def fill(keys, capacity):
+        summary = SpaceSaving(capacity)
+        for key in keys:
+            summary[key] += 1
+        return summary
+
+    def assert_bounds(self, summary, exact):
+        for key, count in summary.items():
+            self.assertGreaterEqual(count, exact[key])
+            self.assertLessEqual(count - summary.error(key), exact[key])
+        for key, count in exact.items():
+            if count > summary.min_count():
+                self.assertIn(key, summary)
+
+    def test_exact_below_capacity(self):
+        """
+        Тестирует сводку, в которой различных ключей не больше capacity.
+
+        Ожидаемый результат:
+        - Счётчики, порядок ключей и most_common совпадают с Counter,
+          в том числе после объединения двух сводок через update.
+        """
+        first, second = self.stream[:100], self.stream[100:200]
+        capacity = len(set(first + second))
+        summary = self.fill(first, capacity)
+        summary.update(self.fill(second, capacity))
+        exact = Counter(first)
+        exact.update(Counter(second))
+
+        self.assertEqual(list(summary.items()), list(exact.items()))
+        self.assertEqual(summary.most_common(5), exact.most_common(5))
+        self.assertEqual(summary.min_count(), min(exact.values()))
+        self.assertEqual(summary.errors, {})
+
+    def test_error_bounds(self):
+        """
+        Тестирует погрешность сводки на потоке ключей по закону Ципфа.
+
+        Входные данные:
+        - 50000 ключей из 5000 различных, capacity 100.
+
+        Ожидаемый результат:
+        - Счётчик каждого ключа не меньше точного и превышает его не больше
+          чем на погрешность; все ключи чаще наименьшего счётчика в сводке.
+        - Десять самых частых ключей совпадают с Counter.
+        """
+        summary = self.fill(self.stream, 100)
+        exact = Counter(self.stream)
+
+        self.assertEqual(len(summary), 100)
+        self.assert_bounds(summary, exact)
+        self.assertEqual(
+            [key for key, _ in summary.most_common(10)],
+            [key for key, _ in exact.most_common(10)],
+        )
+
+    def test_merge_partial_summaries(self):
+        """
+        Тестирует объединение сводок частей потока.
+
+        Входные данные:
+        - Поток из 50000 ключей, разбитый на четыре части, capacity 200.
+
+        Ожидаемый результат:
+        - В объединённой сводке не больше capacity ключей, границы
+          погрешности выполняются для всего потока.
+        - Объединение со Counter выбрасывает ValueError.
+        """
+        summary = SpaceSaving(200)
+        for first in range(0, len(self.stream), 12500):
+            summary.update(self.fill(self.stream[first : first + 12500], 200))
+
+        self.assertEqual(len(summary), 200)
+        self.assert_bounds(summary, Counter(self.stream))
+        with self.assertRaises(ValueError):
+            summary.update(Counter(self.stream))
+
+    def test_serialization(self):
+        """
+        Тестирует восстановление сводки из снимка и через pickle.
+
+        Ожидаемый результат:
+        - Восстановленная сводка совпадает с исходной, включая порядок ключей
+          и погрешности, и продолжает вытеснять ключи так же, как исходная.
+        """
+        summary = self.fill(self.stream, 50)
+        for restored in (
+            SpaceSaving.from_dict(summary.to_dict()),
+            pickle.loads(pickle.dumps(summary)),
+        ):
+            self.assertEqual(list(restored.items()), list(summary.items()))
+            self.assertEqual(restored.errors, summary.errors)
+            self.assertEqual(restored.capacity, 50)
+            restored["/new"] += 1
+            self.assertEqual(len(restored), 50)
+            self.assertEqual(restored.error("/new"), summary.min_count())
+        with self.assertRaises(ValueError):
+            SpaceSaving(0)
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    @staticmethod
+    def fill(values, precision=12):
+        sketch = HyperLogLog(precision)
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def test_accuracy(self):
+        """
+        Тестирует оценку количества различных значений.
+
+        Входные данные:
+        - От 100 до 200000 различных значений, каждое добавлено дважды,
+          точность 12 (стандартная погрешность ~1.6%).
+
+        Ожидаемый результат:
+        - Оценка отличается от точного количества не больше чем на 5%,
+          размер регистров не зависит от количества значений.
+        """
+        for count in (100, 5000, 200000):
+            with self.subTest(count=count):
+                values = [f"10.0.{i}" for i in range(count)]
+                sketch = self.fill(values + values)
+                self.assertLess(abs(sketch.count() / count - 1), 0.05)
+                self.assertEqual(len(sketch.registers), 4096)
+
+    def test_merge(self):
+        """
+        Тестирует объединение сводок частей данных.
+
+        Входные данные:
+        - Значения, разбитые на пересекающиеся части.
+
+        Ожидаемый результат:
+        - Объединение совпадает со сводкой всех значений.
+        - Объединение сводок разной точности выбрасывает ValueError.
+        """
+        values = [f"/r{i}" for i in range(30000)]
+        merged = self.fill(values[:20000]).merge(self.fill(values[10000:]))
+        self.assertEqual(merged.registers, self.fill(values).registers)
+        with self.assertRaises(ValueError):
+            merged.merge(HyperLogLog(10))
+
+        # Пустая, разреженная и заполненная сводки в любом порядке
+        parts = [[], values[:50], values[40:90], values[:20000], values[25000:]]
+        for first in parts:
+            for second in parts:
+                with self.subTest(first=len(first), second=len(second)):
+                    merged = self.fill(first).merge(self.fill(second))
+                    self.assertEqual(
+                        merged.registers, self.fill(first + second).registers
+                    )
+
+    def test_serialization(self):
+        """
+        Тестирует восстановление сводки из снимка и постоянство хэша.
+
+        Ожидаемый результат:
+        - Восстановленная сводка совпадает с исходной.
+        - Хэш значения не зависит от процесса (PYTHONHASHSEED).
+        - Недопустимая точность выбрасывает ValueError.
+        """
+        sketch = self.fill([f"agent {i}" for i in range(1000)], precision=8)
+        restored = HyperLogLog.from_dict(sketch.to_dict())
+        self.assertEqual(restored.precision, 8)
+        self.assertEqual(restored.registers, sketch.registers)
+        self.assertEqual(restored.count(), sketch.count())
+        self.assertEqual(stable_hash("/index"), 17617456595898381877)
+        for precision in (3, 17):
+            with self.assertRaises(ValueError):
+                HyperLogLog(precision)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+LOG_FILE = os.path.join(ROOT_DIR, "logs", "2015-05-17.txt")
+
+# Модули, которые не нужны для анализа локальных файлов и заметно замедляют
+# запуск: HTTP, пулы потоков и процессов, numpy, хранилище и режим --follow
+HEAVY_MODULES = (
+    "requests",
+    "urllib3",
+    "concurrent.futures",
+    "multiprocessing",
+    "numpy",
+    "src.columnar",
+    "src.parallel",
+    "src.store",
+    "src.follow",
+)
+
+
+def imported_heavy_modules(code):
+    """Тяжёлые модули, загруженные после выполнения code в новом интерпретаторе."""
+    check = (
+        f"{code}\n"
+        "import sys\n"
+        f"print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules], "
+        "file=sys.stderr)\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = subprocess.run(
+            [sys.executable, "-c", check],
+            cwd=ROOT_DIR,
+            env={**os.environ, "XDG_CACHE_HOME": tmp_dir},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+    return result.stderr.split()
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_main(self):
+        """
+        Тестирует импорт точки входа.
+
+        Ожидаемый результат:
+        - import src.main не загружает модули HEAVY_MODULES.
+        """
+        self.assertEqual(imported_heavy_modules("import src.main"), [])
+
+    def test_local_run(self):
+        """
+        Тестирует запуск по локальному файлу.
+
+        Входные данные:
+        - Анализ одного файла логов с кэшем агрегатов и фильтром по дате.
+
+        Ожидаемый результат:
+        - Модули HEAVY_MODULES не загружаются.
+        """
+        code = (
+            "import sys\n"
+            f"sys.argv = ['analyzer', '--path', {LOG_FILE!r}, '--from', '2015-05-17']\n"
+            "from src.main import main\n"
+            "main()"
+        )
+        self.assertEqual(imported_heavy_modules(code), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
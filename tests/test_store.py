@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.columnar import is_available
+from src.filters import FieldFilter
+from src.pipeline import AnalysisOptions, analyze_files
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), "../logs")
+DAYS = ("2015-05-17", "2015-05-18", "2015-05-19")
+
+
+@unittest.skipUnless(is_available(), "numpy is not installed")
+class TestColumnStore(unittest.TestCase):
+
+    def setUp(self):
+        from src.store import ColumnStore
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.files = []
+        for day in DAYS:
+            path = os.path.join(self.tmp_dir, f"{day}.txt")
+            shutil.copy(os.path.join(LOG_DIR, f"{day}.txt"), path)
+            self.files.append(path)
+        self.store = ColumnStore(os.path.join(self.tmp_dir, "store"))
+        for path in self.files:
+            self.store.ingest(path)
+
+    def test_query_matches_analysis(self):
+        """
+        Тестирует совпадение запроса к хранилищу с разбором файлов.
+
+        Входные данные:
+        - Три файла логов, загруженные в хранилище; фильтры по строковым
+          и числовым полям, диапазоны дат, различные значения и корзины
+          времени.
+
+        Ожидаемый результат:
+        - Снимки статистики, порядок ресурсов и список файлов совпадают.
+        """
+        cases = [
+            AnalysisOptions(),
+            AnalysisOptions(exact_quantiles=True, from_date="2015-05-18T12:00:00"),
+            AnalysisOptions(
+                to_date="2015-05-17", filter_field="agent", filter_value="Debian*"
+            ),
+            AnalysisOptions(
+                filters=(FieldFilter("status", "3*"), FieldFilter("method", "HEAD")),
+                match_any=True,
+            ),
+            AnalysisOptions(
+                filters=(FieldFilter("referrer", "x", negate=True),),
+                distinct_precision=10,
+                bucket_seconds=3600,
+            ),
+        ]
+        for options in cases:
+            with self.subTest(options=options):
+                expected, expected_files = analyze_files(self.files, options)
+                stats, files = self.store.query(options)
+                self.assertEqual(stats.to_dict(), expected.to_dict())
+                self.assertEqual(
+                    stats.resources.most_common(10),
+                    expected.resources.most_common(10),
+                )
+                self.assertEqual(files, expected_files)
+
+    def test_pruning(self):
+        """
+        Тестирует пропуск дней и столбцов, которые не нужны запросу.
+
+        Входные данные:
+        - Запрос за один день с фильтром по методу.
+
+        Ожидаемый результат:
+        - Читаются только столбцы отрезка этого дня, нужные фильтру
+          и подсчёту; столбцы ip и user-agent не читаются.
+        """
+        import numpy as np
+
+        loaded = []
+        np_load = np.load
+
+        def load(path):
+            loaded.append(os.path.relpath(path, self.store.directory))
+            return np_load(path)
+
+        options = AnalysisOptions(
+            from_date="2015-05-18",
+            to_date="2015-05-18",
+            filter_field="method",
+            filter_value="GET",
+        )
+        with patch("src.store.np.load", side_effect=load):
+            stats, files = self.store.query(options)
+        self.assertEqual(files, [self.files[1]])
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in loaded),
+            ["method.npy", "resource.npy", "size.npy", "status.npy"],
+        )
+        self.assertTrue(all(path.startswith("2015-05-18") for path in loaded))
+
+    def test_reingest(self):
+        """
+        Тестирует повторную загрузку источников.
+
+        Ожидаемый результат:
+        - Неизменившийся файл не читается.
+        - Изменившийся файл загружается заново на прежнее место в порядке
+          источников, а его старые отрезки удаляются.
+        """
+        self.assertIsNone(self.store.ingest(self.files[0]))
+
+        old_segments = self.store.load_manifest()["sources"][0]["segments"]
+        with open(self.files[0], "a") as f:
+            # В конце файла нет перевода строки
+            f.write(
+                '\n1.2.3.4 - - [17/May/2015:23:00:00 +0000] "GET /new HTTP/1.1" '
+                '200 5 "-" "x"\ngarbage\n'
+            )
+        records, skipped = self.store.ingest(self.files[0])
+        self.assertEqual(skipped, 1)
+
+        sources = self.store.load_manifest()["sources"]
+        self.assertEqual([entry["source"] for entry in sources], self.files)
+        for segment in old_segments:
+            self.assertFalse(
+                os.path.exists(os.path.join(self.store.directory, segment["path"]))
+            )
+        stats, _ = self.store.query(
+            AnalysisOptions(filter_field="resource", filter_value="/new")
+        )
+        self.assertEqual(stats.total_requests, 1)
+        self.assertEqual(
+            records, analyze_files(self.files[:1], AnalysisOptions())[0].total_requests
+        )
+
+    def test_time_filter_not_supported(self):
+        """
+        Тестирует условие на поле time, которое не хранится.
+
+        Ожидаемый результат:
+        - Выбрасывается ValueError.
+        """
+        with self.assertRaises(ValueError):
+            self.store.query(AnalysisOptions(filters=(FieldFilter("time", "2015*"),)))
+
+
+if __name__ == "__main__":
+    unittest.main()
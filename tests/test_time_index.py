@@ -0,0 +1,184 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.cache import AggregateCache
+from src.file_handler import load_logs_from_file, load_logs_from_ranges
+from src.log_parser import TIMESTAMP_FIELD, parse_log_line
+from src.pipeline import (
+    AnalysisOptions,
+    analyze_file,
+    analyze_files,
+    analyze_source,
+    summarize_lines,
+)
+from src.time_index import (
+    INDEX_FIELDS,
+    TimeIndex,
+    TimeIndexBuilder,
+    build_time_index,
+    index_key,
+    load_time_index,
+)
+
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../logs/2015-05-17.txt")
+
+
+class TestTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = AggregateCache(os.path.join(self.tmp_dir, "cache"))
+        self.log_file = os.path.join(self.tmp_dir, "access.log")
+        shutil.copy(LOG_FILE, self.log_file)
+        self.lines = list(load_logs_from_file(LOG_FILE))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, lines):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def times(self, lines, start=None, end=None):
+        # Время разобранных записей из интервала [start, end)
+        times = []
+        for line in lines:
+            try:
+                log_record = parse_log_line(line, INDEX_FIELDS)
+            except ValueError:
+                continue
+            if log_record is None:
+                continue
+            time = log_record[TIMESTAMP_FIELD]
+            if (start is None or time >= start) and (end is None or time < end):
+                times.append(time)
+        return times
+
+    def test_ranges_match_full_scan(self):
+        """
+        Тестирует отбор диапазонов байт по индексу времени.
+
+        Входные данные:
+        - Файл со строками по времени, с перемешанными строками и с
+          нераспознанными строками; несколько интервалов времени.
+
+        Ожидаемый результат:
+        - Строки из диапазонов индекса содержат все записи интервала,
+          как при полном чтении файла.
+        - Индекс, построенный при полном разборе, совпадает с индексом
+          отдельного прохода.
+        """
+        shuffled = self.lines[:]
+        random.Random(1).shuffle(shuffled)
+        broken = self.lines[:]
+        broken[0:0] = ["garbage"]
+        broken[500:500] = ["приветствие", ""]
+        times = sorted(self.times(self.lines))
+        intervals = [
+            (None, None),
+            (times[0], times[100]),
+            (times[1000], None),
+            (None, times[50]),
+            (times[-1] + 1, None),
+            (times[700], times[700] + 120),
+        ]
+        for name, lines in (
+            ("sorted", self.lines),
+            ("shuffled", shuffled),
+            ("broken", broken),
+        ):
+            path = self.write(name, lines)
+            index = build_time_index(path)
+            builder = TimeIndexBuilder()
+            summarize_lines(load_logs_from_file(path), AnalysisOptions(), builder)
+            self.assertEqual(
+                builder.finish(os.path.getsize(path)).to_dict(), index.to_dict()
+            )
+            for start, end in intervals:
+                with self.subTest(name=name, start=start, end=end):
+                    ranges = index.ranges(start, end)
+                    selected = self.times(
+                        load_logs_from_ranges(path, ranges), start, end
+                    )
+                    expected = self.times(self.lines, start, end)
+                    self.assertEqual(sorted(selected), sorted(expected))
+
+        index = build_time_index(self.log_file)
+        self.assertLess(len(index.ranges(times[0], times[100])), 3)
+        self.assertEqual(index.ranges(times[-1] + 1, None), [])
+
+    def test_incomplete_index(self):
+        """
+        Тестирует индекс, построенный не по всему файлу.
+
+        Входные данные:
+        - Построитель получил часть строк файла; запись индекса в кэше
+          с несогласованными списками.
+
+        Ожидаемый результат:
+        - Индекс неполного прохода не создаётся, испорченная запись
+          кэша строится заново.
+        """
+        builder = TimeIndexBuilder()
+        for line in self.lines[:10]:
+            builder.add(line)
+        self.assertIsNone(builder.finish(os.path.getsize(self.log_file)))
+
+        self.cache.put(
+            index_key(self.log_file, self.cache),
+            {"starts": [0], "min_times": [], "max_times": [], "size": 1},
+        )
+        index = load_time_index(self.log_file, self.cache)
+        self.assertEqual(index.to_dict(), build_time_index(self.log_file).to_dict())
+        self.assertEqual(
+            TimeIndex.from_dict(
+                self.cache.get(index_key(self.log_file, self.cache))
+            ).to_dict(),
+            index.to_dict(),
+        )
+
+    def test_analyze_with_index(self):
+        """
+        Тестирует обработку диапазона дат, частично пересекающего файл.
+
+        Входные данные:
+        - Файл разобран без диапазона дат, затем с диапазоном, покрывающим
+          его целиком, затем обрабатывается с интервалом в один час функциями
+          analyze_file и analyze_files.
+
+        Ожидаемый результат:
+        - Разбор без диапазона дат не разбирает время и не строит индекс.
+        - Индекс времени сохраняется при первом разборе с диапазоном дат,
+          файл целиком больше не читается, статистика совпадает с обработкой
+          без кэша.
+        """
+        analyze_file(self.log_file, AnalysisOptions(), self.cache)
+        self.assertIsNone(self.cache.get(index_key(self.log_file, self.cache)))
+        analyze_file(self.log_file, AnalysisOptions(from_date="2015-05-17"), self.cache)
+        self.assertIsNotNone(self.cache.get(index_key(self.log_file, self.cache)))
+
+        options = AnalysisOptions(
+            from_date="2015-05-17T12:00:00", to_date="2015-05-16T13:00:00"
+        )
+        expected, _ = analyze_source(self.log_file, options)
+        with patch("src.pipeline.load_logs") as load_logs, patch(
+            "src.time_index.build_time_index"
+        ) as build:
+            stats, _ = analyze_file(self.log_file, options, self.cache)
+            load_logs.assert_not_called()
+            build.assert_not_called()
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+
+        stats, processed_files = analyze_files([self.log_file], options, self.cache)
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+        self.assertEqual(processed_files, [self.log_file])
+
+
+if __name__ == "__main__":
+    unittest.main()